@@ -0,0 +1,132 @@
+from cuantiles import K_GLOBAL, K_POR_DEFECTO, sketch_agregar, sketch_cuantiles, sketch_vacio
+from logros import estado_completo, observar_sesion
+from mapa_calor import acumular_mapa, mapa_vacio, mapa_vigente
+from resumenes import acumular_resumenes
+from tendencias import actualizar_tendencias, tendencias_vacias
+
+# Campos de los registros de usuario que no existían en versiones anteriores
+CAMPOS_USUARIO = ("cuantiles", "dias", "semanas", "tendencias", "mapa")
+
+
+def agregado_vacio(k=K_POR_DEFECTO):
+    return {
+        "sesiones": 0,
+        "tiempo_total": 0,
+        "suma_puntuacion": 0,
+        "temas": {},
+        "duracion_min": None,
+        "duracion_max": None,
+        "puntuacion_min": None,
+        "puntuacion_max": None,
+        "cuantiles": {"duracion": sketch_vacio(k), "puntuacion": sketch_vacio(k)}
+    }
+
+
+def agregado_global_vacio():
+    return agregado_vacio(K_GLOBAL)
+
+
+def agregado_usuario_vacio():
+    """Los registros de usuario llevan además resúmenes por día y semana ISO, medias
+    móviles y el mapa de calor por hora y día de la semana"""
+    agregado = agregado_vacio()
+    agregado["dias"] = {}
+    agregado["semanas"] = {}
+    agregado["tendencias"] = tendencias_vacias()
+    agregado["mapa"] = mapa_vacio()
+    return agregado
+
+
+def agregados_vacios():
+    return {"global": agregado_global_vacio(), "usuarios": {}}
+
+
+def acumular(agregado, sesion, tema):
+    """Suma una sesión a un registro agregado en O(1)"""
+    duracion = sesion["duracion"]
+    puntuacion = sesion["puntuacion"]
+
+    agregado["sesiones"] += 1
+    agregado["tiempo_total"] += duracion
+    agregado["suma_puntuacion"] += puntuacion
+
+    if tema is not None:
+        agregado["temas"][tema] = agregado["temas"].get(tema, 0) + 1
+
+    if agregado["duracion_min"] is None or duracion < agregado["duracion_min"]:
+        agregado["duracion_min"] = duracion
+    if agregado["duracion_max"] is None or duracion > agregado["duracion_max"]:
+        agregado["duracion_max"] = duracion
+    if agregado["puntuacion_min"] is None or puntuacion < agregado["puntuacion_min"]:
+        agregado["puntuacion_min"] = puntuacion
+    if agregado["puntuacion_max"] is None or puntuacion > agregado["puntuacion_max"]:
+        agregado["puntuacion_max"] = puntuacion
+
+    sketch_agregar(agregado["cuantiles"]["duracion"], duracion)
+    sketch_agregar(agregado["cuantiles"]["puntuacion"], puntuacion)
+
+
+def acumular_usuario(agregado, sesion, tema):
+    """Como acumular, pero además avanza resúmenes, tendencias, mapa de calor y reglas de logros"""
+    acumular(agregado, sesion, tema)
+    acumular_resumenes(agregado, sesion)
+    actualizar_tendencias(agregado["tendencias"], sesion)
+    acumular_mapa(agregado["mapa"], sesion)
+    observar_sesion(agregado.setdefault("reglas", {}), sesion, tema)
+
+
+def agregado_usuario(datos, usuario_id):
+    return datos["agregados"]["usuarios"].get(usuario_id) or agregado_usuario_vacio()
+
+
+def satisfaccion_promedio(agregado):
+    if agregado["sesiones"] == 0:
+        return 0
+    return agregado["suma_puntuacion"] / agregado["sesiones"]
+
+
+def percentiles(agregado, campo, que=(50, 90, 99)):
+    """Percentiles de "duracion" o "puntuacion" según el sketch del registro"""
+    valores = sketch_cuantiles(agregado["cuantiles"][campo], [p / 100 for p in que])
+    return dict(zip(que, valores))
+
+
+def agregar_sesion(datos, sesion):
+    """Actualiza los agregados del usuario y globales con una sesión nueva"""
+    agregados = datos["agregados"]
+    plan = datos["planes"].get(sesion["plan_id"])
+    tema = plan["tema"] if plan else None
+
+    acumular(agregados["global"], sesion, tema)
+    if plan is not None:
+        agregado = agregados["usuarios"].setdefault(plan["usuario_id"], agregado_usuario_vacio())
+        acumular_usuario(agregado, sesion, tema)
+
+
+def sincronizar_agregados(datos, indices):
+    """Incorpora las sesiones que aún no estén contadas en los agregados guardados.
+
+    Cada registro guarda cuántas sesiones lleva sumadas, así que basta con
+    recorrer la cola de sesiones que falte en cada uno. Los registros guardados
+    antes de existir un campo (CAMPOS_USUARIO o el estado de una regla de
+    logros nueva) se rehacen enteros; los mapas de calor con el formato denso
+    antiguo se convierten sin recorrer sesiones.
+    """
+    agregados = datos.setdefault("agregados", agregados_vacios())
+
+    total = len(datos["sesiones"])
+    if agregados["global"]["sesiones"] > total or "cuantiles" not in agregados["global"]:
+        agregados["global"] = agregado_global_vacio()
+    for sesion in datos["sesiones"][agregados["global"]["sesiones"]:]:
+        plan = datos["planes"].get(sesion["plan_id"])
+        acumular(agregados["global"], sesion, plan["tema"] if plan else None)
+
+    for usuario_id, sesiones_usuario in indices.sesiones_por_usuario.items():
+        agregado = agregados["usuarios"].get(usuario_id)
+        if (agregado is None or agregado["sesiones"] > len(sesiones_usuario)
+                or any(campo not in agregado for campo in CAMPOS_USUARIO)
+                or not estado_completo(agregado.get("reglas", {}))):
+            agregado = agregados["usuarios"][usuario_id] = agregado_usuario_vacio()
+        agregado["mapa"] = mapa_vigente(agregado["mapa"])
+        for sesion in sesiones_usuario[agregado["sesiones"]:]:
+            acumular_usuario(agregado, sesion, datos["planes"][sesion["plan_id"]]["tema"])
@@ -0,0 +1,707 @@
+import json
+import os
+import pickle
+import sqlite3
+import struct
+import zlib
+from agregados import agregado_global_vacio, agregados_vacios
+
+
+def datos_vacios():
+    return {
+        "usuarios": {},
+        "planes": {},
+        "sesiones": [],
+        "puntos": {},
+        "logros": {},
+        "rachas": {},
+        "version": 0,
+        "agregados": agregados_vacios()
+    }
+
+
+def escribir_json_atomico(archivo, datos):
+    """Escribe en un temporal y lo renombra: el archivo nunca queda a medias"""
+    temporal = archivo + ".tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, archivo)
+
+
+def aplicar_cambio(datos, cambio):
+    """Aplica un cambio del diario sobre los datos en memoria"""
+    op = cambio["op"]
+
+    if op == "usuario":
+        usuario_id = cambio["usuario_id"]
+        datos["usuarios"][usuario_id] = cambio["usuario"]
+        datos["puntos"].setdefault(usuario_id, 0)
+        datos["logros"].setdefault(usuario_id, [])
+        datos["rachas"].setdefault(usuario_id, {"actual": 0, "maxima": 0, "ultima_fecha": None})
+    elif op == "plan":
+        datos["planes"][cambio["plan_id"]] = cambio["plan"]
+    elif op == "progreso":
+        datos["planes"][cambio["plan_id"]]["progreso"] = cambio["progreso"]
+    elif op == "sesion":
+        datos["sesiones"].append(cambio["sesion"])
+    elif op == "puntos":
+        # Se guarda el total para que reaplicar el diario sea idempotente
+        datos["puntos"][cambio["usuario_id"]] = cambio["total"]
+    elif op == "racha":
+        datos["rachas"][cambio["usuario_id"]] = cambio["racha"]
+    elif op == "logro":
+        logros_usuario = datos["logros"].setdefault(cambio["usuario_id"], [])
+        if cambio["logro"] not in logros_usuario:
+            logros_usuario.append(cambio["logro"])
+
+    datos["version"] = max(datos.get("version", 0), cambio["version"])
+
+
+class InstantaneaBinaria:
+    """Copia binaria (pickle 5) de los datos y de sus columnas para arrancar rápido.
+
+    Además de ahorrar json.load guarda el estado de ColumnasSesiones (arrays
+    tipados que se restauran copiando bytes), que es lo más caro de rehacer al
+    arrancar. Los agregados y la caché de patrones viajan dentro.
+
+    La cabecera guarda el mtime y el tamaño del JSON del que se sacó la copia
+    y un CRC32 del contenido; si el JSON cambió o la copia está dañada se
+    ignora y se vuelve a leer el JSON.
+    """
+
+    FIRMA = b"LAB2"
+    CABECERA = struct.Struct("<4sqqIq")  # firma, mtime_ns, tamaño, crc32, largo
+
+    def __init__(self, archivo_datos):
+        self.archivo_datos = archivo_datos
+        base, _ = os.path.splitext(archivo_datos)
+        self.archivo_binario = base + ".bin"
+
+    def cargar(self):
+        """Devuelve (datos, estado de las columnas o None) de la copia binaria, o None si no es válida"""
+        if not os.path.exists(self.archivo_binario) or not os.path.exists(self.archivo_datos):
+            return None
+
+        estado_json = os.stat(self.archivo_datos)
+        with open(self.archivo_binario, 'rb') as f:
+            cabecera = f.read(self.CABECERA.size)
+            if len(cabecera) < self.CABECERA.size:
+                return None
+            firma, mtime_ns, tamano, crc, largo = self.CABECERA.unpack(cabecera)
+            if (firma != self.FIRMA or mtime_ns != estado_json.st_mtime_ns
+                    or tamano != estado_json.st_size):
+                return None
+            contenido = f.read(largo)
+
+        if len(contenido) != largo or zlib.crc32(contenido) != crc:
+            return None
+        copia = pickle.loads(contenido)
+        return copia["datos"], copia["columnas"]
+
+    def vigente(self):
+        """True si la copia binaria corresponde al JSON actual (solo mira la cabecera)"""
+        if not os.path.exists(self.archivo_binario) or not os.path.exists(self.archivo_datos):
+            return False
+        estado_json = os.stat(self.archivo_datos)
+        with open(self.archivo_binario, 'rb') as f:
+            cabecera = f.read(self.CABECERA.size)
+        if len(cabecera) < self.CABECERA.size:
+            return False
+        firma, mtime_ns, tamano, _, _ = self.CABECERA.unpack(cabecera)
+        return firma == self.FIRMA and mtime_ns == estado_json.st_mtime_ns and tamano == estado_json.st_size
+
+    def guardar(self, datos, columnas=None):
+        """Escribe la copia binaria del JSON recién guardado"""
+        estado_columnas = columnas.estado() if columnas is not None else None
+        contenido = pickle.dumps({"datos": datos, "columnas": estado_columnas}, protocol=5)
+        estado_json = os.stat(self.archivo_datos)
+        cabecera = self.CABECERA.pack(self.FIRMA, estado_json.st_mtime_ns, estado_json.st_size,
+                                      zlib.crc32(contenido), len(contenido))
+
+        temporal = self.archivo_binario + ".tmp"
+        with open(temporal, 'wb') as f:
+            f.write(cabecera)
+            f.write(contenido)
+        os.replace(temporal, self.archivo_binario)
+
+
+class AlmacenJSON:
+    """Guarda todos los datos en un único archivo JSON"""
+
+    def __init__(self, archivo_datos, instantanea_binaria=True):
+        self.archivo_datos = archivo_datos
+        self.instantanea = InstantaneaBinaria(archivo_datos) if instantanea_binaria else None
+        # Estado de ColumnasSesiones leído de la copia binaria, para no rehacerlas
+        self.columnas_guardadas = None
+        self._instantanea_con_columnas = False
+
+    def cargar(self):
+        self.columnas_guardadas = None
+        if self.instantanea is not None:
+            try:
+                copia = self.instantanea.cargar()
+            except Exception:
+                copia = None
+            if copia is not None:
+                datos, self.columnas_guardadas = copia
+                self._instantanea_con_columnas = self.columnas_guardadas is not None
+                return datos
+
+        if not os.path.exists(self.archivo_datos):
+            return None
+        with open(self.archivo_datos, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def guardar(self, datos, cambios):
+        # La copia binaria no se rehace en cada guardado: doblaría el coste de
+        # escribir solo para acelerar el arranque. Se rehace al compactar y al
+        # cerrar, cuando ya existen las columnas que guarda.
+        escribir_json_atomico(self.archivo_datos, datos)
+
+    def cerrar(self, datos, columnas=None):
+        """Deja la copia binaria al día para el próximo arranque"""
+        if self.instantanea is None:
+            return
+        try:
+            vigente = self.instantanea.vigente()
+        except OSError:
+            vigente = False
+        if not vigente or (columnas is not None and not self._instantanea_con_columnas):
+            self._guardar_instantanea(datos, columnas)
+
+    def _guardar_instantanea(self, datos, columnas=None):
+        if self.instantanea is None:
+            return
+        try:
+            self.instantanea.guardar(datos, columnas)
+            self._instantanea_con_columnas = columnas is not None
+        except Exception:
+            # La copia binaria es solo una aceleración: si falla se usará el JSON
+            pass
+
+    def compactar(self, datos, columnas=None):
+        escribir_json_atomico(self.archivo_datos, datos)
+        self._guardar_instantanea(datos, columnas)
+
+
+class AlmacenDiario(AlmacenJSON):
+    """Instantánea JSON más un diario JSONL al que solo se añaden cambios"""
+
+    def __init__(self, archivo_datos, max_entradas=1000, instantanea_binaria=True):
+        super().__init__(archivo_datos, instantanea_binaria)
+        base, _ = os.path.splitext(archivo_datos)
+        self.archivo_diario = base + ".diario.jsonl"
+        self.max_entradas = max_entradas
+        self.entradas = 0
+
+    def cargar(self):
+        datos = super().cargar()
+        if not os.path.exists(self.archivo_diario):
+            return datos
+
+        if datos is None:
+            datos = datos_vacios()
+        version_instantanea = datos.get("version", 0)
+        self.entradas = 0
+
+        with open(self.archivo_diario, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    cambio = json.loads(linea)
+                except ValueError:
+                    # Línea incompleta por un cierre inesperado: se ignora
+                    continue
+                self.entradas += 1
+                # Cambios ya incluidos en la instantánea
+                if cambio["version"] <= version_instantanea:
+                    continue
+                aplicar_cambio(datos, cambio)
+
+        return datos
+
+    def guardar(self, datos, cambios):
+        if not cambios:
+            return
+
+        lineas = [json.dumps(cambio, ensure_ascii=False) + "\n" for cambio in cambios]
+        with open(self.archivo_diario, 'a', encoding='utf-8') as f:
+            f.writelines(lineas)
+            f.flush()
+            os.fsync(f.fileno())
+        self.entradas += len(lineas)
+
+        if self.entradas >= self.max_entradas:
+            self.compactar(datos)
+
+    def compactar(self, datos, columnas=None):
+        """Vuelca el diario en la instantánea y lo deja vacío"""
+        escribir_json_atomico(self.archivo_datos, datos)
+        self._guardar_instantanea(datos, columnas)
+
+        # La instantánea ya tiene la versión más reciente, así que un diario
+        # que no llegue a vaciarse se descartaría al cargar
+        open(self.archivo_diario, 'w', encoding='utf-8').close()
+        self.entradas = 0
+
+
+class AlmacenSQLite:
+    """Guarda los datos en una base SQLite, una tabla por tipo de dato.
+
+    Es solo un formato de persistencia: como los demás almacenes, cargar lee
+    todo a memoria y las consultas las resuelven IndiceDatos y las columnas.
+    Por eso las tablas no llevan índices secundarios, que solo encarecerían
+    cada inserción; las bases creadas con ellos los pierden al conectar.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            usuario_id TEXT PRIMARY KEY,
+            nombre TEXT,
+            nivel TEXT,
+            intereses TEXT,
+            fecha_registro TEXT,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS planes (
+            plan_id TEXT PRIMARY KEY,
+            usuario_id TEXT,
+            tema TEXT,
+            progreso NUMERIC,
+            fecha_creacion TEXT,
+            fecha_limite TEXT,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS sesiones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plan_id TEXT,
+            usuario_id TEXT,
+            duracion INTEGER,
+            puntuacion REAL,
+            fecha TEXT,
+            hora TEXT,
+            notas TEXT
+        );
+        CREATE TABLE IF NOT EXISTS puntos (
+            usuario_id TEXT PRIMARY KEY,
+            total INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS logros (
+            usuario_id TEXT,
+            logro TEXT,
+            PRIMARY KEY (usuario_id, logro)
+        );
+        CREATE TABLE IF NOT EXISTS rachas (
+            usuario_id TEXT PRIMARY KEY,
+            actual INTEGER,
+            maxima INTEGER,
+            ultima_fecha TEXT
+        );
+        CREATE TABLE IF NOT EXISTS agregados (
+            usuario_id TEXT PRIMARY KEY,
+            valor TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+        DROP INDEX IF EXISTS idx_planes_usuario;
+        DROP INDEX IF EXISTS idx_sesiones_usuario_fecha;
+        DROP INDEX IF EXISTS idx_sesiones_plan;
+        DROP INDEX IF EXISTS idx_sesiones_fecha;
+    """
+
+    CAMPOS_USUARIO = ("nombre", "nivel", "intereses", "fecha_registro")
+    CAMPOS_PLAN = ("usuario_id", "tema", "progreso", "fecha_creacion", "fecha_limite")
+
+    def __init__(self, archivo_datos):
+        self.archivo_datos = archivo_datos
+        base, _ = os.path.splitext(archivo_datos)
+        self.archivo_db = base + ".db"
+        self.conexion = None
+        # Sin copia binaria: las columnas de sesiones se rehacen al cargar
+        self.columnas_guardadas = None
+
+    def conectar(self):
+        if self.conexion is None:
+            self.conexion = sqlite3.connect(self.archivo_db)
+            self.conexion.execute("PRAGMA journal_mode=WAL")
+            self.conexion.execute("PRAGMA synchronous=NORMAL")
+            self.conexion.executescript(self.ESQUEMA)
+        return self.conexion
+
+    def cargar(self):
+        nueva = not os.path.exists(self.archivo_db)
+        conexion = self.conectar()
+
+        if nueva:
+            # Primera ejecución: migrar el JSON existente si lo hay
+            datos = AlmacenJSON(self.archivo_datos, instantanea_binaria=False).cargar()
+            if datos is not None:
+                self.compactar(datos)
+            return datos
+
+        datos = datos_vacios()
+
+        for usuario_id, nombre, nivel, intereses, fecha_registro, extra in conexion.execute(
+                "SELECT usuario_id, nombre, nivel, intereses, fecha_registro, extra FROM usuarios"):
+            usuario = json.loads(extra)
+            usuario.update({"nombre": nombre, "nivel": nivel, "intereses": json.loads(intereses),
+                            "fecha_registro": fecha_registro})
+            datos["usuarios"][usuario_id] = usuario
+
+        for plan_id, usuario_id, tema, progreso, fecha_creacion, fecha_limite, extra in conexion.execute(
+                "SELECT plan_id, usuario_id, tema, progreso, fecha_creacion, fecha_limite, extra FROM planes"):
+            plan = json.loads(extra)
+            plan.update({"usuario_id": usuario_id, "tema": tema, "progreso": progreso,
+                         "fecha_creacion": fecha_creacion, "fecha_limite": fecha_limite})
+            datos["planes"][plan_id] = plan
+
+        datos["sesiones"] = [self._fila_a_sesion(fila) for fila in conexion.execute(
+            "SELECT plan_id, duracion, puntuacion, fecha, hora, notas FROM sesiones ORDER BY id")]
+
+        datos["puntos"] = dict(conexion.execute("SELECT usuario_id, total FROM puntos"))
+
+        for usuario_id, logro in conexion.execute("SELECT usuario_id, logro FROM logros ORDER BY rowid"):
+            datos["logros"].setdefault(usuario_id, []).append(logro)
+
+        for usuario_id, actual, maxima, ultima_fecha in conexion.execute(
+                "SELECT usuario_id, actual, maxima, ultima_fecha FROM rachas"):
+            datos["rachas"][usuario_id] = {"actual": actual, "maxima": maxima, "ultima_fecha": ultima_fecha}
+            datos["logros"].setdefault(usuario_id, [])
+
+        fila = conexion.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+        datos["version"] = int(fila[0]) if fila else 0
+
+        # Los agregados que falten o estén atrasados se completan al cargar
+        fila = conexion.execute("SELECT valor FROM meta WHERE clave = 'agregado_global'").fetchone()
+        if fila:
+            datos["agregados"]["global"] = json.loads(fila[0])
+        for usuario_id, valor in conexion.execute("SELECT usuario_id, valor FROM agregados"):
+            datos["agregados"]["usuarios"][usuario_id] = json.loads(valor)
+
+        return datos
+
+    def guardar(self, datos, cambios):
+        if not cambios:
+            return
+
+        conexion = self.conectar()
+        with conexion:
+            usuarios_con_sesiones = set()
+            sesiones = []
+            for cambio in cambios:
+                if cambio["op"] == "sesion":
+                    # Las sesiones solo se insertan: van todas juntas en un executemany
+                    sesiones.append(cambio["sesion"])
+                    plan = datos["planes"].get(cambio["sesion"]["plan_id"])
+                    if plan is not None:
+                        usuarios_con_sesiones.add(plan["usuario_id"])
+                else:
+                    self._aplicar(conexion, datos, cambio)
+            self._guardar_sesiones(conexion, datos, sesiones)
+            conexion.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(datos["version"]),))
+            if usuarios_con_sesiones:
+                self._guardar_agregados(conexion, datos, usuarios_con_sesiones)
+
+    def compactar(self, datos, columnas=None):
+        """Reescribe todas las tablas a partir de los datos en memoria"""
+        conexion = self.conectar()
+        with conexion:
+            for tabla in ("usuarios", "planes", "sesiones", "puntos", "logros", "rachas", "agregados", "meta"):
+                conexion.execute(f"DELETE FROM {tabla}")
+
+            for usuario_id, usuario in datos["usuarios"].items():
+                self._guardar_usuario(conexion, usuario_id, usuario)
+            for plan_id, plan in datos["planes"].items():
+                self._guardar_plan(conexion, plan_id, plan)
+            self._guardar_sesiones(conexion, datos, datos["sesiones"])
+            conexion.executemany("INSERT INTO puntos VALUES (?, ?)", datos.get("puntos", {}).items())
+            conexion.executemany("INSERT OR IGNORE INTO logros VALUES (?, ?)",
+                                 [(usuario_id, logro) for usuario_id, logros in datos.get("logros", {}).items()
+                                  for logro in logros])
+            for usuario_id, racha in datos.get("rachas", {}).items():
+                self._guardar_racha(conexion, usuario_id, racha)
+            conexion.execute("INSERT INTO meta VALUES ('version', ?)", (str(datos.get("version", 0)),))
+            if "agregados" in datos:
+                self._guardar_agregados(conexion, datos, datos["agregados"]["usuarios"])
+        conexion.execute("VACUUM")
+
+    def cerrar(self, datos, columnas=None):
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
+
+    # ===== AUXILIARES =====
+
+    def _aplicar(self, conexion, datos, cambio):
+        op = cambio["op"]
+
+        if op == "usuario":
+            usuario_id = cambio["usuario_id"]
+            self._guardar_usuario(conexion, usuario_id, cambio["usuario"])
+            conexion.execute("INSERT OR IGNORE INTO puntos VALUES (?, 0)", (usuario_id,))
+            conexion.execute("INSERT OR IGNORE INTO rachas VALUES (?, 0, 0, NULL)", (usuario_id,))
+        elif op == "plan":
+            self._guardar_plan(conexion, cambio["plan_id"], cambio["plan"])
+        elif op == "progreso":
+            conexion.execute("UPDATE planes SET progreso = ? WHERE plan_id = ?",
+                             (cambio["progreso"], cambio["plan_id"]))
+        elif op == "sesion":
+            self._guardar_sesiones(conexion, datos, [cambio["sesion"]])
+        elif op == "puntos":
+            conexion.execute("INSERT OR REPLACE INTO puntos VALUES (?, ?)", (cambio["usuario_id"], cambio["total"]))
+        elif op == "racha":
+            self._guardar_racha(conexion, cambio["usuario_id"], cambio["racha"])
+        elif op == "logro":
+            conexion.execute("INSERT OR IGNORE INTO logros VALUES (?, ?)", (cambio["usuario_id"], cambio["logro"]))
+
+    def _guardar_usuario(self, conexion, usuario_id, usuario):
+        extra = {k: v for k, v in usuario.items() if k not in self.CAMPOS_USUARIO}
+        conexion.execute("INSERT OR REPLACE INTO usuarios VALUES (?, ?, ?, ?, ?, ?)",
+                         (usuario_id, usuario.get("nombre"), usuario.get("nivel"),
+                          json.dumps(usuario.get("intereses", []), ensure_ascii=False),
+                          usuario.get("fecha_registro"), json.dumps(extra, ensure_ascii=False)))
+
+    def _guardar_plan(self, conexion, plan_id, plan):
+        extra = {k: v for k, v in plan.items() if k not in self.CAMPOS_PLAN}
+        conexion.execute("INSERT OR REPLACE INTO planes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (plan_id, plan.get("usuario_id"), plan.get("tema"), plan.get("progreso", 0),
+                          plan.get("fecha_creacion"), plan.get("fecha_limite"),
+                          json.dumps(extra, ensure_ascii=False)))
+
+    def _guardar_sesiones(self, conexion, datos, sesiones):
+        planes = datos["planes"]
+        conexion.executemany("INSERT INTO sesiones (plan_id, usuario_id, duracion, puntuacion, fecha, hora, notas) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             ((sesion["plan_id"], planes.get(sesion["plan_id"], {}).get("usuario_id"),
+                               sesion["duracion"], sesion["puntuacion"], sesion["fecha"], sesion.get("hora"),
+                               sesion.get("notas", "")) for sesion in sesiones))
+
+    def _guardar_agregados(self, conexion, datos, usuarios):
+        agregados = datos["agregados"]
+        conexion.execute("INSERT OR REPLACE INTO meta VALUES ('agregado_global', ?)",
+                         (json.dumps(agregados["global"], ensure_ascii=False),))
+        conexion.executemany("INSERT OR REPLACE INTO agregados VALUES (?, ?)",
+                             [(usuario_id, json.dumps(agregados["usuarios"][usuario_id], ensure_ascii=False))
+                              for usuario_id in usuarios])
+
+    def _guardar_racha(self, conexion, usuario_id, racha):
+        conexion.execute("INSERT OR REPLACE INTO rachas VALUES (?, ?, ?, ?)",
+                         (usuario_id, racha["actual"], racha["maxima"], racha["ultima_fecha"]))
+
+    def _fila_a_sesion(self, fila):
+        plan_id, duracion, puntuacion, fecha, hora, notas = fila
+        sesion = {"plan_id": plan_id, "duracion": duracion, "puntuacion": puntuacion, "fecha": fecha}
+        if hora is not None:
+            sesion["hora"] = hora
+        sesion["notas"] = notas
+        return sesion
+
+
+class AlmacenFragmentado:
+    """Reparte los datos por usuario en fragmentos y reescribe solo los modificados.
+
+    Cada usuario va al fragmento crc32(usuario_id) % num_fragmentos junto con sus
+    planes, sesiones, puntos, logros, racha y agregados. Un manifiesto pequeño
+    guarda la versión, el agregado global y las sesiones cuyo plan no existe.
+    Cada sesión lleva su número de orden global ("orden", en paralelo a
+    "sesiones") para cargarlas en el mismo orden que los demás almacenes.
+    """
+
+    def __init__(self, archivo_datos, num_fragmentos=64):
+        self.archivo_datos = archivo_datos
+        self.carpeta = os.path.join(os.path.dirname(archivo_datos) or ".", "fragmentos")
+        self.archivo_manifiesto = os.path.join(self.carpeta, "manifiesto.json")
+        self.num_fragmentos = num_fragmentos
+        self.fragmentos = {}
+        self.sesiones_sin_plan = []
+        self.orden_sin_plan = []
+        self.siguiente_orden = 0
+        # Sin copia binaria: las columnas de sesiones se rehacen al cargar
+        self.columnas_guardadas = None
+
+    def fragmento_de(self, usuario_id):
+        return zlib.crc32(usuario_id.encode("utf-8")) % self.num_fragmentos
+
+    def cargar(self):
+        if not os.path.exists(self.archivo_manifiesto):
+            # Primera ejecución: repartir el JSON existente si lo hay
+            datos = AlmacenJSON(self.archivo_datos, instantanea_binaria=False).cargar()
+            if datos is not None:
+                self.compactar(datos)
+            return datos
+
+        with open(self.archivo_manifiesto, 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        self.num_fragmentos = manifiesto["num_fragmentos"]
+        self.fragmentos = {}
+
+        datos = datos_vacios()
+        ordenadas = []
+        for numero in manifiesto["fragmentos"]:
+            with open(self._archivo(numero), 'r', encoding='utf-8') as f:
+                contenido = json.load(f)
+
+            fragmento = self._fragmento(numero)
+            for clave in ("usuarios", "puntos", "logros", "rachas"):
+                datos[clave].update(contenido[clave])
+                fragmento["usuarios"].update(contenido[clave])
+            datos["planes"].update(contenido["planes"])
+            fragmento["planes"].extend(contenido["planes"])
+            fragmento["sesiones"] = contenido["sesiones"]
+            fragmento["orden"] = contenido.get("orden", [])
+            ordenadas.append((fragmento["orden"], contenido["sesiones"]))
+            datos["agregados"]["usuarios"].update(contenido["agregados"])
+
+        self.sesiones_sin_plan = manifiesto["sesiones_sin_plan"]
+        self.orden_sin_plan = manifiesto.get("orden_sin_plan", [])
+        ordenadas.append((self.orden_sin_plan, self.sesiones_sin_plan))
+
+        if all(len(orden) == len(sesiones) for orden, sesiones in ordenadas):
+            # Mismo orden de inserción con el que se guardaron
+            numeradas = sorted((n, i, j) for i, (orden, _) in enumerate(ordenadas) for j, n in enumerate(orden))
+            datos["sesiones"] = [ordenadas[i][1][j] for _, i, j in numeradas]
+            self.siguiente_orden = numeradas[-1][0] + 1 if numeradas else 0
+        else:
+            # Fragmentos de antes de guardar el orden: por fecha y hora, y se numeran al compactar
+            for _, sesiones in ordenadas:
+                datos["sesiones"].extend(sesiones)
+            datos["sesiones"].sort(key=lambda s: (s["fecha"], s.get("hora", "")))
+            self.compactar(datos)
+
+        # Un agregado global que no cuadra (escritura interrumpida) se recalcula
+        agregado_global = manifiesto.get("agregado_global")
+        if agregado_global and agregado_global["sesiones"] == len(datos["sesiones"]):
+            datos["agregados"]["global"] = agregado_global
+        else:
+            datos["agregados"]["global"] = agregado_global_vacio()
+
+        datos["version"] = manifiesto["version"]
+        return datos
+
+    def guardar(self, datos, cambios):
+        if not cambios:
+            return
+
+        os.makedirs(self.carpeta, exist_ok=True)
+        sucios = set()
+        for cambio in cambios:
+            op = cambio["op"]
+            if op == "plan":
+                usuario_id = self._registrar_plan(cambio["plan_id"], cambio["plan"])
+            elif op == "progreso":
+                usuario_id = datos["planes"][cambio["plan_id"]]["usuario_id"]
+            elif op == "sesion":
+                usuario_id = self._registrar_sesion(datos, cambio["sesion"])
+            else:
+                usuario_id = cambio["usuario_id"]
+                self._fragmento(self.fragmento_de(usuario_id))["usuarios"].add(usuario_id)
+
+            if usuario_id is not None:
+                sucios.add(self.fragmento_de(usuario_id))
+
+        for numero in sucios:
+            self._escribir_fragmento(datos, numero)
+        self._escribir_manifiesto(datos)
+
+    def compactar(self, datos, columnas=None):
+        """Reparte de nuevo todos los datos y reescribe todos los fragmentos"""
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.fragmentos = {}
+        self.sesiones_sin_plan = []
+        self.orden_sin_plan = []
+        self.siguiente_orden = 0
+
+        for clave in ("usuarios", "puntos", "logros", "rachas"):
+            for usuario_id in datos.get(clave, {}):
+                self._fragmento(self.fragmento_de(usuario_id))["usuarios"].add(usuario_id)
+        for plan_id, plan in datos["planes"].items():
+            self._registrar_plan(plan_id, plan)
+        for sesion in datos["sesiones"]:
+            self._registrar_sesion(datos, sesion)
+
+        for numero in self.fragmentos:
+            self._escribir_fragmento(datos, numero)
+        self._escribir_manifiesto(datos)
+
+        # Borrar fragmentos que hayan quedado vacíos
+        for nombre in os.listdir(self.carpeta):
+            if nombre.startswith("frag_") and int(nombre[5:8]) not in self.fragmentos:
+                os.remove(os.path.join(self.carpeta, nombre))
+
+    # ===== AUXILIARES =====
+
+    def cerrar(self, datos, columnas=None):
+        """Cada guardado ya deja los fragmentos al día: no hay nada pendiente"""
+
+    def _archivo(self, numero):
+        return os.path.join(self.carpeta, f"frag_{numero:03d}.json")
+
+    def _fragmento(self, numero):
+        if numero not in self.fragmentos:
+            self.fragmentos[numero] = {"usuarios": set(), "planes": [], "sesiones": [], "orden": []}
+        return self.fragmentos[numero]
+
+    def _registrar_plan(self, plan_id, plan):
+        usuario_id = plan["usuario_id"]
+        fragmento = self._fragmento(self.fragmento_de(usuario_id))
+        fragmento["usuarios"].add(usuario_id)
+        if plan_id not in fragmento["planes"]:
+            fragmento["planes"].append(plan_id)
+        return usuario_id
+
+    def _registrar_sesion(self, datos, sesion):
+        orden = self.siguiente_orden
+        self.siguiente_orden += 1
+        plan = datos["planes"].get(sesion["plan_id"])
+        if plan is None:
+            self.sesiones_sin_plan.append(sesion)
+            self.orden_sin_plan.append(orden)
+            return None
+        fragmento = self._fragmento(self.fragmento_de(plan["usuario_id"]))
+        fragmento["sesiones"].append(sesion)
+        fragmento["orden"].append(orden)
+        return plan["usuario_id"]
+
+    def _escribir_fragmento(self, datos, numero):
+        fragmento = self.fragmentos[numero]
+        usuarios = sorted(fragmento["usuarios"])
+        agregados = datos.get("agregados", {}).get("usuarios", {})
+        contenido = {
+            "usuarios": {u: datos["usuarios"][u] for u in usuarios if u in datos["usuarios"]},
+            "planes": {p: datos["planes"][p] for p in fragmento["planes"]},
+            "sesiones": fragmento["sesiones"],
+            "orden": fragmento["orden"],
+            "puntos": {u: datos["puntos"][u] for u in usuarios if u in datos.get("puntos", {})},
+            "logros": {u: datos["logros"][u] for u in usuarios if u in datos.get("logros", {})},
+            "rachas": {u: datos["rachas"][u] for u in usuarios if u in datos.get("rachas", {})},
+            "agregados": {u: agregados[u] for u in usuarios if u in agregados}
+        }
+        escribir_json_atomico(self._archivo(numero), contenido)
+
+    def _escribir_manifiesto(self, datos):
+        manifiesto = {
+            "version": datos.get("version", 0),
+            "num_fragmentos": self.num_fragmentos,
+            "fragmentos": sorted(self.fragmentos),
+            "agregado_global": datos.get("agregados", {}).get("global"),
+            "sesiones_sin_plan": self.sesiones_sin_plan,
+            "orden_sin_plan": self.orden_sin_plan
+        }
+        escribir_json_atomico(self.archivo_manifiesto, manifiesto)
+
+
+ALMACENES = {
+    "json": AlmacenJSON,
+    "diario": AlmacenDiario,
+    "sqlite": AlmacenSQLite,
+    "fragmentado": AlmacenFragmentado
+}
+
+
+def crear_almacen(tipo, archivo_datos, **opciones):
+    if tipo not in ALMACENES:
+        raise ValueError(f"Almacenamiento '{tipo}' no soportado. Opciones: {', '.join(ALMACENES)}")
+    return ALMACENES[tipo](archivo_datos, **opciones)
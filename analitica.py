@@ -0,0 +1,190 @@
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Límites de los tramos de duración en minutos: <15, 15-29, 30-59, 60-119, 120+
+LIMITES_DURACION = [15, 30, 60, 120]
+TRAMOS_DURACION = ["<15 min", "15-29 min", "30-59 min", "1-2 h", "2 h o más"]
+NOMBRES_DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+def _semana(ordinal):
+    # El ordinal 1 (0001-01-01) es lunes, así que las semanas empiezan en lunes
+    return (ordinal - 1) // 7
+
+
+def _tramo(duracion):
+    for i, limite in enumerate(LIMITES_DURACION):
+        if duracion < limite:
+            return i
+    return len(LIMITES_DURACION)
+
+
+class MotorAnalitica:
+    """Estadísticas sobre las columnas de sesiones (ColumnasSesiones).
+
+    Con NumPy todo son operaciones vectorizadas (bincount y reducciones por
+    grupo); sin NumPy se recorren los arrays en Python con el mismo resultado.
+    Todos los métodos devuelven tipos de Python normales.
+    """
+
+    def __init__(self, columnas, usar_numpy=True):
+        self.columnas = columnas
+        self.usar_numpy = usar_numpy and np is not None
+        self._arrays = None
+        self._filas_copiadas = -1
+
+    # ===== SELECCIÓN DE FILAS =====
+
+    def _numpy(self, usuario_id=None):
+        """Arrays NumPy de todas las sesiones o solo las del usuario"""
+        if self._filas_copiadas != len(self.columnas):
+            self._arrays = self.columnas.a_numpy()
+            self._filas_copiadas = len(self.columnas)
+        if usuario_id is None:
+            return self._arrays
+        filas = np.array(self.columnas.filas_de(usuario_id), dtype=np.int64)
+        return {nombre: columna[filas] for nombre, columna in self._arrays.items()}
+
+    def _filas(self, usuario_id=None):
+        if usuario_id is None:
+            return range(len(self.columnas))
+        return self.columnas.filas_de(usuario_id)
+
+    # ===== CONSULTAS =====
+
+    def resumen(self, usuario_id=None):
+        """Sesiones, minutos, medias y días distintos con actividad"""
+        if self.usar_numpy:
+            c = self._numpy(usuario_id)
+            sesiones = len(c["duracion"])
+            if sesiones == 0:
+                return self._resumen_vacio()
+            tiempo_total = int(c["duracion"].sum(dtype=np.int64))
+            satisfaccion = float(c["puntuacion"].mean(dtype=np.float64))
+            dias_activos = int(np.unique(c["fecha"][c["fecha"] > 0]).size)
+        else:
+            filas = self._filas(usuario_id)
+            sesiones = len(filas)
+            if sesiones == 0:
+                return self._resumen_vacio()
+            duracion, puntuacion, fecha = self.columnas.duracion, self.columnas.puntuacion, self.columnas.fecha
+            tiempo_total = sum(duracion[f] for f in filas)
+            satisfaccion = sum(puntuacion[f] for f in filas) / sesiones
+            dias_activos = len({fecha[f] for f in filas if fecha[f] > 0})
+
+        return {
+            "sesiones": sesiones,
+            "tiempo_total": tiempo_total,
+            "duracion_media": tiempo_total / sesiones,
+            "satisfaccion_media": satisfaccion,
+            "dias_activos": dias_activos
+        }
+
+    def _resumen_vacio(self):
+        return {"sesiones": 0, "tiempo_total": 0, "duracion_media": 0, "satisfaccion_media": 0, "dias_activos": 0}
+
+    def histograma_horas(self, usuario_id=None):
+        """Sesiones por hora del día (lista de 24)"""
+        if self.usar_numpy:
+            minuto = self._numpy(usuario_id)["minuto"]
+            return np.bincount(minuto[minuto >= 0] // 60, minlength=24).tolist()
+
+        horas = [0] * 24
+        minuto = self.columnas.minuto
+        for f in self._filas(usuario_id):
+            if minuto[f] >= 0:
+                horas[minuto[f] // 60] += 1
+        return horas
+
+    def histograma_dias(self, usuario_id=None):
+        """Sesiones por día de la semana, de lunes a domingo (lista de 7)"""
+        if self.usar_numpy:
+            fecha = self._numpy(usuario_id)["fecha"]
+            return np.bincount((fecha[fecha > 0] - 1) % 7, minlength=7).tolist()
+
+        dias = [0] * 7
+        fecha = self.columnas.fecha
+        for f in self._filas(usuario_id):
+            if fecha[f] > 0:
+                dias[(fecha[f] - 1) % 7] += 1
+        return dias
+
+    def tramos_duracion(self, usuario_id=None):
+        """Sesiones por tramo de duración, en el orden de TRAMOS_DURACION"""
+        if self.usar_numpy:
+            duracion = self._numpy(usuario_id)["duracion"]
+            tramos = np.searchsorted(LIMITES_DURACION, duracion, side="right")
+            return np.bincount(tramos, minlength=len(TRAMOS_DURACION)).tolist()
+
+        tramos = [0] * len(TRAMOS_DURACION)
+        duracion = self.columnas.duracion
+        for f in self._filas(usuario_id):
+            tramos[_tramo(duracion[f])] += 1
+        return tramos
+
+    def tendencia_semanal(self, usuario_id=None, semanas=8):
+        """Sesiones y satisfacción media de las últimas semanas con datos.
+
+        Devuelve una lista de (lunes "YYYY-MM-DD", sesiones, satisfacción media)
+        empezando por la semana más antigua; las semanas sin sesiones se omiten.
+        """
+        if self.usar_numpy:
+            c = self._numpy(usuario_id)
+            validas = c["fecha"] > 0
+            if not validas.any():
+                return []
+            semana = _semana(c["fecha"][validas].astype(np.int64))
+            desde = int(semana.max()) - semanas + 1
+            recientes = semana >= desde
+            grupo = semana[recientes] - desde
+            conteo = np.bincount(grupo, minlength=semanas)
+            suma = np.bincount(grupo, weights=c["puntuacion"][validas][recientes], minlength=semanas)
+            pares = [(int(n), float(s)) for n, s in zip(conteo, suma)]
+        else:
+            fecha, puntuacion = self.columnas.fecha, self.columnas.puntuacion
+            filas = [f for f in self._filas(usuario_id) if fecha[f] > 0]
+            if not filas:
+                return []
+            desde = max(_semana(fecha[f]) for f in filas) - semanas + 1
+            pares = [[0, 0.0] for _ in range(semanas)]
+            for f in filas:
+                grupo = _semana(fecha[f]) - desde
+                if grupo >= 0:
+                    pares[grupo][0] += 1
+                    pares[grupo][1] += puntuacion[f]
+
+        return [(date.fromordinal((desde + i) * 7 + 1).strftime("%Y-%m-%d"), n, s / n)
+                for i, (n, s) in enumerate(pares) if n]
+
+    def totales_por_usuario(self, k=None):
+        """Minutos, sesiones y satisfacción media por usuario, de más a menos minutos.
+
+        Devuelve una lista de (usuario_id, minutos, sesiones, satisfacción media).
+        """
+        usuario_ids = self.columnas.usuario_ids
+        if self.usar_numpy:
+            c = self._numpy()
+            con_usuario = c["usuario"] >= 0
+            usuario = c["usuario"][con_usuario]
+            sesiones = np.bincount(usuario, minlength=len(usuario_ids))
+            minutos = np.bincount(usuario, weights=c["duracion"][con_usuario], minlength=len(usuario_ids))
+            suma = np.bincount(usuario, weights=c["puntuacion"][con_usuario], minlength=len(usuario_ids))
+            orden = np.argsort(-minutos, kind="stable")
+            if k is not None:
+                orden = orden[:k]
+            return [(usuario_ids[i], int(minutos[i]), int(sesiones[i]), float(suma[i] / sesiones[i]))
+                    for i in orden.tolist() if sesiones[i]]
+
+        totales = []
+        duracion, puntuacion = self.columnas.duracion, self.columnas.puntuacion
+        for indice, filas in self.columnas.filas_por_usuario.items():
+            if filas:
+                minutos = sum(duracion[f] for f in filas)
+                media = sum(puntuacion[f] for f in filas) / len(filas)
+                totales.append((usuario_ids[indice], minutos, len(filas), media))
+        totales.sort(key=lambda total: -total[1])
+        return totales[:k] if k is not None else totales
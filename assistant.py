@@ -1,15 +1,38 @@
-import json
+import copy
 import os
 import platform
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from collections import defaultdict, Counter
 from ia_assistant import RecomendadorIA
+from almacenamiento import crear_almacen, datos_vacios
+from indices import IndiceDatos
+from columnas import ColumnasSesiones
+from clasificacion import Clasificacion, nivel_de, puntos_para_siguiente_nivel
+from analitica import NOMBRES_DIAS, TRAMOS_DURACION, MotorAnalitica
+from agregados import agregar_sesion, agregado_usuario, percentiles, satisfaccion_promedio, sincronizar_agregados
+from resumenes import comparar_meses, comparar_semanas, rehacer_resumenes, variacion
+from tendencias import CAIDA_PUNTUACION, detectar_caidas, diferencia
+from mapa_calor import filas_mapa, mejor_celda, valores_celda
+from temas import CATALOGO
+from reconstruccion import avanzar_usuario, orden_cronologico, reconstruir_historial, reconstruir_usuario
+from importacion import en_lotes, normalizar_sesion
+from exportacion import (CAMPOS_AGREGADO, CAMPOS_PLAN, CAMPOS_SESION, escribir_filas, filas_agregados,
+                         filas_planes, filas_sesiones)
+from logros import (LOGROS_DISPONIBLES, PUNTOS_PLAN_COMPLETADO, PUNTOS_PLAN_IA, PUNTOS_PLAN_MANUAL,
+                    avanzar_racha, evaluar_logros, incremento_progreso, puntos_sesion, racha_vacia)
 
 class AsistenteAprendizaje:
-    def __init__(self):
-        self.archivo_datos = "data/usuarios.json"
+    def __init__(self, almacenamiento=None, carpeta_datos="data"):
+        self.carpeta_datos = carpeta_datos
+        self.archivo_datos = os.path.join(carpeta_datos, "usuarios.json")
         self.crear_carpeta_datos()
-        self.datos = self.cargar_datos()
+        # "json" reescribe el archivo completo; "diario" solo añade cambios
+        tipo_almacen = almacenamiento or os.environ.get("ASISTENTE_ALMACENAMIENTO", "json")
+        self.almacen = crear_almacen(tipo_almacen, self.archivo_datos)
+        self.cambios_pendientes = []
+        self.nivel_transaccion = 0
+        self.preparar_datos(self.cargar_datos())
         self.logros_disponibles = self.init_logros()
     
     def limpiar_pantalla(self):
@@ -21,60 +44,265 @@ class AsistenteAprendizaje:
             os.system('clear')
     
     def crear_carpeta_datos(self):
-        if not os.path.exists("data"):
-            os.makedirs("data")
-            print("📁 Carpeta 'data' creada")
+        if not os.path.exists(self.carpeta_datos):
+            os.makedirs(self.carpeta_datos)
+            print(f"📁 Carpeta '{self.carpeta_datos}' creada")
     
     def cargar_datos(self):
-        if os.path.exists(self.archivo_datos):
-            try:
-                with open(self.archivo_datos, 'r', encoding='utf-8') as f:
-                    datos = json.load(f)
-                    # Asegurar que existan todas las claves necesarias
-                    if "puntos" not in datos:
-                        datos["puntos"] = {}
-                    if "logros" not in datos:
-                        datos["logros"] = {}
-                    if "rachas" not in datos:
-                        datos["rachas"] = {}
-                    return datos
-            except:
-                print("⚠️ Error al cargar datos, creando archivo nuevo")
-                return self.datos_vacios()
-        return self.datos_vacios()
+        try:
+            datos = self.almacen.cargar()
+        except:
+            print("⚠️ Error al cargar datos, creando archivo nuevo")
+            return self.datos_vacios()
+        
+        if datos is None:
+            return self.datos_vacios()
+        
+        # Asegurar que existan todas las claves necesarias
+        if "puntos" not in datos:
+            datos["puntos"] = {}
+        if "logros" not in datos:
+            datos["logros"] = {}
+        if "rachas" not in datos:
+            datos["rachas"] = {}
+        if "version" not in datos:
+            datos["version"] = 0
+        return datos
     
     def datos_vacios(self):
-        return {
-            "usuarios": {},
-            "planes": {},
-            "sesiones": [],
-            "puntos": {},
-            "logros": {},
-            "rachas": {}
-        }
+        return datos_vacios()
+    
+    def preparar_datos(self, datos):
+        """Instala los datos cargados y construye las estructuras derivadas"""
+        self.datos = datos
+        self.indices = IndiceDatos(self.datos)
+        self.columnas = ColumnasSesiones(self.datos, self.almacen.columnas_guardadas)
+        self.almacen.columnas_guardadas = None
+        self.clasificacion = Clasificacion(self.datos["puntos"])
+        self.analitica = MotorAnalitica(self.columnas)
+        sincronizar_agregados(self.datos, self.indices)
     
     def init_logros(self):
-        return {
-            "primer_dia": {"nombre": "🌱 Primer Paso", "descripcion": "Completar primera sesión", "puntos": 10},
-            "racha_3": {"nombre": "🔥 En Racha", "descripcion": "3 días consecutivos", "puntos": 25},
-            "racha_7": {"nombre": "⚡ Imparable", "descripcion": "7 días consecutivos", "puntos": 50},
-            "racha_30": {"nombre": "👑 Leyenda", "descripcion": "30 días consecutivos", "puntos": 200},
-            "madrugador": {"nombre": "🌅 Madrugador", "descripcion": "Estudiar antes de las 8am", "puntos": 15},
-            "nocturno": {"nombre": "🌙 Búho Nocturno", "descripcion": "Estudiar después de las 10pm", "puntos": 15},
-            "maraton": {"nombre": "🏃 Maratón", "descripcion": "Sesión de más de 2 horas", "puntos": 30},
-            "consistente": {"nombre": "🎯 Consistente", "descripcion": "10 sesiones completadas", "puntos": 40},
-            "explorador": {"nombre": "🗺️ Explorador", "descripcion": "Estudiar 3 temas diferentes", "puntos": 35},
-            "perfeccionista": {"nombre": "💎 Perfeccionista", "descripcion": "5 sesiones con puntuación 9+", "puntos": 45}
-        }
+        return dict(LOGROS_DISPONIBLES)
+    
+    def registrar_cambio(self, op, **campos):
+        """Anota un cambio para que el almacén lo persista en el próximo guardado"""
+        self.datos["version"] += 1
+        cambio = {"op": op, "version": self.datos["version"]}
+        cambio.update(campos)
+        self.cambios_pendientes.append(cambio)
+        self.indices.aplicar_cambio(cambio)
+        if op == "sesion":
+            self.columnas.agregar(cambio["sesion"])
+            agregar_sesion(self.datos, cambio["sesion"])
+        elif op == "puntos":
+            self.clasificacion.actualizar(cambio["usuario_id"], cambio["total"])
+        elif op == "usuario":
+            self.clasificacion.actualizar(cambio["usuario_id"], self.datos["puntos"].get(cambio["usuario_id"], 0))
+    
+    @contextmanager
+    def transaccion(self):
+        """Agrupa todos los cambios del bloque en una única escritura al terminar.
+        
+        Las llamadas a guardar_datos dentro del bloque no escriben nada; si el
+        bloque falla se descartan los cambios y se recargan los datos guardados.
+        """
+        self.nivel_transaccion += 1
+        try:
+            yield
+        except BaseException:
+            self.nivel_transaccion -= 1
+            if self.nivel_transaccion == 0:
+                self.deshacer_cambios()
+            raise
+        self.nivel_transaccion -= 1
+        if self.nivel_transaccion == 0:
+            self.guardar_datos()
+    
+    def deshacer_cambios(self):
+        """Descarta los cambios sin guardar volviendo al último estado persistido"""
+        self.cambios_pendientes = []
+        self.preparar_datos(self.cargar_datos())
     
     def guardar_datos(self):
+        # Dentro de una transacción se escribe una sola vez, al confirmar
+        if self.nivel_transaccion > 0 or not self.cambios_pendientes:
+            return
+        
         try:
-            with open(self.archivo_datos, 'w', encoding='utf-8') as f:
-                json.dump(self.datos, f, indent=2, ensure_ascii=False)
+            self.almacen.guardar(self.datos, self.cambios_pendientes)
+            self.cambios_pendientes = []
             print("💾 Datos guardados correctamente")
         except Exception as e:
             print(f"❌ Error al guardar: {e}")
     
+    def cerrar(self):
+        """Guarda lo pendiente y deja el almacén listo para el próximo arranque"""
+        self.guardar_datos()
+        if self.cambios_pendientes:
+            # No se pudo guardar: la copia de arranque no debe adelantarse al disco
+            return
+        try:
+            self.almacen.cerrar(self.datos, self.columnas)
+        except Exception as e:
+            print(f"❌ Error al cerrar el almacenamiento: {e}")
+    
+    def compactar_datos(self):
+        """Reescribe la instantánea completa y vacía el diario de cambios"""
+        try:
+            self.almacen.compactar(self.datos, self.columnas)
+            self.cambios_pendientes = []
+            print("🗜️ Datos compactados correctamente")
+        except Exception as e:
+            print(f"❌ Error al compactar: {e}")
+    
+    def reconstruir_estado(self, procesos=None):
+        """Recalcula puntos, rachas, logros, progreso y resúmenes repitiendo todo el historial"""
+        resultados = reconstruir_historial(self.datos, self.indices, procesos)
+        
+        cambiados = set()
+        for usuario_id, resultado in resultados.items():
+            antes = (self.datos["puntos"].get(usuario_id), self.datos["rachas"].get(usuario_id),
+                     sorted(self.datos["logros"].get(usuario_id, [])),
+                     {p: self.datos["planes"][p]["progreso"] for p in resultado["progreso"]})
+            despues = (resultado["puntos"], resultado["racha"], sorted(resultado["logros"]), resultado["progreso"])
+            if antes == despues:
+                continue
+            
+            cambiados.add(usuario_id)
+            self.datos["puntos"][usuario_id] = resultado["puntos"]
+            self.clasificacion.actualizar(usuario_id, resultado["puntos"])
+            self.datos["rachas"][usuario_id] = resultado["racha"]
+            self.datos["logros"][usuario_id] = resultado["logros"]
+            for plan_id, progreso in resultado["progreso"].items():
+                self.datos["planes"][plan_id]["progreso"] = progreso
+        
+        # Los resúmenes por día y semana se rehacen también desde las sesiones
+        for usuario_id, sesiones in self.indices.sesiones_por_usuario.items():
+            agregado = self.datos["agregados"]["usuarios"].get(usuario_id)
+            if agregado is not None and rehacer_resumenes(agregado, sesiones):
+                cambiados.add(usuario_id)
+        
+        # Se reescribe todo de una vez: los cambios del diario no saben quitar logros
+        if cambiados:
+            self.datos["version"] += 1
+            self.compactar_datos()
+        print(f"🔁 {len(resultados)} usuario(s) reconstruidos, {len(cambiados)} con cambios")
+        return {"usuarios": len(resultados), "cambiados": len(cambiados)}
+    
+    def importar_sesiones(self, filas, tam_lote=10000):
+        """Importa sesiones con fecha propia, en cualquier orden, confirmando un lote cada vez.
+        
+        Cada fila es un diccionario como los de leer_filas. Los usuarios que
+        reciben sesiones anteriores a su última fecha se recalculan una sola vez
+        al final, repitiendo su historial ordenado. Devuelve el número de sesiones
+        importadas y las filas rechazadas como (número de fila, motivo).
+        """
+        importadas = 0
+        rechazadas = []
+        desordenados = set()
+        
+        for numero_lote, lote in enumerate(en_lotes(filas, tam_lote)):
+            por_usuario = defaultdict(list)
+            for numero_fila, fila in enumerate(lote, numero_lote * tam_lote + 1):
+                try:
+                    sesion = normalizar_sesion(fila)
+                except (TypeError, ValueError) as e:
+                    rechazadas.append((numero_fila, str(e)))
+                    continue
+                plan = self.datos["planes"].get(sesion["plan_id"])
+                if plan is None:
+                    rechazadas.append((numero_fila, f"plan '{sesion['plan_id']}' no encontrado"))
+                    continue
+                por_usuario[plan["usuario_id"]].append(sesion)
+            
+            with self.transaccion():
+                for usuario_id, sesiones in por_usuario.items():
+                    sesiones.sort(key=orden_cronologico)
+                    racha_data = self.datos["rachas"].get(usuario_id) or racha_vacia()
+                    if usuario_id not in desordenados and (racha_data["ultima_fecha"] is None
+                                                           or sesiones[0]["fecha"] >= racha_data["ultima_fecha"]):
+                        # Todas son posteriores a lo ya registrado: se sigue desde el estado actual
+                        estado = self._estado_usuario(usuario_id)
+                        avanzar_usuario(estado, estado["planes"], sesiones)
+                        self._agregar_sesiones(sesiones)
+                        self._fijar_estado_usuario(usuario_id, estado, "Importación de sesiones")
+                    else:
+                        # La racha y los bonus dependen del orden: se rehace al final
+                        desordenados.add(usuario_id)
+                        self._agregar_sesiones(sesiones)
+                    importadas += len(sesiones)
+            print(f"📥 Lote {numero_lote + 1}: {importadas} sesiones importadas hasta ahora")
+        
+        if desordenados:
+            with self.transaccion():
+                for usuario_id in desordenados:
+                    planes = self.indices.planes_de(usuario_id)
+                    estado = reconstruir_usuario(planes, self.indices.sesiones_de(usuario_id))
+                    self._fijar_estado_usuario(usuario_id, estado, "Importación de sesiones")
+            print(f"🔁 {len(desordenados)} usuario(s) con sesiones anteriores recalculados")
+        
+        return {"importadas": importadas, "rechazadas": rechazadas}
+    
+    def _agregar_sesiones(self, sesiones):
+        for sesion in sesiones:
+            self.datos["sesiones"].append(sesion)
+            self.registrar_cambio("sesion", sesion=sesion)
+    
+    def _estado_usuario(self, usuario_id):
+        """Copia del estado de gamificación de un usuario, para avanzar_usuario"""
+        planes = self.indices.planes_de(usuario_id)
+        return {
+            "planes": planes,
+            "puntos": self.datos["puntos"].get(usuario_id, 0),
+            "racha": dict(self.datos["rachas"].get(usuario_id) or racha_vacia()),
+            "logros": list(self.datos["logros"].get(usuario_id, [])),
+            "progreso": {plan_id: plan["progreso"] for plan_id, plan in planes.items()},
+            "reglas": copy.deepcopy(agregado_usuario(self.datos, usuario_id).get("reglas", {}))
+        }
+    
+    def _fijar_estado_usuario(self, usuario_id, estado, razon):
+        """Guarda progreso, puntos, racha y logros calculados para un usuario"""
+        for plan_id, progreso in estado["progreso"].items():
+            plan = self.datos["planes"][plan_id]
+            if plan["progreso"] != progreso:
+                plan["progreso"] = progreso
+                self.registrar_cambio("progreso", plan_id=plan_id, progreso=progreso)
+        
+        puntos_anteriores = self.datos["puntos"].get(usuario_id, 0)
+        if estado["puntos"] != puntos_anteriores:
+            self.datos["puntos"][usuario_id] = estado["puntos"]
+            self.registrar_cambio("puntos", usuario_id=usuario_id, puntos=estado["puntos"] - puntos_anteriores,
+                                  total=estado["puntos"], razon=razon)
+        
+        if estado["racha"] != self.datos["rachas"].get(usuario_id):
+            self.datos["rachas"][usuario_id] = estado["racha"]
+            self.registrar_cambio("racha", usuario_id=usuario_id, racha=estado["racha"])
+        
+        logros_usuario = self.datos["logros"].setdefault(usuario_id, [])
+        for logro in estado["logros"]:
+            if logro not in logros_usuario:
+                logros_usuario.append(logro)
+                self.registrar_cambio("logro", usuario_id=usuario_id, logro=logro)
+    
+    def exportar(self, que, archivo, usuario_id=None, desde=None, hasta=None, tema=None):
+        """Exporta sesiones, planes o agregados a CSV/JSONL fila a fila, sin listas intermedias"""
+        if que == "sesiones":
+            filas = filas_sesiones(self.datos, self.indices, usuario_id, desde, hasta, tema)
+            campos = CAMPOS_SESION
+        elif que == "planes":
+            filas = filas_planes(self.datos, self.indices, usuario_id, tema)
+            campos = CAMPOS_PLAN
+        elif que == "agregados":
+            filas = filas_agregados(self.datos, usuario_id)
+            campos = CAMPOS_AGREGADO
+        else:
+            raise ValueError(f"No se puede exportar '{que}'. Opciones: sesiones, planes, agregados")
+        
+        total = escribir_filas(filas, archivo, campos)
+        print(f"📤 {total} fila(s) exportada(s) a {archivo}")
+        return total
+    
     def crear_usuario(self):
         print("\n📝 Crear nuevo perfil")
         nombre = input("Tu nombre: ").strip()
@@ -113,21 +341,7 @@ class AsistenteAprendizaje:
         else:
             intereses = [i.strip().lower() for i in intereses_input.split(",") if i.strip()]
         
-        usuario_id = f"user_{len(self.datos['usuarios']) + 1}"
-        
-        self.datos["usuarios"][usuario_id] = {
-            "nombre": nombre,
-            "nivel": nivel,
-            "intereses": intereses,
-            "fecha_registro": datetime.now().strftime("%Y-%m-%d")
-        }
-        
-        # Inicializar datos de gamificación
-        self.datos["puntos"][usuario_id] = 0
-        self.datos["logros"][usuario_id] = []
-        self.datos["rachas"][usuario_id] = {"actual": 0, "maxima": 0, "ultima_fecha": None}
-        
-        self.guardar_datos()
+        usuario_id = self.registrar_usuario(nombre, nivel, intereses)
         
         self.limpiar_pantalla()
         print("🎉 ¡USUARIO CREADO EXITOSAMENTE!")
@@ -138,6 +352,24 @@ class AsistenteAprendizaje:
         print(f"🆔 Tu ID es: {usuario_id}")
         print(f"🎮 ¡Empiezas con 0 puntos! ¡A ganar logros!")
     
+    def registrar_usuario(self, nombre, nivel="principiante", intereses=None):
+        """Crea un usuario sin preguntar nada y devuelve su id; sin intereses usa ["programación"]"""
+        usuario_id = f"user_{len(self.datos['usuarios']) + 1}"
+        with self.transaccion():
+            self.datos["usuarios"][usuario_id] = {
+                "nombre": nombre,
+                "nivel": nivel,
+                "intereses": ["programación"] if intereses is None else intereses,
+                "fecha_registro": datetime.now().strftime("%Y-%m-%d")
+            }
+            
+            # Inicializar datos de gamificación
+            self.datos["puntos"][usuario_id] = 0
+            self.datos["logros"][usuario_id] = []
+            self.datos["rachas"][usuario_id] = racha_vacia()
+            self.registrar_cambio("usuario", usuario_id=usuario_id, usuario=self.datos["usuarios"][usuario_id])
+        return usuario_id
+    
     def crear_plan_estudio(self):
         if not self.datos["usuarios"]:
             print("❌ Primero debes crear un usuario")
@@ -184,27 +416,9 @@ class AsistenteAprendizaje:
             dias = 30
             print("⚠️ Usando 30 días por defecto")
         
-        # Generar objetivos y recursos automáticamente
-        objetivos = self.generar_objetivos(tema, usuario["nivel"])
-        recursos = self.generar_recursos(tema)
-        
-        plan_id = f"plan_{len(self.datos['planes']) + 1}"
-        fecha_limite = (datetime.now() + timedelta(days=dias)).strftime("%Y-%m-%d")
-        
-        self.datos["planes"][plan_id] = {
-            "usuario_id": usuario_id,
-            "tema": tema,
-            "objetivos": objetivos,
-            "recursos": recursos,
-            "progreso": 0,
-            "fecha_creacion": datetime.now().strftime("%Y-%m-%d"),
-            "fecha_limite": fecha_limite
-        }
-        
-        # Bonus por crear plan
-        self.agregar_puntos(usuario_id, 5, "Crear nuevo plan de estudio")
-        
-        self.guardar_datos()
+        plan_id = self.crear_plan(usuario_id, tema, dias)
+        plan = self.datos["planes"][plan_id]
+        objetivos, recursos, fecha_limite = plan["objetivos"], plan["recursos"], plan["fecha_limite"]
         
         self.limpiar_pantalla()
         print("🎉 ¡PLAN CREADO EXITOSAMENTE!")
@@ -222,74 +436,83 @@ class AsistenteAprendizaje:
         for i, rec in enumerate(recursos, 1):
             print(f"   {i}. {rec}")
     
-    def generar_objetivos(self, tema, nivel):
-        objetivos_base = {
-            "python": {
-                "principiante": [
-                    "Aprender sintaxis básica de Python",
-                    "Crear tu primer programa 'Hola Mundo'", 
-                    "Entender variables, listas y loops",
-                    "Hacer ejercicios básicos de programación"
-                ],
-                "intermedio": [
-                    "Dominar funciones y módulos",
-                    "Trabajar con archivos y datos",
-                    "Usar librerías populares como requests",
-                    "Crear un proyecto pequeño completo"
-                ],
-                "avanzado": [
-                    "Programación orientada a objetos",
-                    "APIs y web scraping",
-                    "Optimización y testing de código",
-                    "Desplegar aplicaciones"
-                ]
-            },
-            "matemáticas": {
-                "principiante": [
-                    "Dominar operaciones básicas",
-                    "Entender fracciones y decimales", 
-                    "Geometría básica y áreas",
-                    "Resolver problemas cotidianos"
-                ],
-                "intermedio": [
-                    "Álgebra y ecuaciones",
-                    "Trigonometría básica",
-                    "Estadística y probabilidad",
-                    "Funciones y gráficas"
-                ],
-                "avanzado": [
-                    "Cálculo diferencial e integral",
-                    "Álgebra lineal",
-                    "Estadística avanzada",
-                    "Matemáticas aplicadas"
-                ]
-            },
-            "inglés": {
-                "principiante": [
-                    "Vocabulario básico (500 palabras)",
-                    "Presente simple y continuo",
-                    "Conversación básica diaria",
-                    "Comprensión de textos simples"
-                ],
-                "intermedio": [
-                    "Todos los tiempos verbales",
-                    "Escritura de párrafos",
-                    "Comprensión auditiva",
-                    "Conversación fluida"
-                ],
-                "avanzado": [
-                    "Inglés de negocios",
-                    "Literatura y textos complejos",
-                    "Preparación para exámenes oficiales",
-                    "Presentaciones y debates"
-                ]
-            }
+    def crear_plan(self, usuario_id, tema, dias=30, plan_ia=None, mostrar=True):
+        """Crea un plan sin preguntar nada y da el bonus de creación; devuelve su id.
+        
+        Con plan_ia (lo que devuelve generar_plan_personalizado) el plan usa sus
+        objetivos y recursos y cuenta como generado con IA.
+        """
+        plan_id = f"plan_{len(self.datos['planes']) + 1}"
+        hoy = datetime.now()
+        if plan_ia is None:
+            objetivos = self.generar_objetivos(tema, self.datos["usuarios"][usuario_id]["nivel"])
+            recursos = self.generar_recursos(tema)
+        else:
+            objetivos, recursos = plan_ia["objetivos"], plan_ia["recursos"]
+        
+        plan = {
+            "usuario_id": usuario_id,
+            "tema": tema,
+            "objetivos": objetivos,
+            "recursos": recursos,
+            "progreso": 0,
+            "fecha_creacion": hoy.strftime("%Y-%m-%d"),
+            "fecha_limite": (hoy + timedelta(days=dias)).strftime("%Y-%m-%d")
         }
+        if plan_ia is not None:
+            plan["generado_con_ia"] = True
+            plan["duracion_recomendada"] = plan_ia["duracion_recomendada"]
+        
+        with self.transaccion():
+            self.datos["planes"][plan_id] = plan
+            self.registrar_cambio("plan", plan_id=plan_id, plan=plan)
+            if plan_ia is None:
+                self.agregar_puntos(usuario_id, PUNTOS_PLAN_MANUAL, "Crear nuevo plan de estudio", mostrar)
+            else:
+                self.agregar_puntos(usuario_id, PUNTOS_PLAN_IA, "Crear plan personalizado con IA", mostrar)
+        return plan_id
+    
+    def crear_planes_lote(self, filas, con_ia=False):
+        """Crea un plan por fila (usuario_id, tema y dias opcional) con una sola escritura.
+        
+        Los temas se resuelven con el catálogo cacheado y, con con_ia, los planes
+        se personalizan con un único RecomendadorIA para todo el lote. Devuelve
+        los ids creados y las filas rechazadas como (número de fila, motivo).
+        """
+        creados = []
+        rechazadas = []
+        recomendador = RecomendadorIA(self.datos, self.indices, self.columnas) if con_ia else None
+        
+        with self.transaccion():
+            for numero_fila, fila in enumerate(filas, 1):
+                # En JSONL los valores pueden llegar como números
+                usuario_id = str(fila.get("usuario_id") or "").strip()
+                tema = str(fila.get("tema") or "").strip()
+                if usuario_id not in self.datos["usuarios"]:
+                    rechazadas.append((numero_fila, f"usuario '{usuario_id}' no encontrado"))
+                    continue
+                if not tema:
+                    rechazadas.append((numero_fila, "falta el tema"))
+                    continue
+                dias = fila.get("dias")
+                try:
+                    dias = 30 if dias is None or dias == "" else int(dias)
+                except (TypeError, ValueError):
+                    rechazadas.append((numero_fila, f"días no válidos: {dias!r}"))
+                    continue
+                if dias <= 0:
+                    rechazadas.append((numero_fila, "los días deben ser mayores a 0"))
+                    continue
+                
+                plan_ia = recomendador.generar_plan_personalizado(usuario_id, tema) if con_ia else None
+                creados.append(self.crear_plan(usuario_id, tema, dias, plan_ia, mostrar=False))
         
-        tema_lower = tema.lower()
-        for key in objetivos_base:
-            if key in tema_lower:
-                return objetivos_base[key][nivel]
+        return {"creados": creados, "rechazadas": rechazadas}
+    
+    def generar_objetivos(self, tema, nivel):
+        objetivos = CATALOGO.seccion(tema, "objetivos")
+        if objetivos and nivel in objetivos:
+            return objetivos[nivel]
         
         # Objetivos genéricos si no encuentra el tema específico
         return [
@@ -300,37 +523,9 @@ class AsistenteAprendizaje:
         ]
     
     def generar_recursos(self, tema):
-        recursos_base = {
-            "python": [
-                "🌐 Curso gratuito en freeCodeCamp",
-                "📚 Libro: Python Crash Course",
-                "💻 Práctica en HackerRank/LeetCode",
-                "🎥 Videos de programación en YouTube"
-            ],
-            "matemáticas": [
-                "🎓 Khan Academy (gratis)",
-                "📖 Libro de texto recomendado",  
-                "🎥 Canal de YouTube: Profesor10demates",
-                "📱 App: Photomath para verificar"
-            ],
-            "inglés": [
-                "🦜 Duolingo para vocabulario",
-                "🎧 Podcasts: BBC Learning English",
-                "💬 Intercambio de idiomas online",
-                "📺 Series/películas con subtítulos"
-            ],
-            "diseño": [
-                "🎨 Canva para practicar",
-                "🎥 Tutoriales de Adobe en YouTube",
-                "📚 Libro: The Design of Everyday Things",
-                "🖼️ Inspiración en Dribbble/Behance"
-            ]
-        }
-        
-        tema_lower = tema.lower()
-        for key in recursos_base:
-            if key in tema_lower:
-                return recursos_base[key]
+        recursos = CATALOGO.seccion(tema, "recursos")
+        if recursos:
+            return recursos
         
         # Recursos genéricos
         return [
@@ -386,24 +581,11 @@ class AsistenteAprendizaje:
         print("\n📊 ESTADÍSTICAS GENERALES")
         print("=" * 30)
         
-        # Estadísticas por usuario
-        estadisticas_usuario = defaultdict(lambda: {
-            "total_tiempo": 0,
-            "total_sesiones": 0,
-            "puntuacion_promedio": 0,
-            "temas_estudiados": set()
-        })
-        
-        for sesion in self.datos["sesiones"]:
-            plan = self.datos["planes"][sesion["plan_id"]]
-            usuario_id = plan["usuario_id"]
+        # Estadísticas por usuario (agregados mantenidos al registrar sesiones)
+        for usuario_id, stats in self.datos["agregados"]["usuarios"].items():
+            if stats["sesiones"] == 0:
+                continue
             
-            estadisticas_usuario[usuario_id]["total_tiempo"] += sesion["duracion"]
-            estadisticas_usuario[usuario_id]["total_sesiones"] += 1
-            estadisticas_usuario[usuario_id]["puntuacion_promedio"] += sesion["puntuacion"]
-            estadisticas_usuario[usuario_id]["temas_estudiados"].add(plan["tema"])
-        
-        for usuario_id, stats in estadisticas_usuario.items():
             usuario = self.datos["usuarios"][usuario_id]
             puntos = self.datos["puntos"].get(usuario_id, 0)
             racha_actual = self.datos["rachas"].get(usuario_id, {}).get("actual", 0)
@@ -411,14 +593,10 @@ class AsistenteAprendizaje:
             print(f"\n👤 {usuario['nombre']}")
             print(f"🎮 Puntos: {puntos}")
             print(f"🔥 Racha actual: {racha_actual} días")
-            print(f"⏱️ Tiempo total: {stats['total_tiempo']} minutos")
-            print(f"📚 Sesiones: {stats['total_sesiones']}")
-            
-            if stats['total_sesiones'] > 0:
-                promedio = stats['puntuacion_promedio'] / stats['total_sesiones']
-                print(f"😊 Satisfacción promedio: {promedio:.1f}/10")
-            
-            print(f"🗺️ Temas explorados: {len(stats['temas_estudiados'])}")
+            print(f"⏱️ Tiempo total: {stats['tiempo_total']} minutos")
+            print(f"📚 Sesiones: {stats['sesiones']}")
+            print(f"😊 Satisfacción promedio: {satisfaccion_promedio(stats):.1f}/10")
+            print(f"🗺️ Temas explorados: {len(stats['temas'])}")
             
             # Mostrar progreso visual del nivel
             nivel_actual = self.calcular_nivel(puntos)
@@ -428,29 +606,10 @@ class AsistenteAprendizaje:
                 print(f"📈 Faltan {puntos_siguiente} puntos para subir de nivel")
     
     def calcular_nivel(self, puntos):
-        if puntos < 50:
-            return 1
-        elif puntos < 150:
-            return 2
-        elif puntos < 300:
-            return 3
-        elif puntos < 500:
-            return 4
-        else:
-            return 5 + (puntos - 500) // 200
+        return nivel_de(puntos)
     
     def puntos_para_siguiente_nivel(self, puntos):
-        if puntos < 50:
-            return 50 - puntos
-        elif puntos < 150:
-            return 150 - puntos
-        elif puntos < 300:
-            return 300 - puntos
-        elif puntos < 500:
-            return 500 - puntos
-        else:
-            siguiente_nivel = ((puntos - 500) // 200 + 1) * 200 + 500
-            return siguiente_nivel - puntos
+        return puntos_para_siguiente_nivel(puntos)
     
     def registrar_sesion(self):
         if not self.datos["planes"]:
@@ -506,39 +665,13 @@ class AsistenteAprendizaje:
         
         notas = input("\nNotas sobre esta sesión (opcional): ").strip()
         
-        # Calcular progreso basado en duración y puntuación
-        incremento = min(10, max(3, duracion // 15))
-        
-        # Actualizar progreso
-        progreso_anterior = self.datos["planes"][plan_id]["progreso"]
-        nuevo_progreso = min(100, progreso_anterior + incremento)
-        self.datos["planes"][plan_id]["progreso"] = round(nuevo_progreso, 1)
-        
-        # Registrar sesión
-        sesion = {
-            "plan_id": plan_id,
-            "duracion": duracion,
-            "puntuacion": puntuacion,
-            "fecha": datetime.now().strftime("%Y-%m-%d"),
-            "hora": datetime.now().strftime("%H:%M"),
-            "notas": notas
-        }
-        
-        self.datos["sesiones"].append(sesion)
-        
-        # Sistema de puntos y logros
-        usuario_id = plan["usuario_id"]
-        
-        puntos_ganados = self.calcular_puntos_sesion(duracion, puntuacion)
-        self.agregar_puntos(usuario_id, puntos_ganados, f"Sesión de {plan['tema']}")
-        
-        # Actualizar racha
-        self.actualizar_racha(usuario_id)
-        
-        # Verificar logros
-        nuevos_logros = self.verificar_logros(usuario_id, duracion, puntuacion, sesion["hora"])
-        
-        self.guardar_datos()
+        resumen = self.aplicar_sesion(plan_id, duracion, puntuacion, notas)
+        usuario_id = resumen["usuario_id"]
+        progreso_anterior = resumen["progreso_anterior"]
+        nuevo_progreso = resumen["progreso_nuevo"]
+        incremento = resumen["incremento"]
+        puntos_ganados = resumen["puntos_ganados"]
+        nuevos_logros = resumen["nuevos_logros"]
         
         # Mostrar resumen final
         self.limpiar_pantalla()
@@ -565,7 +698,7 @@ class AsistenteAprendizaje:
         # Motivación basada en progreso
         if nuevo_progreso >= 100:
             print("\n🎉 ¡FELICITACIONES! ¡Completaste tu plan de estudio!")
-            self.agregar_puntos(usuario_id, 50, "¡Plan completado!")
+            print("🎮 +50 puntos por: ¡Plan completado!")
         elif nuevo_progreso >= 75:
             print("\n🔥 ¡Excelente! Ya casi terminas")
         elif nuevo_progreso >= 50:
@@ -583,108 +716,107 @@ class AsistenteAprendizaje:
         if notas:
             print(f"📝 Notas: {notas}")
     
-    def calcular_puntos_sesion(self, duracion, puntuacion):
-        # Puntos base por duración
-        puntos_base = min(duracion // 10, 20)  # Máximo 20 puntos por duración
+    def aplicar_sesion(self, plan_id, duracion, puntuacion, notas="", fecha=None, hora=None):
+        """Registra una sesión sin interacción y devuelve un resumen de lo ocurrido.
         
-        # Bonus por satisfacción alta
-        if puntuacion >= 8:
-            puntos_base += 5
-        elif puntuacion >= 6:
-            puntos_base += 2
+        Por defecto la sesión es de ahora; fecha ("YYYY-MM-DD") y hora ("HH:MM")
+        permiten registrarla con otra marca de tiempo.
+        """
+        plan = self.datos["planes"][plan_id]
+        usuario_id = plan["usuario_id"]
+        
+        with self.transaccion():
+            # Calcular progreso basado en duración y puntuación
+            incremento = incremento_progreso(duracion)
+            
+            # Actualizar progreso
+            progreso_anterior = plan["progreso"]
+            nuevo_progreso = min(100, progreso_anterior + incremento)
+            plan["progreso"] = round(nuevo_progreso, 1)
+            self.registrar_cambio("progreso", plan_id=plan_id, progreso=plan["progreso"])
+            
+            # Registrar sesión
+            sesion = {
+                "plan_id": plan_id,
+                "duracion": duracion,
+                "puntuacion": puntuacion,
+                "fecha": fecha or datetime.now().strftime("%Y-%m-%d"),
+                "hora": hora or datetime.now().strftime("%H:%M"),
+                "notas": notas
+            }
+            
+            self.datos["sesiones"].append(sesion)
+            self.registrar_cambio("sesion", sesion=sesion)
+            
+            # Sistema de puntos y logros
+            puntos_ganados = self.calcular_puntos_sesion(duracion, puntuacion)
+            self.agregar_puntos(usuario_id, puntos_ganados, f"Sesión de {plan['tema']}")
+            
+            # Actualizar racha
+            self.actualizar_racha(usuario_id, sesion["fecha"])
+            
+            # Verificar logros
+            nuevos_logros = self.verificar_logros(usuario_id, sesion, plan["tema"])
+            
+            # Bonus por completar el plan, dentro de la misma escritura
+            if nuevo_progreso >= 100:
+                self.agregar_puntos(usuario_id, PUNTOS_PLAN_COMPLETADO, "¡Plan completado!")
         
-        return max(puntos_base, 1)  # Mínimo 1 punto
+        return {
+            "usuario_id": usuario_id,
+            "sesion": sesion,
+            "progreso_anterior": progreso_anterior,
+            "progreso_nuevo": nuevo_progreso,
+            "incremento": incremento,
+            "puntos_ganados": puntos_ganados,
+            "nuevos_logros": nuevos_logros
+        }
+    
+    def calcular_puntos_sesion(self, duracion, puntuacion):
+        return puntos_sesion(duracion, puntuacion)
     
-    def agregar_puntos(self, usuario_id, puntos, razon):
+    def agregar_puntos(self, usuario_id, puntos, razon, mostrar=True):
         if usuario_id not in self.datos["puntos"]:
             self.datos["puntos"][usuario_id] = 0
         
         self.datos["puntos"][usuario_id] += puntos
-        print(f"🎮 +{puntos} puntos por: {razon}")
+        self.registrar_cambio("puntos", usuario_id=usuario_id, puntos=puntos,
+                              total=self.datos["puntos"][usuario_id], razon=razon)
+        if mostrar:
+            print(f"🎮 +{puntos} puntos por: {razon}")
     
-    def actualizar_racha(self, usuario_id):
+    def actualizar_racha(self, usuario_id, fecha=None):
         if usuario_id not in self.datos["rachas"]:
-            self.datos["rachas"][usuario_id] = {"actual": 0, "maxima": 0, "ultima_fecha": None}
+            self.datos["rachas"][usuario_id] = racha_vacia()
         
-        fecha_hoy = datetime.now().strftime("%Y-%m-%d")
         racha_data = self.datos["rachas"][usuario_id]
-        
-        # Si es el primer día o ayer no estudió
-        if racha_data["ultima_fecha"] is None:
-            racha_data["actual"] = 1
-        else:
-            fecha_anterior = datetime.strptime(racha_data["ultima_fecha"], "%Y-%m-%d")
-            fecha_actual = datetime.strptime(fecha_hoy, "%Y-%m-%d")
-            diferencia = (fecha_actual - fecha_anterior).days
-            
-            if diferencia == 1:  # Día consecutivo
-                racha_data["actual"] += 1
-            elif diferencia == 0:  # Mismo día, no cambia racha
-                pass
-            else:  # Se rompió la racha
-                racha_data["actual"] = 1
-        
-        # Actualizar racha máxima
-        if racha_data["actual"] > racha_data["maxima"]:
-            racha_data["maxima"] = racha_data["actual"]
-        
-        racha_data["ultima_fecha"] = fecha_hoy
+        avanzar_racha(racha_data, fecha or datetime.now().strftime("%Y-%m-%d"))
+        self.registrar_cambio("racha", usuario_id=usuario_id, racha=racha_data)
         
         # Mostrar racha
         if racha_data["actual"] > 1:
             print(f"🔥 ¡Racha de {racha_data['actual']} días!")
     
-    def verificar_logros(self, usuario_id, duracion, puntuacion, hora):
-        if usuario_id not in self.datos["logros"]:
-            self.datos["logros"][usuario_id] = []
+    def verificar_logros(self, usuario_id, sesion, tema):
+        """Evalúa las reglas suscritas al evento de sesión y otorga los logros nuevos"""
+        logros_usuario = self.datos["logros"].setdefault(usuario_id, [])
+        
+        # El estado de las reglas ya incluye esta sesión (se acumula al registrarla)
+        estado_reglas = agregado_usuario(self.datos, usuario_id).get("reglas", {})
+        contexto = {
+            "sesion": sesion,
+            "tema": tema,
+            "racha": self.datos["rachas"][usuario_id]["actual"]
+        }
+        nuevos_logros = evaluar_logros("sesion", contexto, estado_reglas, logros_usuario)
         
-        logros_usuario = self.datos["logros"][usuario_id]
-        nuevos_logros = []
+        for logro in nuevos_logros:
+            logros_usuario.append(logro)
+            info = self.logros_disponibles[logro]
+            self.agregar_puntos(usuario_id, info["puntos"], f"Logro: {info['nombre'].split(' ', 1)[1]}")
         
-        # Primer día
-        if "primer_dia" not in logros_usuario and len(self.datos["sesiones"]) == 1:
-            logros_usuario.append("primer_dia")
-            nuevos_logros.append("primer_dia")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["primer_dia"]["puntos"], "Logro: Primer Paso")
-        
-        # Rachas
-        racha_actual = self.datos["rachas"][usuario_id]["actual"]
-        if racha_actual >= 30 and "racha_30" not in logros_usuario:
-            logros_usuario.append("racha_30")
-            nuevos_logros.append("racha_30")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["racha_30"]["puntos"], "Logro: Leyenda")
-        elif racha_actual >= 7 and "racha_7" not in logros_usuario:
-            logros_usuario.append("racha_7")
-            nuevos_logros.append("racha_7")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["racha_7"]["puntos"], "Logro: Imparable")
-        elif racha_actual >= 3 and "racha_3" not in logros_usuario:
-            logros_usuario.append("racha_3")
-            nuevos_logros.append("racha_3")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["racha_3"]["puntos"], "Logro: En Racha")
-        
-        # Madrugador / Nocturno
-        hora_num = int(hora.split(":")[0])
-        if hora_num < 8 and "madrugador" not in logros_usuario:
-            logros_usuario.append("madrugador")
-            nuevos_logros.append("madrugador")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["madrugador"]["puntos"], "Logro: Madrugador")
-        elif hora_num >= 22 and "nocturno" not in logros_usuario:
-            logros_usuario.append("nocturno")
-            nuevos_logros.append("nocturno")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["nocturno"]["puntos"], "Logro: Búho Nocturno")
-        
-        # Maratón
-        if duracion >= 120 and "maraton" not in logros_usuario:
-            logros_usuario.append("maraton")
-            nuevos_logros.append("maraton")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["maraton"]["puntos"], "Logro: Maratón")
-        
-        # Consistente
-        sesiones_usuario = [s for s in self.datos["sesiones"] if self.datos["planes"][s["plan_id"]]["usuario_id"] == usuario_id]
-        if len(sesiones_usuario) >= 10 and "consistente" not in logros_usuario:
-            logros_usuario.append("consistente")
-            nuevos_logros.append("consistente")
-            self.agregar_puntos(usuario_id, self.logros_disponibles["consistente"]["puntos"], "Logro: Consistente")
+        for logro in nuevos_logros:
+            self.registrar_cambio("logro", usuario_id=usuario_id, logro=logro)
         
         return nuevos_logros
     
@@ -723,6 +855,40 @@ class AsistenteAprendizaje:
                 print(f"   ... y {len(logros_pendientes) - 3} más")
             
             print("-" * 30)
+        
+        self.mostrar_clasificacion()
+
+    def mostrar_clasificacion(self, k=10, usuario_id=None, nivel=None):
+        """Muestra el top-k (o el de un nivel) y el puesto de un usuario"""
+        if not len(self.clasificacion):
+            print("❌ No hay usuarios en la clasificación")
+            return
+        
+        if nivel is None:
+            print(f"\n🥇 CLASIFICACIÓN (top {k} de {len(self.clasificacion)})")
+            primeros = self.clasificacion.top(k)
+        else:
+            print(f"\n🥇 CLASIFICACIÓN NIVEL {nivel} ({self.clasificacion.cuantos_de_nivel(nivel)} usuarios)")
+            primeros = self.clasificacion.usuarios_de_nivel(nivel, k)
+        print("=" * 40)
+        
+        medallas = {1: "🥇", 2: "🥈", 3: "🥉"}
+        for usuario_id_top, puntos in primeros:
+            puesto = self.clasificacion.posicion(usuario_id_top)
+            nombre = self.datos["usuarios"].get(usuario_id_top, {}).get("nombre", usuario_id_top)
+            print(f"{medallas.get(puesto, f'{puesto}.')} {nombre} - {puntos} puntos (nivel {nivel_de(puntos)})")
+        
+        if usuario_id is not None:
+            puesto = self.clasificacion.posicion(usuario_id)
+            if puesto is None:
+                print(f"\n❌ Usuario {usuario_id} no encontrado")
+            else:
+                print(f"\n📍 {usuario_id} está en el puesto {puesto} de {len(self.clasificacion)}")
+        
+        print("\n📊 Usuarios por nivel:")
+        for nivel_resumen, cantidad in self.clasificacion.resumen_niveles().items():
+            if cantidad:
+                print(f"   ⭐ Nivel {nivel_resumen}: {cantidad}")
 
     # ===== FUNCIONES DE IA =====
     
@@ -746,7 +912,7 @@ class AsistenteAprendizaje:
             return
         
         # Crear instancia del recomendador IA
-        recomendador = RecomendadorIA(self.datos)
+        recomendador = RecomendadorIA(self.datos, self.indices, self.columnas)
         usuario = self.datos["usuarios"][usuario_id]
         
         self.limpiar_pantalla()
@@ -757,11 +923,12 @@ class AsistenteAprendizaje:
         print(f"🎮 Puntos: {self.datos['puntos'].get(usuario_id, 0)}")
         
         # Mostrar análisis de patrones
-        patrones = recomendador.patrones_estudio
+        patrones = recomendador.perfil_usuario(usuario_id)
         if patrones["duracion_promedio"] > 0:
             print(f"\n📈 ANÁLISIS DE TUS PATRONES:")
             print(f"⏰ Duración promedio: {patrones['duracion_promedio']} minutos")
             print(f"😊 Satisfacción promedio: {patrones['satisfaccion_promedio']:.1f}/10")
+            self._mostrar_percentiles(agregado_usuario(self.datos, usuario_id))
             if patrones["racha_maxima"] > 0:
                 print(f"🔥 Racha máxima: {patrones['racha_maxima']} días")
         
@@ -783,8 +950,7 @@ class AsistenteAprendizaje:
     def _mostrar_proximos_pasos(self, usuario_id, recomendador):
         """Muestra próximos pasos personalizados"""
         usuario = self.datos["usuarios"][usuario_id]
-        planes_usuario = {k: v for k, v in self.datos["planes"].items() 
-                         if v["usuario_id"] == usuario_id}
+        planes_usuario = self.indices.planes_de(usuario_id)
         
         if not planes_usuario:
             print("1. 📚 Crear tu primer plan de estudio")
@@ -802,7 +968,7 @@ class AsistenteAprendizaje:
             
             if plan_mas_atrasado:
                 print(f"1. 🚀 Enfócate en '{plan_mas_atrasado['tema']}' (progreso: {plan_mas_atrasado['progreso']}%)")
-                print(f"2. ⏰ Dedica al menos {recomendador.patrones_estudio.get('duracion_promedio', 25)} minutos hoy")
+                print(f"2. ⏰ Dedica al menos {recomendador.perfil_usuario(usuario_id)['duracion_promedio'] or 25} minutos hoy")
                 print("3. 🎯 Revisa tus objetivos y ajústalos si es necesario")
         
         # Sugerencia de nuevo tema basado en intereses
@@ -833,7 +999,7 @@ class AsistenteAprendizaje:
             return
         
         usuario = self.datos["usuarios"][usuario_id]
-        recomendador = RecomendadorIA(self.datos)
+        recomendador = RecomendadorIA(self.datos, self.indices, self.columnas)
         
         self.limpiar_pantalla()
         print("🤖 GENERADOR DE PLANES CON IA")
@@ -844,8 +1010,7 @@ class AsistenteAprendizaje:
         print(f"\n🎯 Tus intereses registrados: {', '.join(usuario['intereses'])}")
         
         # Sugerir temas no explorados
-        planes_existentes = [plan["tema"].lower() for plan in self.datos["planes"].values() 
-                           if plan["usuario_id"] == usuario_id]
+        planes_existentes = [plan["tema"].lower() for plan in self.indices.planes_de(usuario_id).values()]
         temas_sugeridos = [interes for interes in usuario["intereses"] 
                           if not any(interes.lower() in plan_tema for plan_tema in planes_existentes)]
         
@@ -894,25 +1059,8 @@ class AsistenteAprendizaje:
                 print("⚠️ Usando 30 días por defecto")
             
             # Crear el plan en el sistema
-            plan_id = f"plan_{len(self.datos['planes']) + 1}"
-            fecha_limite = (datetime.now() + timedelta(days=dias)).strftime("%Y-%m-%d")
-            
-            self.datos["planes"][plan_id] = {
-                "usuario_id": usuario_id,
-                "tema": plan_ia['tema'],
-                "objetivos": plan_ia['objetivos'],
-                "recursos": plan_ia['recursos'],
-                "progreso": 0,
-                "fecha_creacion": datetime.now().strftime("%Y-%m-%d"),
-                "fecha_limite": fecha_limite,
-                "generado_con_ia": True,
-                "duracion_recomendada": plan_ia['duracion_recomendada']
-            }
-            
-            # Bonus por crear plan con IA
-            self.agregar_puntos(usuario_id, 10, "Crear plan personalizado con IA")
-            
-            self.guardar_datos()
+            plan_id = self.crear_plan(usuario_id, tema, dias, plan_ia=plan_ia)
+            fecha_limite = self.datos["planes"][plan_id]["fecha_limite"]
             
             self.limpiar_pantalla()
             print("🎉 ¡PLAN CON IA CREADO EXITOSAMENTE!")
@@ -936,8 +1084,7 @@ class AsistenteAprendizaje:
         for user_id, user_data in self.datos["usuarios"].items():
             puntos = self.datos["puntos"].get(user_id, 0)
             racha = self.datos["rachas"].get(user_id, {}).get("actual", 0)
-            sesiones = sum(1 for s in self.datos["sesiones"] 
-                          if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == user_id)
+            sesiones = len(self.indices.sesiones_de(user_id))
             print(f"🧑‍🎓 {user_id}: {user_data['nombre']} ({puntos} pts, {racha}d racha, {sesiones} sesiones)")
         
         usuario_id = input("\nID del usuario: ").strip()
@@ -947,7 +1094,7 @@ class AsistenteAprendizaje:
             return
         
         usuario = self.datos["usuarios"][usuario_id]
-        recomendador = RecomendadorIA(self.datos)
+        recomendador = RecomendadorIA(self.datos, self.indices, self.columnas)
         
         self.limpiar_pantalla()
         print("🤖 DASHBOARD INTELIGENTE")
@@ -965,31 +1112,47 @@ class AsistenteAprendizaje:
         print(f"🔥 Racha actual: {racha_actual} días (récord: {racha_maxima})")
         
         # Calcular estadísticas de sesiones del usuario
-        sesiones_usuario = [s for s in self.datos["sesiones"] 
-                           if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == usuario_id]
+        sesiones_usuario = self.indices.sesiones_de(usuario_id)
         
         if sesiones_usuario:
-            tiempo_total = sum(s["duracion"] for s in sesiones_usuario)
-            satisfaccion_promedio = sum(s["puntuacion"] for s in sesiones_usuario) / len(sesiones_usuario)
+            stats = agregado_usuario(self.datos, usuario_id)
+            tiempo_total = stats["tiempo_total"]
+            satisfaccion_media = satisfaccion_promedio(stats)
             
-            print(f"📚 Sesiones totales: {len(sesiones_usuario)}")
+            print(f"📚 Sesiones totales: {stats['sesiones']}")
             print(f"⏰ Tiempo invertido: {tiempo_total} minutos ({tiempo_total//60}h {tiempo_total%60}m)")
-            print(f"😊 Satisfacción promedio: {satisfaccion_promedio:.1f}/10")
+            print(f"😊 Satisfacción promedio: {satisfaccion_media:.1f}/10")
             
             # Análisis de tendencias
             print(f"\n📈 ANÁLISIS INTELIGENTE:")
             
-            # Tendencia de satisfacción
-            if len(sesiones_usuario) >= 3:
-                ultimas_3 = sesiones_usuario[-3:]
-                satisfaccion_reciente = sum(s["puntuacion"] for s in ultimas_3) / 3
+            # Tendencia: medias móviles de las últimas sesiones frente a las de largo plazo
+            tendencias = stats["tendencias"]
+            if tendencias["sesiones"] >= 3:
+                corta, larga = tendencias["corta"], tendencias["larga"]
+                print(f"😊 Satisfacción reciente: {corta['puntuacion']:.1f} (largo plazo: {larga['puntuacion']:.1f})")
+                print(f"⏱️ Duración reciente: {corta['duracion']:.0f} min (largo plazo: {larga['duracion']:.0f} min)")
                 
-                if satisfaccion_reciente > satisfaccion_promedio + 1:
-                    print("📈 Tendencia positiva: Tu satisfacción está mejorando")
-                elif satisfaccion_reciente < satisfaccion_promedio - 1:
+                caidas = {campo for campo, _, _ in detectar_caidas(tendencias)}
+                if "puntuacion" in caidas:
                     print("📉 Alerta: Tu satisfacción ha bajado recientemente")
+                elif diferencia(tendencias, "puntuacion") >= CAIDA_PUNTUACION:
+                    print("📈 Tendencia positiva: Tu satisfacción está mejorando")
                 else:
                     print("➡️ Satisfacción estable")
+                if "duracion" in caidas:
+                    print("📉 Alerta: Tus sesiones son bastante más cortas que de costumbre")
+            
+            self._mostrar_comparacion("📊 ESTA SEMANA vs LA ANTERIOR", *comparar_semanas(stats))
+            self._mostrar_comparacion("🗓️ ESTE MES vs EL ANTERIOR (mismos días)", *comparar_meses(stats))
+            
+            semanas = self.analitica.tendencia_semanal(usuario_id, semanas=4)
+            if len(semanas) > 1:
+                print(f"\n📅 ÚLTIMAS SEMANAS:")
+                for lunes, sesiones, satisfaccion in semanas:
+                    print(f"   Semana del {lunes}: {sesiones} sesiones, {satisfaccion:.1f}/10")
+            
+            self.mostrar_mapa_calor(usuario_id)
         
         # Recomendaciones principales
         recomendaciones = recomendador.generar_recomendaciones_personalizadas(usuario_id)
@@ -1000,6 +1163,37 @@ class AsistenteAprendizaje:
         print(f"\n{recomendador.recomendar_horario_optimo(usuario_id)}")
         print(f"{recomendador.recomendar_duracion_ideal(usuario_id)}")
     
+    def mostrar_mapa_calor(self, usuario_id):
+        """Minutos estudiados por día de la semana y hora, leídos del mapa de calor del usuario"""
+        mapa = agregado_usuario(self.datos, usuario_id)["mapa"]
+        celda = mejor_celda(mapa)
+        if celda is None:
+            return
+        
+        print(f"\n🗺️ MAPA DE CALOR (minutos por hora):")
+        print(f"      {''.join(str(hora // 10) for hora in range(24))}")
+        print(f"      {''.join(str(hora % 10) for hora in range(24))}")
+        for dia, fila in enumerate(filas_mapa(mapa)):
+            print(f"   {NOMBRES_DIAS[dia][:2]} {fila}")
+        
+        dia, hora = celda
+        _, sesiones, suma_puntuacion = valores_celda(mapa, dia, hora)
+        satisfaccion = suma_puntuacion / sesiones
+        print(f"⭐ Tu mejor momento: {NOMBRES_DIAS[dia].lower()} a las {hora}:00 "
+              f"({sesiones} sesiones, {satisfaccion:.1f}/10)")
+    
+    def _mostrar_comparacion(self, titulo, actual, anterior):
+        """Minutos, sesiones y satisfacción de dos periodos leídos de los resúmenes"""
+        if not actual["sesiones"] and not anterior["sesiones"]:
+            return
+        print(f"\n{titulo}:")
+        for clave, etiqueta in (("minutos", "⏰ Minutos"), ("sesiones", "📚 Sesiones")):
+            cambio = variacion(actual[clave], anterior[clave])
+            texto = f" ({'📈' if cambio >= 0 else '📉'} {cambio:+.0f}%)" if cambio is not None else ""
+            print(f"   {etiqueta}: {actual[clave]} vs {anterior[clave]}{texto}")
+        if actual["sesiones"] and anterior["sesiones"]:
+            print(f"   😊 Satisfacción: {actual['satisfaccion']:.1f} vs {anterior['satisfaccion']:.1f}")
+    
     def mostrar_estadisticas_avanzadas(self):
         """Estadísticas avanzadas con análisis inteligente"""
         if not self.datos["sesiones"]:
@@ -1007,7 +1201,7 @@ class AsistenteAprendizaje:
             input("⏸️ Presiona ENTER para continuar...")
             return
         
-        recomendador = RecomendadorIA(self.datos)
+        recomendador = RecomendadorIA(self.datos, self.indices, self.columnas)
         
         self.limpiar_pantalla()
         print("📊 ESTADÍSTICAS AVANZADAS CON IA")
@@ -1015,9 +1209,10 @@ class AsistenteAprendizaje:
         
         # Análisis global de la plataforma
         total_usuarios = len(self.datos["usuarios"])
-        total_sesiones = len(self.datos["sesiones"])
         total_planes = len(self.datos["planes"])
-        tiempo_total_plataforma = sum(s["duracion"] for s in self.datos["sesiones"])
+        stats_globales = self.datos["agregados"]["global"]
+        total_sesiones = stats_globales["sesiones"]
+        tiempo_total_plataforma = stats_globales["tiempo_total"]
         
         print(f"🌍 ESTADÍSTICAS GLOBALES:")
         print(f"👥 Usuarios activos: {total_usuarios}")
@@ -1026,12 +1221,56 @@ class AsistenteAprendizaje:
         print(f"🕒 Tiempo total estudiado: {tiempo_total_plataforma//60}h {tiempo_total_plataforma%60}m")
         
         if total_sesiones > 0:
-            satisfaccion_global = sum(s["puntuacion"] for s in self.datos["sesiones"]) / total_sesiones
+            satisfaccion_global = satisfaccion_promedio(stats_globales)
             duracion_promedio_global = tiempo_total_plataforma / total_sesiones
             print(f"😊 Satisfacción promedio: {satisfaccion_global:.1f}/10")
             print(f"⏱️ Duración promedio por sesión: {duracion_promedio_global:.1f} minutos")
+            self._mostrar_percentiles(stats_globales)
+            self._mostrar_analitica_global()
         
         print(f"\n💡 La IA ha analizado {total_sesiones} sesiones para generar estos insights")
+    
+    def _mostrar_percentiles(self, agregado):
+        """Mediana y colas de duración y satisfacción; la media se va con las sesiones maratón"""
+        if agregado["sesiones"] == 0:
+            return
+        duracion = percentiles(agregado, "duracion")
+        puntuacion = percentiles(agregado, "puntuacion")
+        print(f"📏 Duración P50/P90/P99: {duracion[50]} / {duracion[90]} / {duracion[99]} minutos")
+        print(f"🎯 Satisfacción P50/P90/P99: {puntuacion[50]:.1f} / {puntuacion[90]:.1f} / {puntuacion[99]:.1f}")
+    
+    def _mostrar_analitica_global(self):
+        """Distribuciones por hora, día, duración y semana, y usuarios más activos"""
+        print(f"📅 Días con actividad: {self.analitica.resumen()['dias_activos']}")
+        
+        horas = self.analitica.histograma_horas()
+        horas_top = sorted((h for h in range(24) if horas[h]), key=lambda h: -horas[h])[:3]
+        if horas_top:
+            print(f"\n🕐 Horas más activas: {', '.join(f'{h:02d}:00 ({horas[h]})' for h in horas_top)}")
+        
+        dias = self.analitica.histograma_dias()
+        if any(dias):
+            print(f"📆 Día más activo: {NOMBRES_DIAS[dias.index(max(dias))]} ({max(dias)} sesiones)")
+        
+        tramos = self.analitica.tramos_duracion()
+        total = sum(tramos)
+        print(f"\n⏱️ DURACIÓN DE LAS SESIONES:")
+        for nombre, cantidad in zip(TRAMOS_DURACION, tramos):
+            porcentaje = cantidad * 100 / total if total else 0
+            print(f"   {nombre:>10}: {'█' * round(porcentaje / 5)} {porcentaje:.0f}%")
+        
+        semanas = self.analitica.tendencia_semanal(semanas=4)
+        if semanas:
+            print(f"\n📈 SATISFACCIÓN POR SEMANA:")
+            for lunes, sesiones, satisfaccion in semanas:
+                print(f"   Semana del {lunes}: {sesiones} sesiones, {satisfaccion:.1f}/10")
+        
+        activos = self.analitica.totales_por_usuario(3)
+        if activos:
+            print(f"\n🏅 USUARIOS MÁS DEDICADOS:")
+            for usuario_id, minutos, sesiones, satisfaccion in activos:
+                nombre = self.datos["usuarios"].get(usuario_id, {}).get("nombre", usuario_id)
+                print(f"   {nombre}: {minutos} min en {sesiones} sesiones ({satisfaccion:.1f}/10)")
 
     def menu_ia_avanzado(self):
         """Menú especializado para funciones de IA"""
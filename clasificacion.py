@@ -0,0 +1,83 @@
+from bisect import bisect_left, bisect_right, insort
+
+# Puntos mínimos de los niveles 1 a 5; a partir del 5 se sube cada 200 puntos
+UMBRALES_NIVEL = [0, 50, 150, 300, 500]
+PUNTOS_POR_NIVEL_ALTO = 200
+
+
+def nivel_de(puntos):
+    if puntos < UMBRALES_NIVEL[-1]:
+        return max(1, bisect_right(UMBRALES_NIVEL, puntos))
+    return len(UMBRALES_NIVEL) + (puntos - UMBRALES_NIVEL[-1]) // PUNTOS_POR_NIVEL_ALTO
+
+
+def puntos_minimos_nivel(nivel):
+    if nivel <= len(UMBRALES_NIVEL):
+        return UMBRALES_NIVEL[max(nivel, 1) - 1]
+    return UMBRALES_NIVEL[-1] + (nivel - len(UMBRALES_NIVEL)) * PUNTOS_POR_NIVEL_ALTO
+
+
+def puntos_para_siguiente_nivel(puntos):
+    return puntos_minimos_nivel(nivel_de(puntos) + 1) - puntos
+
+
+class Clasificacion:
+    """Ranking de usuarios por puntos.
+
+    Mantiene una lista ordenada de (-puntos, usuario_id): el primero es el que
+    más puntos tiene y los empates se ordenan por id. Las búsquedas son
+    bisecciones O(log n); insertar desplaza la lista con un memmove.
+    """
+
+    def __init__(self, puntos=None):
+        self.puntos = dict(puntos or {})
+        self.orden = sorted((-total, usuario_id) for usuario_id, total in self.puntos.items())
+
+    def __len__(self):
+        return len(self.orden)
+
+    def actualizar(self, usuario_id, puntos):
+        anterior = self.puntos.get(usuario_id)
+        if anterior == puntos:
+            return
+        if anterior is not None:
+            del self.orden[bisect_left(self.orden, (-anterior, usuario_id))]
+        insort(self.orden, (-puntos, usuario_id))
+        self.puntos[usuario_id] = puntos
+
+    def top(self, k=10):
+        """Los k primeros como (usuario_id, puntos); k negativo no devuelve nada"""
+        return [(usuario_id, -negativo) for negativo, usuario_id in self.orden[:max(k, 0)]]
+
+    def posicion(self, usuario_id):
+        """Puesto del usuario empezando en 1, o None si no está en el ranking"""
+        puntos = self.puntos.get(usuario_id)
+        if puntos is None:
+            return None
+        return bisect_left(self.orden, (-puntos, usuario_id)) + 1
+
+    def _tramo_nivel(self, nivel):
+        # Los puntos del nivel están en [mínimo, mínimo del siguiente)
+        minimo = puntos_minimos_nivel(nivel)
+        siguiente = puntos_minimos_nivel(nivel + 1)
+        inicio = bisect_right(self.orden, (-siguiente, chr(0x10FFFF)))
+        fin = bisect_right(self.orden, (-minimo, chr(0x10FFFF)))
+        return inicio, fin
+
+    def usuarios_de_nivel(self, nivel, k=None):
+        """Usuarios de un nivel de más a menos puntos como (usuario_id, puntos)"""
+        inicio, fin = self._tramo_nivel(nivel)
+        if k is not None:
+            fin = min(fin, inicio + max(k, 0))
+        return [(usuario_id, -negativo) for negativo, usuario_id in self.orden[inicio:fin]]
+
+    def cuantos_de_nivel(self, nivel):
+        inicio, fin = self._tramo_nivel(nivel)
+        return fin - inicio
+
+    def resumen_niveles(self):
+        """Número de usuarios por nivel, del 1 al nivel más alto alcanzado"""
+        if not self.orden:
+            return {}
+        nivel_maximo = nivel_de(-self.orden[0][0])
+        return {nivel: self.cuantos_de_nivel(nivel) for nivel in range(1, nivel_maximo + 1)}
@@ -0,0 +1,156 @@
+from array import array
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ColumnasSesiones:
+    """Copia columnar de las sesiones: una fila por sesión, una columna por campo.
+
+    No sustituye a datos["sesiones"], que sigue siendo lo que se guarda: es una
+    copia numérica en arrays tipados (unos 20 bytes más por sesión) para que la
+    analítica recorra números contiguos en lugar de diccionarios y cadenas.
+    Las notas, casi siempre vacías, van aparte.
+    """
+
+    SIN_USUARIO = -1
+    SIN_HORA = -1
+    MAX_DURACION = 32767
+
+    # Lo que se guarda en la copia binaria de arranque (ver estado)
+    CAMPOS_ESTADO = ("plan_ids", "usuario_ids", "plan", "usuario", "duracion", "puntuacion", "fecha", "minuto",
+                     "notas", "filas_por_usuario", "derivados")
+
+    def __init__(self, datos, estado=None):
+        """Construye las columnas recorriendo las sesiones, o las restaura de estado.
+
+        estado es lo que devolvió estado() para un prefijo de estas mismas
+        sesiones (la copia binaria más un diario que solo añade); las sesiones
+        que falten se agregan. Si no encaja con los datos se ignora.
+        """
+        self.datos = datos
+        self.plan_ids = []
+        self.usuario_ids = []
+        self._indice_planes = {}
+        self._indice_usuarios = {}
+
+        self.plan = array('i')          # índice en plan_ids
+        self.usuario = array('i')       # índice en usuario_ids (-1 si el plan no existe)
+        self.duracion = array('h')      # minutos (int16)
+        self.puntuacion = array('f')    # satisfacción 1-10 (float32)
+        self.fecha = array('i')         # ordinal de la fecha (0 si no se pudo leer)
+        self.minuto = array('h')        # minuto del día (-1 si no hay hora)
+        self.notas = {}                 # fila -> notas (solo las no vacías)
+        self.filas_por_usuario = {}     # índice de usuario -> array de filas
+        self._ordinales = {}            # "YYYY-MM-DD" -> ordinal, hay pocas fechas distintas
+        self.derivados = {}             # cálculos de otros módulos sobre estas filas, viven lo que ellas
+
+        desde = 0
+        if estado is not None and estado["filas"] <= len(datos["sesiones"]):
+            self._restaurar(estado)
+            desde = estado["filas"]
+        for sesion in datos["sesiones"][desde:]:
+            self.agregar(sesion)
+
+    def __len__(self):
+        return len(self.plan)
+
+    def estado(self):
+        """Columnas y cálculos derivados para guardarlos con pickle.
+
+        Los arrays se guardan tal cual: pickle los serializa con tobytes, así
+        que restaurarlos es copiar bytes en lugar de recorrer las sesiones.
+        """
+        estado = {campo: getattr(self, campo) for campo in self.CAMPOS_ESTADO}
+        estado["filas"] = len(self)
+        return estado
+
+    def _restaurar(self, estado):
+        for campo in self.CAMPOS_ESTADO:
+            setattr(self, campo, estado[campo])
+        self._indice_planes = {plan_id: i for i, plan_id in enumerate(self.plan_ids)}
+        self._indice_usuarios = {usuario_id: i for i, usuario_id in enumerate(self.usuario_ids)}
+
+    def _indice(self, valor, lista, indice):
+        if valor not in indice:
+            indice[valor] = len(lista)
+            lista.append(valor)
+        return indice[valor]
+
+    def agregar(self, sesion):
+        """Añade una sesión al final de las columnas"""
+        fila = len(self.plan)
+        plan = self.datos["planes"].get(sesion["plan_id"])
+
+        self.plan.append(self._indice(sesion["plan_id"], self.plan_ids, self._indice_planes))
+        if plan is not None:
+            usuario = self._indice(plan["usuario_id"], self.usuario_ids, self._indice_usuarios)
+            self.filas_por_usuario.setdefault(usuario, array('i')).append(fila)
+        else:
+            usuario = self.SIN_USUARIO
+        self.usuario.append(usuario)
+
+        # Los arrays tipados no convierten: "45" o 45.0 fallarían y 40000 desbordaría el int16
+        self.duracion.append(max(0, min(int(float(sesion["duracion"])), self.MAX_DURACION)))
+        self.puntuacion.append(float(sesion["puntuacion"]))
+
+        self.fecha.append(self._ordinal(sesion.get("fecha")))
+
+        if "hora" in sesion:
+            horas, minutos = sesion["hora"].split(":")
+            self.minuto.append(int(horas) * 60 + int(minutos))
+        else:
+            self.minuto.append(self.SIN_HORA)
+
+        if sesion.get("notas"):
+            self.notas[fila] = sesion["notas"]
+
+    def _ordinal(self, fecha):
+        ordinal = self._ordinales.get(fecha)
+        if ordinal is None:
+            try:
+                ordinal = date.fromisoformat(fecha).toordinal()
+            except (TypeError, ValueError):
+                ordinal = 0
+            self._ordinales[fecha] = ordinal
+        return ordinal
+
+    def filas_de(self, usuario_id):
+        """Filas de las sesiones de un usuario, en orden de registro"""
+        usuario = self._indice_usuarios.get(usuario_id)
+        if usuario is None:
+            return array('i')
+        return self.filas_por_usuario[usuario]
+
+    def tema_de_fila(self, fila):
+        return self.datos["planes"].get(self.plan_ids[self.plan[fila]], {}).get("tema")
+
+    def sesion(self, fila):
+        """Reconstruye el diccionario de una sesión a partir de sus columnas"""
+        sesion = {
+            "plan_id": self.plan_ids[self.plan[fila]],
+            "duracion": self.duracion[fila],
+            "puntuacion": round(self.puntuacion[fila], 2),
+            "fecha": date.fromordinal(self.fecha[fila]).strftime("%Y-%m-%d") if self.fecha[fila] else ""
+        }
+        if self.minuto[fila] != self.SIN_HORA:
+            sesion["hora"] = f"{self.minuto[fila] // 60:02d}:{self.minuto[fila] % 60:02d}"
+        sesion["notas"] = self.notas.get(fila, "")
+        return sesion
+
+    def a_numpy(self):
+        """Copia las columnas a arrays NumPy, o devuelve None si NumPy no está instalado"""
+        if np is None:
+            return None
+        # Se copian porque un array que exporta su buffer ya no puede crecer
+        return {
+            "plan": np.frombuffer(self.plan, dtype=np.int32).copy(),
+            "usuario": np.frombuffer(self.usuario, dtype=np.int32).copy(),
+            "duracion": np.frombuffer(self.duracion, dtype=np.int16).copy(),
+            "puntuacion": np.frombuffer(self.puntuacion, dtype=np.float32).copy(),
+            "fecha": np.frombuffer(self.fecha, dtype=np.int32).copy(),
+            "minuto": np.frombuffer(self.minuto, dtype=np.int16).copy()
+        }
@@ -0,0 +1,73 @@
+import math
+
+# Tamaño del sketch: con k = 64 el error de rango ronda el 1-2 % y el sketch
+# nunca pasa de unos 200 valores, tenga el usuario 10 o 10^6 sesiones. Hasta
+# ese tamaño guarda todos los valores y los cuantiles son exactos.
+K_POR_DEFECTO = 64
+# El global lo consulta todo el mundo y hay solo uno: se permite más precisión
+K_GLOBAL = 200
+FACTOR_NIVEL = 2 / 3
+
+
+def sketch_vacio(k=K_POR_DEFECTO):
+    """Sketch de cuantiles estilo KLL guardado como diccionario JSON.
+
+    niveles[h] guarda valores que representan 2^h observaciones cada uno.
+    Cuando un nivel se llena se ordena y pasa uno de cada dos valores al
+    nivel siguiente; "paridad" alterna cuál, así que el resultado es
+    determinista y repetir las mismas sesiones da el mismo sketch.
+    """
+    return {"k": k, "n": 0, "niveles": [[]], "paridad": 0}
+
+
+_CAPACIDADES = {}
+
+
+def _capacidades(k, altura):
+    """Capacidad de cada nivel y su suma (se calculan una vez por k y altura)"""
+    if (k, altura) not in _CAPACIDADES:
+        capacidades = [max(2, math.ceil(k * FACTOR_NIVEL ** (altura - 1 - h))) for h in range(altura)]
+        _CAPACIDADES[(k, altura)] = (capacidades, sum(capacidades))
+    return _CAPACIDADES[(k, altura)]
+
+
+def sketch_agregar(sketch, valor):
+    niveles = sketch["niveles"]
+    niveles[0].append(valor)
+    sketch["n"] += 1
+
+    altura = len(niveles)
+    capacidades, capacidad_total = _capacidades(sketch["k"], altura)
+    if sum(map(len, niveles)) <= capacidad_total:
+        return
+
+    for h in range(altura):
+        if len(niveles[h]) >= capacidades[h]:
+            if h + 1 == len(niveles):
+                niveles.append([])
+            valores = sorted(niveles[h])
+            # Con un número impar de valores uno se queda en su nivel
+            resto = [valores.pop()] if len(valores) % 2 else []
+            niveles[h + 1].extend(valores[sketch["paridad"]::2])
+            niveles[h] = resto
+            sketch["paridad"] ^= 1
+            return
+
+
+def sketch_cuantiles(sketch, cuantiles):
+    """Valores de varios cuantiles (0-1) en una pasada; None si no hay datos"""
+    pares = sorted((valor, 1 << h) for h, nivel in enumerate(sketch["niveles"]) for valor in nivel)
+    if not pares:
+        return [None] * len(cuantiles)
+
+    total = sum(peso for _, peso in pares)
+    resultados = []
+    for cuantil in cuantiles:
+        objetivo = cuantil * total
+        acumulado = 0
+        for valor, peso in pares:
+            acumulado += peso
+            if acumulado >= objetivo:
+                break
+        resultados.append(valor)
+    return resultados
@@ -0,0 +1,141 @@
+import csv
+import json
+import os
+
+from agregados import percentiles, satisfaccion_promedio
+from temas import CATALOGO, plegar
+
+CAMPOS_SESION = ["usuario_id", "plan_id", "tema", "fecha", "hora", "duracion", "puntuacion", "notas"]
+CAMPOS_PLAN = ["plan_id", "usuario_id", "tema", "progreso", "fecha_creacion", "fecha_limite", "generado_con_ia"]
+CAMPOS_AGREGADO = ["usuario_id", "sesiones", "tiempo_total", "satisfaccion_promedio", "duracion_min",
+                   "duracion_max", "puntuacion_min", "puntuacion_max", "duracion_p50", "duracion_p90",
+                   "duracion_p99", "puntuacion_p50", "puntuacion_p90", "puntuacion_p99", "temas"]
+
+
+def filtro_tema(tema):
+    """Función que dice si el tema de un plan es el pedido; None si no se filtra.
+
+    Se compara como el catálogo: "Python avanzado" es python. Los temas que
+    no están en el catálogo se comparan sin acentos ni mayúsculas.
+    """
+    if not tema or not tema.strip():
+        return None
+    clave = CATALOGO.buscar(tema)
+    if clave is not None:
+        return lambda tema_plan: bool(tema_plan) and CATALOGO.buscar(tema_plan) == clave
+    plegado = plegar(tema.strip())
+    return lambda tema_plan: bool(tema_plan) and plegar(tema_plan.strip()) == plegado
+
+
+def filas_sesiones(datos, indices, usuario_id=None, desde=None, hasta=None, tema=None):
+    """Genera las sesiones como filas planas, filtradas por usuario, fechas (inclusive) y tema.
+
+    Con usuario o tema solo se recorren las sesiones de los planes que cumplen
+    el filtro, y con solo fechas las de ese rango, gracias a los índices.
+    """
+    es_tema = filtro_tema(tema)
+    planes = datos["planes"]
+    if usuario_id or es_tema:
+        candidatos = indices.planes_de(usuario_id) if usuario_id else planes
+        sesiones = indices.sesiones_de_planes(plan_id for plan_id, plan in candidatos.items()
+                                              if not es_tema or es_tema(plan.get("tema")))
+    elif desde or hasta:
+        sesiones = indices.sesiones_entre(desde, hasta)
+    else:
+        sesiones = datos["sesiones"]
+
+    for sesion in sesiones:
+        fecha = sesion.get("fecha", "")
+        if (desde and fecha < desde) or (hasta and fecha > hasta):
+            continue
+        plan = planes.get(sesion["plan_id"], {})
+        yield {
+            "usuario_id": plan.get("usuario_id"),
+            "plan_id": sesion["plan_id"],
+            "tema": plan.get("tema"),
+            "fecha": fecha,
+            "hora": sesion.get("hora"),
+            "duracion": sesion["duracion"],
+            "puntuacion": sesion["puntuacion"],
+            "notas": sesion.get("notas", "")
+        }
+
+
+def filas_planes(datos, indices, usuario_id=None, tema=None):
+    es_tema = filtro_tema(tema)
+    planes = indices.planes_de(usuario_id) if usuario_id else datos["planes"]
+
+    for plan_id, plan in planes.items():
+        if es_tema and not es_tema(plan.get("tema")):
+            continue
+        fila = {"plan_id": plan_id}
+        fila.update({campo: plan.get(campo) for campo in CAMPOS_PLAN[1:]})
+        fila["generado_con_ia"] = bool(fila["generado_con_ia"])
+        yield fila
+
+
+def filas_agregados(datos, usuario_id=None):
+    agregados = datos["agregados"]["usuarios"]
+    usuarios = [usuario_id] if usuario_id else agregados
+
+    for uid in usuarios:
+        agregado = agregados.get(uid)
+        if agregado is None:
+            continue
+        duracion = percentiles(agregado, "duracion")
+        puntuacion = percentiles(agregado, "puntuacion")
+        yield {
+            "usuario_id": uid,
+            "sesiones": agregado["sesiones"],
+            "tiempo_total": agregado["tiempo_total"],
+            "satisfaccion_promedio": round(satisfaccion_promedio(agregado), 2),
+            "duracion_min": agregado["duracion_min"],
+            "duracion_max": agregado["duracion_max"],
+            "puntuacion_min": agregado["puntuacion_min"],
+            "puntuacion_max": agregado["puntuacion_max"],
+            "duracion_p50": duracion[50],
+            "duracion_p90": duracion[90],
+            "duracion_p99": duracion[99],
+            "puntuacion_p50": puntuacion[50],
+            "puntuacion_p90": puntuacion[90],
+            "puntuacion_p99": puntuacion[99],
+            "temas": agregado["temas"]
+        }
+
+
+def escribir_csv(filas, archivo, campos):
+    """Escribe las filas a medida que se generan; devuelve cuántas se escribieron"""
+    total = 0
+    with open(archivo, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=campos)
+        escritor.writeheader()
+        for fila in filas:
+            # Los campos anidados (temas) van como JSON dentro de la celda
+            escritor.writerow({k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v
+                               for k, v in fila.items()})
+            total += 1
+    return total
+
+
+def escribir_jsonl(filas, archivo, campos=None):
+    total = 0
+    with open(archivo, 'w', encoding='utf-8') as f:
+        for fila in filas:
+            f.write(json.dumps(fila, ensure_ascii=False))
+            f.write("\n")
+            total += 1
+    return total
+
+
+ESCRITORES = {
+    ".csv": escribir_csv,
+    ".jsonl": escribir_jsonl,
+    ".ndjson": escribir_jsonl
+}
+
+
+def escribir_filas(filas, archivo, campos):
+    extension = os.path.splitext(archivo)[1].lower()
+    if extension not in ESCRITORES:
+        raise ValueError(f"Formato '{extension}' no soportado. Opciones: {', '.join(ESCRITORES)}")
+    return ESCRITORES[extension](filas, archivo, campos)
@@ -1,68 +1,106 @@
 import json
 import random
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from collections import defaultdict
+from indices import IndiceDatos
+from columnas import ColumnasSesiones
+from agregados import agregado_usuario
+from mapa_calor import mejor_hora
+from temas import CATALOGO
+
+DIAS_SEMANA = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def _acumulado_vacio():
+    return {
+        "sesiones_procesadas": 0,
+        "suma_duracion": 0,
+        "suma_puntuacion": 0,
+        "dias": [0] * 7,
+        "temas": {}
+    }
+
+def _cache_de(columnas):
+    """Patrones acumulados que comparten todos los RecomendadorIA de estas columnas.
+
+    Se guardan en el propio almacén columnar, así que se liberan con él al
+    recargar los datos. Las columnas solo crecen: cada acumulado (global y
+    por usuario) recuerda cuántas sesiones lleva y procesa solo las nuevas.
+    """
+    return columnas.derivados.setdefault("patrones", {"global": _acumulado_vacio(), "usuarios": {}})
 
 class RecomendadorIA:
-    def __init__(self, datos_usuario):
+    def __init__(self, datos_usuario, indices=None, columnas=None):
         self.datos = datos_usuario
+        self.indices = indices if indices is not None else IndiceDatos(datos_usuario)
+        self.columnas = columnas if columnas is not None else ColumnasSesiones(datos_usuario)
         self.patrones_estudio = self.analizar_patrones()
     
-    def analizar_patrones(self):
-        """Analiza los patrones de estudio del usuario"""
-        if not self.datos["sesiones"]:
-            return {}
+    def _actualizar_acumulado(self, acumulado, filas):
+        """Suma al acumulado solo las filas (sesiones) nuevas del almacén columnar"""
+        # Datos recargados con menos sesiones: empezar de cero
+        if acumulado["sesiones_procesadas"] > len(filas):
+            acumulado.update(_acumulado_vacio())
+        
+        columnas = self.columnas
+        dias = acumulado["dias"]
+        temas = acumulado["temas"]
+        
+        for fila in filas[acumulado["sesiones_procesadas"]:]:
+            acumulado["suma_duracion"] += columnas.duracion[fila]
+            acumulado["suma_puntuacion"] += columnas.puntuacion[fila]
+            
+            if columnas.fecha[fila]:
+                # El ordinal 1 (1 de enero del año 1) fue lunes
+                dias[(columnas.fecha[fila] + 6) % 7] += 1
+            
+            tema = columnas.tema_de_fila(fila)
+            if tema is not None:
+                temas[tema] = temas.get(tema, 0) + 1
         
+        acumulado["sesiones_procesadas"] = len(filas)
+    
+    def _patrones_desde(self, acumulado):
+        total_sesiones = acumulado["sesiones_procesadas"]
         patrones = {
-            "horas_preferidas": [],
+            "sesiones": total_sesiones,
             "duracion_promedio": 0,
             "satisfaccion_promedio": 0,
-            "dias_mas_activos": {},
-            "temas_favoritos": {},
-            "racha_maxima": 0
+            "dias_mas_activos": {DIAS_SEMANA[i]: n for i, n in enumerate(acumulado["dias"]) if n},
+            "temas_favoritos": dict(acumulado["temas"])
         }
         
-        # Analizar sesiones
-        for sesion in self.datos["sesiones"]:
-            # Extraer hora si existe
-            if "hora" in sesion:
-                hora = int(sesion["hora"].split(":")[0])
-                patrones["horas_preferidas"].append(hora)
-            
-            patrones["duracion_promedio"] += sesion["duracion"]
-            patrones["satisfaccion_promedio"] += sesion["puntuacion"]
-            
-            # Analizar día de la semana
-            try:
-                fecha = datetime.strptime(sesion["fecha"], "%Y-%m-%d")
-                dia_semana = fecha.strftime("%A")
-                if dia_semana not in patrones["dias_mas_activos"]:
-                    patrones["dias_mas_activos"][dia_semana] = 0
-                patrones["dias_mas_activos"][dia_semana] += 1
-            except:
-                pass
-            
-            # Analizar temas
-            plan = self.datos["planes"].get(sesion["plan_id"], {})
-            if "tema" in plan:
-                tema = plan["tema"]
-                if tema not in patrones["temas_favoritos"]:
-                    patrones["temas_favoritos"][tema] = 0
-                patrones["temas_favoritos"][tema] += 1
-        
         # Calcular promedios
-        total_sesiones = len(self.datos["sesiones"])
         if total_sesiones > 0:
-            patrones["duracion_promedio"] = patrones["duracion_promedio"] // total_sesiones
-            patrones["satisfaccion_promedio"] = patrones["satisfaccion_promedio"] / total_sesiones
+            patrones["duracion_promedio"] = acumulado["suma_duracion"] // total_sesiones
+            patrones["satisfaccion_promedio"] = acumulado["suma_puntuacion"] / total_sesiones
+        
+        return patrones
+    
+    def analizar_patrones(self):
+        """Analiza los patrones de estudio de toda la plataforma"""
+        acumulado = _cache_de(self.columnas)["global"]
+        self._actualizar_acumulado(acumulado, range(len(self.columnas)))
+        patrones = self._patrones_desde(acumulado)
         
         # Analizar rachas máximas
+        patrones["racha_maxima"] = 0
         for usuario_id, racha_data in self.datos["rachas"].items():
             if racha_data["maxima"] > patrones["racha_maxima"]:
                 patrones["racha_maxima"] = racha_data["maxima"]
         
         return patrones
     
+    def perfil_usuario(self, usuario_id):
+        """Patrones de estudio calculados solo con las sesiones de este usuario"""
+        usuarios = _cache_de(self.columnas)["usuarios"]
+        if usuario_id not in usuarios:
+            usuarios[usuario_id] = _acumulado_vacio()
+        self._actualizar_acumulado(usuarios[usuario_id], self.columnas.filas_de(usuario_id))
+        
+        perfil = self._patrones_desde(usuarios[usuario_id])
+        perfil["racha_maxima"] = self.datos["rachas"].get(usuario_id, {}).get("maxima", 0)
+        return perfil
+    
     def generar_recomendaciones_personalizadas(self, usuario_id):
         """Genera recomendaciones basadas en el análisis del usuario"""
         if usuario_id not in self.datos["usuarios"]:
@@ -75,7 +113,7 @@ class RecomendadorIA:
         recomendaciones.extend(self._recomendaciones_progreso(usuario_id))
         
         # Recomendaciones basadas en patrones de estudio
-        recomendaciones.extend(self._recomendaciones_patrones())
+        recomendaciones.extend(self._recomendaciones_patrones(usuario_id))
         
         # Recomendaciones basadas en nivel
         recomendaciones.extend(self._recomendaciones_nivel(usuario["nivel"]))
@@ -92,8 +130,7 @@ class RecomendadorIA:
         """Recomendaciones basadas en el progreso actual"""
         recomendaciones = []
         
-        planes_usuario = {k: v for k, v in self.datos["planes"].items() 
-                         if v["usuario_id"] == usuario_id}
+        planes_usuario = self.indices.planes_de(usuario_id)
         
         if not planes_usuario:
             recomendaciones.append("🎯 Crea tu primer plan de estudio para comenzar tu aventura de aprendizaje")
@@ -126,17 +163,17 @@ class RecomendadorIA:
         
         return recomendaciones
     
-    def _recomendaciones_patrones(self):
+    def _recomendaciones_patrones(self, usuario_id):
         """Recomendaciones basadas en patrones de estudio"""
         recomendaciones = []
+        perfil = self.perfil_usuario(usuario_id)
         
-        if not self.patrones_estudio["horas_preferidas"]:
+        if not perfil["sesiones"]:
             return recomendaciones
         
-        # Analizar horas preferidas
-        horas_comunes = Counter(self.patrones_estudio["horas_preferidas"])
-        if horas_comunes:
-            hora_favorita = horas_comunes.most_common(1)[0][0]
+        # La hora favorita sale del mapa de calor, igual que en recomendar_horario_optimo
+        hora_favorita = mejor_hora(agregado_usuario(self.datos, usuario_id)["mapa"])
+        if hora_favorita is not None:
             if 6 <= hora_favorita <= 10:
                 recomendaciones.append(f"🌅 Tu mejor momento es a las {hora_favorita}:00. ¡Aprovecha las mañanas!")
             elif 14 <= hora_favorita <= 18:
@@ -145,7 +182,7 @@ class RecomendadorIA:
                 recomendaciones.append(f"🌙 Eres más productivo en las noches ({hora_favorita}:00)")
         
         # Recomendaciones sobre duración
-        duracion_prom = self.patrones_estudio["duracion_promedio"]
+        duracion_prom = perfil["duracion_promedio"]
         if duracion_prom > 0:
             if duracion_prom < 20:
                 recomendaciones.append("⏰ Tus sesiones son cortas. Intenta llegar a 25-30 minutos para mayor efectividad")
@@ -155,7 +192,7 @@ class RecomendadorIA:
                 recomendaciones.append(f"✅ Duración ideal de {duracion_prom} min. ¡Sigue así!")
         
         # Recomendaciones sobre satisfacción
-        satisfaccion_prom = self.patrones_estudio["satisfaccion_promedio"]
+        satisfaccion_prom = perfil["satisfaccion_promedio"]
         if satisfaccion_prom > 0:
             if satisfaccion_prom < 6:
                 recomendaciones.append("😔 Satisfacción baja. Prueba cambiar de ambiente o método de estudio")
@@ -216,8 +253,8 @@ class RecomendadorIA:
     def _recomendaciones_motivacionales(self, usuario_id):
         """Recomendaciones motivacionales personalizadas"""
         puntos_totales = self.datos["puntos"].get(usuario_id, 0)
-        total_sesiones = sum(1 for s in self.datos["sesiones"] 
-                           if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == usuario_id)
+        sesiones_usuario = self.indices.sesiones_de(usuario_id)
+        total_sesiones = len(sesiones_usuario)
         
         motivacionales = []
         
@@ -232,8 +269,7 @@ class RecomendadorIA:
             motivacionales.append("💪 Tu disciplina es admirable. ¡Los grandes logros vienen de pequeños pasos!")
         
         # Motivación basada en tiempo de estudio
-        tiempo_total = sum(s["duracion"] for s in self.datos["sesiones"]
-                          if self.datos["planes"].get(s["plan_id"], {}).get("usuario_id") == usuario_id)
+        tiempo_total = sum(s["duracion"] for s in sesiones_usuario)
         
         if tiempo_total >= 300:  # 5 horas
             horas = tiempo_total // 60
@@ -242,13 +278,11 @@ class RecomendadorIA:
         return motivacionales[:2]  # Máximo 2 motivacionales
     
     def recomendar_horario_optimo(self, usuario_id):
-        """Sugiere el mejor horario basado en patrones"""
-        if not self.patrones_estudio["horas_preferidas"]:
+        """Sugiere el mejor horario con el mapa de calor del usuario (sin recorrer sesiones)"""
+        hora = mejor_hora(agregado_usuario(self.datos, usuario_id)["mapa"])
+        if hora is None:
             return "🕐 Aún no tengo suficientes datos. Estudia a diferentes horas para encontrar tu momento óptimo"
         
-        horas_exitosas = Counter(self.patrones_estudio["horas_preferidas"])
-        mejor_hora = horas_exitosas.most_common(1)[0][0]
-        
         franjas_horarias = {
             range(6, 10): "🌅 Mañana temprano",
             range(10, 14): "☀️ Mañana tardía", 
@@ -259,11 +293,11 @@ class RecomendadorIA:
         
         franja = "🕐 Horario personalizado"
         for rango, nombre in franjas_horarias.items():
-            if mejor_hora in rango:
+            if hora in rango:
                 franja = nombre
                 break
         
-        return f"🎯 Tu horario óptimo: {franja} (alrededor de las {mejor_hora}:00)"
+        return f"🎯 Tu horario óptimo: {franja} (alrededor de las {hora}:00)"
     
     def recomendar_duracion_ideal(self, usuario_id):
         """Sugiere duración ideal basada en satisfacción vs duración"""
@@ -271,11 +305,7 @@ class RecomendadorIA:
             return "⏰ Comienza con sesiones de 20-25 minutos para crear el hábito"
         
         # Encontrar sesiones del usuario
-        sesiones_usuario = []
-        for sesion in self.datos["sesiones"]:
-            plan = self.datos["planes"].get(sesion["plan_id"], {})
-            if plan.get("usuario_id") == usuario_id:
-                sesiones_usuario.append(sesion)
+        sesiones_usuario = self.indices.sesiones_de(usuario_id)
         
         if not sesiones_usuario:
             return "⏰ Comienza con sesiones de 20-25 minutos"
@@ -324,68 +354,13 @@ class RecomendadorIA:
         usuario = self.datos["usuarios"][usuario_id]
         nivel = usuario["nivel"]
         
-        # Base de conocimiento para diferentes temas y niveles
-        planes_ia = {
-            "python": {
-                "principiante": {
-                    "objetivos": [
-                        "Dominar la sintaxis básica de Python",
-                        "Crear programas simples con variables y loops",
-                        "Entender listas, diccionarios y funciones",
-                        "Hacer tu primer proyecto: calculadora o juego simple"
-                    ],
-                    "recursos_personalizados": [
-                        "🎯 Para tu nivel: Curso interactivo Python.org",
-                        "📚 Libro recomendado: 'Automate the Boring Stuff'",
-                        "💻 Práctica: Ejercicios en Codecademy",
-                        "🎥 Videos: Canal 'Python para Principiantes' YouTube"
-                    ],
-                    "hitos_semanales": [
-                        "Semana 1: Variables, tipos de datos, input/output",
-                        "Semana 2: Condicionales y loops básicos",
-                        "Semana 3: Listas y funciones simples",
-                        "Semana 4: Proyecto final: programa interactivo"
-                    ]
-                },
-                "intermedio": {
-                    "objetivos": [
-                        "Programación orientada a objetos",
-                        "Manejo de archivos y excepciones", 
-                        "Usar librerías como requests y pandas",
-                        "Crear una aplicación web simple"
-                    ],
-                    "recursos_personalizados": [
-                        "🚀 Nivel intermedio: Real Python tutorials",
-                        "📊 Proyecto: Análisis de datos con pandas",
-                        "🌐 Flask para web development",
-                        "🔧 GitHub para versionar tu código"
-                    ]
-                }
-            },
-            "matemáticas": {
-                "principiante": {
-                    "objetivos": [
-                        "Operaciones básicas con confianza",
-                        "Fracciones, decimales y porcentajes",
-                        "Geometría básica y medidas",
-                        "Resolver problemas del mundo real"
-                    ],
-                    "recursos_personalizados": [
-                        "🎓 Khan Academy: módulos interactivos",
-                        "📱 App: Photomath (para verificar resultados)",
-                        "📚 Cuaderno de ejercicios diarios",
-                        "🎯 Problemas cotidianos: cocina, compras, etc."
-                    ]
-                }
-            }
-        }
-        
         # Personalizar según patrones del usuario
         duracion_recomendada = 30
-        if self.patrones_estudio["duracion_promedio"] > 0:
-            duracion_recomendada = min(60, max(20, self.patrones_estudio["duracion_promedio"]))
+        perfil = self.perfil_usuario(usuario_id)
+        if perfil["duracion_promedio"] > 0:
+            duracion_recomendada = min(60, max(20, perfil["duracion_promedio"]))
         
-        plan_base = planes_ia.get(tema.lower(), {}).get(nivel, {
+        plan_base = (CATALOGO.seccion(tema, "plan_ia") or {}).get(nivel, {
             "objetivos": [f"Dominar los fundamentos de {tema}", f"Aplicar {tema} en proyectos reales"],
             "recursos_personalizados": [f"Buscar cursos especializados en {tema}"]
         })
@@ -0,0 +1,83 @@
+import csv
+import json
+import os
+from datetime import date, datetime, time
+from itertools import islice
+
+
+def leer_csv(archivo):
+    """Lee filas de un CSV con cabecera, una a una"""
+    with open(archivo, 'r', newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def leer_jsonl(archivo):
+    """Lee un objeto JSON por línea, una a una"""
+    with open(archivo, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea:
+                yield json.loads(linea)
+
+
+LECTORES = {
+    ".csv": leer_csv,
+    ".jsonl": leer_jsonl,
+    ".ndjson": leer_jsonl
+}
+
+
+def leer_filas(archivo):
+    extension = os.path.splitext(archivo)[1].lower()
+    if extension not in LECTORES:
+        raise ValueError(f"Formato '{extension}' no soportado. Opciones: {', '.join(LECTORES)}")
+    return LECTORES[extension](archivo)
+
+
+def normalizar_sesion(fila):
+    """Convierte una fila importada en una sesión como las de aplicar_sesion.
+
+    Acepta "fecha" (YYYY-MM-DD) con "hora" (HH:MM) opcional, o un "timestamp"
+    ISO 8601. Lanza ValueError si falta algún campo o no es válido.
+    """
+    plan_id = fila.get("plan_id")
+    if not plan_id:
+        raise ValueError("falta plan_id")
+
+    duracion = int(float(fila.get("duracion") or 0))
+    if duracion <= 0:
+        raise ValueError("la duración debe ser mayor a 0")
+    puntuacion = fila.get("puntuacion")
+    # Sin puntuación se toma la media; un 0 es un valor y se lleva al mínimo
+    puntuacion = 5.0 if puntuacion is None or puntuacion == "" else float(puntuacion)
+    puntuacion = max(1.0, min(10.0, puntuacion))
+
+    if fila.get("timestamp"):
+        momento = datetime.fromisoformat(fila["timestamp"])
+        fecha, hora = momento.date(), momento.strftime("%H:%M")
+    elif fila.get("fecha"):
+        fecha = date.fromisoformat(fila["fecha"])
+        hora = time.fromisoformat(fila["hora"]).strftime("%H:%M") if fila.get("hora") else None
+    else:
+        raise ValueError("falta fecha o timestamp")
+
+    sesion = {
+        "plan_id": plan_id,
+        "duracion": duracion,
+        "puntuacion": puntuacion,
+        "fecha": fecha.strftime("%Y-%m-%d")
+    }
+    if hora is not None:
+        sesion["hora"] = hora
+    sesion["notas"] = fila.get("notas") or ""
+    return sesion
+
+
+def en_lotes(filas, tam_lote):
+    """Agrupa un iterable en listas de como mucho tam_lote elementos"""
+    filas = iter(filas)
+    while True:
+        lote = list(islice(filas, tam_lote))
+        if not lote:
+            return
+        yield lote
@@ -0,0 +1,76 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+class IndiceDatos:
+    """Índices en memoria de planes y sesiones por usuario, plan y fecha.
+
+    Los índices por plan y por fecha guardan la posición de cada sesión en
+    datos["sesiones"], así que al combinarlos se conserva el orden de registro.
+    """
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.reconstruir()
+
+    def reconstruir(self):
+        """Recorre todos los datos una sola vez para construir los índices"""
+        self.planes_por_usuario = defaultdict(list)
+        self.sesiones_por_usuario = defaultdict(list)
+        self.filas_por_plan = defaultdict(list)
+        self.filas_por_fecha = defaultdict(list)
+        self._fechas = None             # fechas distintas ordenadas, se calculan al consultar
+        self._total_sesiones = 0
+
+        for plan_id, plan in self.datos["planes"].items():
+            self.planes_por_usuario[plan["usuario_id"]].append(plan_id)
+
+        for sesion in self.datos["sesiones"]:
+            self.agregar_sesion(sesion)
+
+    def agregar_plan(self, plan_id, plan):
+        planes_usuario = self.planes_por_usuario[plan["usuario_id"]]
+        if plan_id not in planes_usuario:
+            planes_usuario.append(plan_id)
+
+    def agregar_sesion(self, sesion):
+        fila = self._total_sesiones
+        self._total_sesiones += 1
+        plan = self.datos["planes"].get(sesion["plan_id"])
+        if plan is not None:
+            self.sesiones_por_usuario[plan["usuario_id"]].append(sesion)
+        self.filas_por_plan[sesion["plan_id"]].append(fila)
+        fecha = sesion.get("fecha", "")
+        if fecha not in self.filas_por_fecha:
+            self._fechas = None
+        self.filas_por_fecha[fecha].append(fila)
+
+    def aplicar_cambio(self, cambio):
+        """Mantiene los índices al día con cada inserción registrada"""
+        if cambio["op"] == "plan":
+            self.agregar_plan(cambio["plan_id"], cambio["plan"])
+        elif cambio["op"] == "sesion":
+            self.agregar_sesion(cambio["sesion"])
+
+    def sesiones_de(self, usuario_id):
+        """Sesiones del usuario en orden de registro (no modificar la lista)"""
+        return self.sesiones_por_usuario.get(usuario_id, [])
+
+    def sesiones_de_planes(self, plan_ids):
+        """Sesiones de varios planes en orden de registro"""
+        filas = heapq.merge(*(self.filas_por_plan.get(plan_id, []) for plan_id in plan_ids))
+        return (self.datos["sesiones"][fila] for fila in filas)
+
+    def sesiones_entre(self, desde=None, hasta=None):
+        """Sesiones con fecha entre desde y hasta (inclusive) en orden de registro"""
+        if self._fechas is None:
+            self._fechas = sorted(self.filas_por_fecha)
+        inicio = bisect_left(self._fechas, desde) if desde else 0
+        fin = bisect_right(self._fechas, hasta) if hasta else len(self._fechas)
+        filas = heapq.merge(*(self.filas_por_fecha[fecha] for fecha in self._fechas[inicio:fin]))
+        return (self.datos["sesiones"][fila] for fila in filas)
+
+    def planes_de(self, usuario_id):
+        return {plan_id: self.datos["planes"][plan_id]
+                for plan_id in self.planes_por_usuario.get(usuario_id, [])}
@@ -0,0 +1,216 @@
+from datetime import date
+
+from temas import plegar
+
+# Puntos fijos de la gamificación
+PUNTOS_PLAN_MANUAL = 5
+PUNTOS_PLAN_IA = 10
+PUNTOS_PLAN_COMPLETADO = 50
+
+LOGROS_DISPONIBLES = {
+    "primer_dia": {"nombre": "🌱 Primer Paso", "descripcion": "Completar primera sesión", "puntos": 10},
+    "racha_3": {"nombre": "🔥 En Racha", "descripcion": "3 días consecutivos", "puntos": 25},
+    "racha_7": {"nombre": "⚡ Imparable", "descripcion": "7 días consecutivos", "puntos": 50},
+    "racha_30": {"nombre": "👑 Leyenda", "descripcion": "30 días consecutivos", "puntos": 200},
+    "madrugador": {"nombre": "🌅 Madrugador", "descripcion": "Estudiar antes de las 8am", "puntos": 15},
+    "nocturno": {"nombre": "🌙 Búho Nocturno", "descripcion": "Estudiar después de las 10pm", "puntos": 15},
+    "maraton": {"nombre": "🏃 Maratón", "descripcion": "Sesión de más de 2 horas", "puntos": 30},
+    "consistente": {"nombre": "🎯 Consistente", "descripcion": "10 sesiones completadas", "puntos": 40},
+    "explorador": {"nombre": "🗺️ Explorador", "descripcion": "Estudiar 3 temas diferentes", "puntos": 35},
+    "perfeccionista": {"nombre": "💎 Perfeccionista", "descripcion": "5 sesiones con puntuación 9+", "puntos": 45}
+}
+
+
+def puntos_sesion(duracion, puntuacion):
+    # Puntos base por duración
+    puntos_base = min(duracion // 10, 20)  # Máximo 20 puntos por duración
+    
+    # Bonus por satisfacción alta
+    if puntuacion >= 8:
+        puntos_base += 5
+    elif puntuacion >= 6:
+        puntos_base += 2
+    
+    return max(puntos_base, 1)  # Mínimo 1 punto
+
+
+def puntos_plan(plan):
+    return PUNTOS_PLAN_IA if plan.get("generado_con_ia") else PUNTOS_PLAN_MANUAL
+
+
+def incremento_progreso(duracion):
+    """Progreso que suma una sesión al plan, basado en la duración"""
+    return min(10, max(3, duracion // 15))
+
+
+def racha_vacia():
+    return {"actual": 0, "maxima": 0, "ultima_fecha": None}
+
+
+def avanzar_racha(racha_data, fecha):
+    """Cuenta un día de estudio ("YYYY-MM-DD") en la racha"""
+    # Si es el primer día o ayer no estudió
+    if racha_data["ultima_fecha"] is None:
+        racha_data["actual"] = 1
+    else:
+        diferencia = (date.fromisoformat(fecha) - date.fromisoformat(racha_data["ultima_fecha"])).days
+        
+        if diferencia == 1:  # Día consecutivo
+            racha_data["actual"] += 1
+        elif diferencia == 0:  # Mismo día, no cambia racha
+            pass
+        elif diferencia < 0:  # Un día anterior al último no mueve la racha
+            return
+        else:  # Se rompió la racha
+            racha_data["actual"] = 1
+    
+    # Actualizar racha máxima
+    if racha_data["actual"] > racha_data["maxima"]:
+        racha_data["maxima"] = racha_data["actual"]
+    
+    racha_data["ultima_fecha"] = fecha
+
+
+class Regla:
+    """Regla de un logro.
+
+    Se suscribe a eventos ("sesion", "plan") y puede llevar un estado pequeño
+    por usuario que se actualiza en observar() con cada sesión. cumple() se
+    evalúa en O(1) con ese estado y el contexto del evento.
+    """
+
+    logro = None
+    eventos = ("sesion",)
+
+    def estado_inicial(self):
+        return None
+
+    def observar(self, estado, sesion, tema):
+        return estado
+
+    def cumple(self, estado, contexto):
+        return False
+
+
+class ReglaContador(Regla):
+    """Cuenta las sesiones que pasan un filtro hasta llegar a un mínimo"""
+
+    def __init__(self, logro, minimo, filtro=None):
+        self.logro = logro
+        self.minimo = minimo
+        self.filtro = filtro
+
+    def estado_inicial(self):
+        return 0
+
+    def observar(self, estado, sesion, tema):
+        if self.filtro is None or self.filtro(sesion):
+            estado += 1
+        return estado
+
+    def cumple(self, estado, contexto):
+        return estado >= self.minimo
+
+
+class ReglaTemasDistintos(Regla):
+    """Sesiones en al menos N temas distintos"""
+
+    def __init__(self, logro, minimo):
+        self.logro = logro
+        self.minimo = minimo
+
+    def estado_inicial(self):
+        return []
+
+    def observar(self, estado, sesion, tema):
+        # Con llegar al mínimo basta: la lista nunca pasa de N elementos
+        if tema is not None and len(estado) < self.minimo:
+            # "Inglés" e "ingles" son el mismo tema; los estados guardados antes de
+            # plegar pueden conservar acentos, así que también se pliegan al comparar
+            clave = plegar(tema.strip())
+            if all(plegar(visto) != clave for visto in estado):
+                estado.append(clave)
+        return estado
+
+    def cumple(self, estado, contexto):
+        return len(estado) >= self.minimo
+
+
+class ReglaRacha(Regla):
+    """Racha actual de al menos N días"""
+
+    def __init__(self, logro, dias):
+        self.logro = logro
+        self.dias = dias
+
+    def cumple(self, estado, contexto):
+        return contexto["racha"] >= self.dias
+
+
+class ReglaSesion(Regla):
+    """Condición que depende solo de la sesión recién registrada"""
+
+    def __init__(self, logro, condicion):
+        self.logro = logro
+        self.condicion = condicion
+
+    def cumple(self, estado, contexto):
+        return self.condicion(contexto["sesion"])
+
+
+def hora_sesion(sesion):
+    if "hora" not in sesion:
+        return None
+    return int(sesion["hora"].split(":")[0])
+
+
+def es_madrugada(sesion):
+    hora = hora_sesion(sesion)
+    return hora is not None and hora < 8
+
+
+def es_noche(sesion):
+    hora = hora_sesion(sesion)
+    return hora is not None and hora >= 22
+
+
+REGLAS = [
+    ReglaContador("primer_dia", 1),
+    ReglaRacha("racha_3", 3),
+    ReglaRacha("racha_7", 7),
+    ReglaRacha("racha_30", 30),
+    ReglaSesion("madrugador", es_madrugada),
+    ReglaSesion("nocturno", es_noche),
+    ReglaSesion("maraton", lambda s: s["duracion"] >= 120),
+    ReglaContador("consistente", 10),
+    ReglaTemasDistintos("explorador", 3),
+    ReglaContador("perfeccionista", 5, lambda s: s["puntuacion"] >= 9)
+]
+
+REGLAS_CON_ESTADO = [regla for regla in REGLAS if regla.estado_inicial() is not None]
+
+
+def observar_sesion(estado_reglas, sesion, tema, reglas=REGLAS_CON_ESTADO):
+    """Actualiza el estado de las reglas de un usuario con una sesión nueva"""
+    for regla in reglas:
+        estado = estado_reglas.get(regla.logro)
+        if estado is None:
+            estado = regla.estado_inicial()
+        estado_reglas[regla.logro] = regla.observar(estado, sesion, tema)
+
+
+def estado_completo(estado_reglas):
+    """Indica si hay estado para todas las reglas (falta al añadir reglas nuevas)"""
+    return all(regla.logro in estado_reglas for regla in REGLAS_CON_ESTADO)
+
+
+def evaluar_logros(evento, contexto, estado_reglas, logros_usuario, reglas=REGLAS):
+    """Devuelve los logros que se desbloquean con este evento, en O(número de reglas)"""
+    conseguidos = set(logros_usuario)
+    nuevos = []
+    for regla in reglas:
+        if evento not in regla.eventos or regla.logro in conseguidos:
+            continue
+        if regla.cumple(estado_reglas.get(regla.logro), contexto):
+            nuevos.append(regla.logro)
+    return nuevos
@@ -1,5 +1,8 @@
 # main.py - Archivo principal del Asistente de Aprendizaje Gamificado
 from assistant import AsistenteAprendizaje
+from almacenamiento import ALMACENES
+from importacion import leer_filas
+import argparse
 import os
 import platform
 
@@ -41,13 +44,13 @@ def mostrar_consejos():
     import random
     print(f"\n{random.choice(consejos)}")
 
-def main():
+def main(almacenamiento=None):
     limpiar_pantalla()  # Limpiar al iniciar
     mostrar_banner()
     print("🌟 ¡Bienvenido a tu asistente personal de aprendizaje!")
     print("🎮 Gana puntos, desbloquea logros y sube de nivel mientras aprendes")
     
-    asistente = AsistenteAprendizaje()
+    asistente = AsistenteAprendizaje(almacenamiento)
     
     # Mostrar resumen rápido si hay usuarios
     if asistente.datos["usuarios"]:
@@ -112,7 +115,7 @@ def main():
                 
                 # Mensaje personalizado si hay datos
                 if asistente.datos["sesiones"]:
-                    total_tiempo = sum(s["duracion"] for s in asistente.datos["sesiones"])
+                    total_tiempo = asistente.datos["agregados"]["global"]["tiempo_total"]
                     print(f"📊 Has estudiado un total de {total_tiempo} minutos. ¡Increíble!")
                 
                 break
@@ -141,6 +144,8 @@ def main():
             continuar = input("\n¿Quieres continuar? (s/n): ").lower().strip()
             if continuar != 's':
                 break
+    
+    asistente.cerrar()
 
 def mostrar_ayuda():
     """Función para mostrar ayuda sobre cómo usar el asistente"""
@@ -157,5 +162,90 @@ def mostrar_ayuda():
     print("• Alta satisfacción (8-10) = puntos bonus")
     print("• Estudia temprano (antes 8am) o tarde (después 10pm) para logros especiales")
 
+# ===== COMANDOS NO INTERACTIVOS =====
+
+def comando_reconstruir(args):
+    asistente = AsistenteAprendizaje(args.almacenamiento)
+    print(f"🔁 Reconstruyendo puntos, rachas y logros de {len(asistente.datos['sesiones'])} sesiones...")
+    asistente.reconstruir_estado(args.procesos)
+    asistente.cerrar()
+
+def comando_importar(args):
+    asistente = AsistenteAprendizaje(args.almacenamiento)
+    resultado = asistente.importar_sesiones(leer_filas(args.archivo), args.lote)
+    asistente.cerrar()
+    print(f"✅ {resultado['importadas']} sesión(es) importada(s)")
+    if resultado["rechazadas"]:
+        print(f"⚠️ {len(resultado['rechazadas'])} fila(s) rechazada(s):")
+        for numero_fila, motivo in resultado["rechazadas"][:10]:
+            print(f"   Fila {numero_fila}: {motivo}")
+
+def comando_planes(args):
+    asistente = AsistenteAprendizaje(args.almacenamiento)
+    resultado = asistente.crear_planes_lote(leer_filas(args.archivo), args.ia)
+    asistente.cerrar()
+    print(f"✅ {len(resultado['creados'])} plan(es) creado(s)")
+    if resultado["rechazadas"]:
+        print(f"⚠️ {len(resultado['rechazadas'])} fila(s) rechazada(s):")
+        for numero_fila, motivo in resultado["rechazadas"][:10]:
+            print(f"   Fila {numero_fila}: {motivo}")
+
+def comando_exportar(args):
+    asistente = AsistenteAprendizaje(args.almacenamiento)
+    asistente.exportar(args.que, args.archivo, args.usuario, args.desde, args.hasta, args.tema)
+
+def comando_ranking(args):
+    asistente = AsistenteAprendizaje(args.almacenamiento)
+    asistente.mostrar_clasificacion(args.top, args.usuario, args.nivel)
+
+def entero_positivo(texto):
+    valor = int(texto)
+    if valor <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor a 0: {texto}")
+    return valor
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Asistente de Aprendizaje Gamificado. Sin comando abre el menú interactivo.")
+    parser.add_argument("--almacenamiento", choices=sorted(ALMACENES),
+                        help="Modo de almacenamiento (por defecto ASISTENTE_ALMACENAMIENTO o json)")
+    comandos = parser.add_subparsers(dest="comando")
+    
+    reconstruir = comandos.add_parser("reconstruir", help="Recalcular puntos, rachas y logros desde el historial")
+    reconstruir.add_argument("--procesos", type=int, default=None,
+                             help="Procesos en paralelo (por defecto uno por CPU)")
+    reconstruir.set_defaults(funcion=comando_reconstruir)
+    
+    importar = comandos.add_parser("importar", help="Importar sesiones con fecha desde un CSV o JSONL")
+    importar.add_argument("archivo", help="Archivo .csv o .jsonl con plan_id, duracion, puntuacion y fecha/hora o timestamp")
+    importar.add_argument("--lote", type=int, default=10000,
+                          help="Sesiones que se confirman en cada escritura (por defecto 10000)")
+    importar.set_defaults(funcion=comando_importar)
+    
+    planes = comandos.add_parser("planes", help="Crear planes en bloque desde un CSV o JSONL")
+    planes.add_argument("archivo", help="Archivo .csv o .jsonl con usuario_id, tema y dias (opcional, 30 por defecto)")
+    planes.add_argument("--ia", action="store_true", help="Personalizar cada plan con el recomendador de IA")
+    planes.set_defaults(funcion=comando_planes)
+    
+    exportar = comandos.add_parser("exportar", help="Exportar sesiones, planes o agregados a CSV o JSONL")
+    exportar.add_argument("que", choices=["sesiones", "planes", "agregados"])
+    exportar.add_argument("archivo", help="Archivo .csv o .jsonl de salida")
+    exportar.add_argument("--usuario", help="Solo este usuario")
+    exportar.add_argument("--desde", help="Fecha inicial YYYY-MM-DD (solo sesiones)")
+    exportar.add_argument("--hasta", help="Fecha final YYYY-MM-DD, inclusive (solo sesiones)")
+    exportar.add_argument("--tema", help="Solo planes o sesiones de este tema")
+    exportar.set_defaults(funcion=comando_exportar)
+    
+    ranking = comandos.add_parser("ranking", help="Ver la clasificación por puntos")
+    ranking.add_argument("--top", type=entero_positivo, default=10, help="Cuántos usuarios mostrar (por defecto 10)")
+    ranking.add_argument("--usuario", help="Mostrar además el puesto de este usuario")
+    ranking.add_argument("--nivel", type=entero_positivo, help="Solo los usuarios de este nivel")
+    ranking.set_defaults(funcion=comando_ranking)
+    
+    return parser
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = crear_parser().parse_args()
+    if args.comando is None:
+        main(args.almacenamiento)
+    else:
+        args.funcion(args)
\ No newline at end of file
@@ -0,0 +1,74 @@
+from datetime import date
+
+# Mapa de calor de 24x7 guardado como diccionario disperso: solo existen las
+# celdas con alguna sesión. La clave de (día, hora) es str(dia * 24 + hora),
+# con el lunes como día 0, y el valor [minutos, sesiones, suma_puntuacion].
+HORAS = 24
+DIAS = 7
+CELDAS = HORAS * DIAS
+CAMPOS = {"minutos": 0, "sesiones": 1, "suma_puntuacion": 2}
+SOMBRAS = " ░▒▓█"
+
+
+def mapa_vacio():
+    return {"celdas": {}}
+
+
+def mapa_vigente(mapa):
+    """Pasa al formato disperso un mapa guardado con las tres listas de 168 valores"""
+    if "celdas" in mapa:
+        return mapa
+    return {"celdas": {str(celda): [mapa["minutos"][celda], mapa["sesiones"][celda], mapa["suma_puntuacion"][celda]]
+                       for celda in range(CELDAS) if mapa["sesiones"][celda]}}
+
+
+def acumular_mapa(mapa, sesion):
+    """Suma la sesión a su celda; las sesiones sin fecha u hora no cuentan"""
+    if not sesion.get("fecha") or not sesion.get("hora"):
+        return
+    celda = date.fromisoformat(sesion["fecha"]).weekday() * HORAS + int(sesion["hora"].split(":")[0])
+    valores = mapa["celdas"].setdefault(str(celda), [0, 0, 0])
+    valores[0] += sesion["duracion"]
+    valores[1] += 1
+    valores[2] += sesion["puntuacion"]
+
+
+def valores_celda(mapa, dia, hora):
+    """[minutos, sesiones, suma_puntuacion] de una celda (ceros si no hay sesiones)"""
+    return mapa["celdas"].get(str(dia * HORAS + hora), [0, 0, 0])
+
+
+def totales_por_hora(mapa, campo="sesiones"):
+    """Suma de cada hora sobre los siete días (lista de 24)"""
+    totales = [0] * HORAS
+    for celda, valores in mapa["celdas"].items():
+        totales[int(celda) % HORAS] += valores[CAMPOS[campo]]
+    return totales
+
+
+def mejor_hora(mapa):
+    """Hora con más sesiones (a igualdad, la de mayor satisfacción media); None sin datos"""
+    sesiones = totales_por_hora(mapa)
+    puntuacion = totales_por_hora(mapa, "suma_puntuacion")
+    hora = max(range(HORAS), key=lambda h: (sesiones[h], puntuacion[h] / sesiones[h] if sesiones[h] else 0))
+    return hora if sesiones[hora] else None
+
+
+def mejor_celda(mapa):
+    """(día, hora) con más sesiones y mejor satisfacción media; None sin datos"""
+    if not mapa["celdas"]:
+        return None
+    celda = max(mapa["celdas"], key=lambda c: (mapa["celdas"][c][1], mapa["celdas"][c][2] / mapa["celdas"][c][1],
+                                               -int(c)))
+    return divmod(int(celda), HORAS)
+
+
+def filas_mapa(mapa, campo="minutos"):
+    """Una cadena de 24 caracteres por día, más oscura cuanto más alto el valor"""
+    indice = CAMPOS[campo]
+    maximo = max((valores[indice] for valores in mapa["celdas"].values()), default=0)
+    if not maximo:
+        return [" " * HORAS for _ in range(DIAS)]
+    escala = len(SOMBRAS) - 1
+    return ["".join(SOMBRAS[-(-valores_celda(mapa, dia, hora)[indice] * escala // maximo)] for hora in range(HORAS))
+            for dia in range(DIAS)]
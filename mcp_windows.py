@@ -7,6 +7,9 @@ import asyncio
 import json
 import os
 import sys
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime
 
 # NO modificar stdout/stderr para Windows - dejar que MCP lo maneje
 # Solo configurar variables de entorno
@@ -18,13 +21,479 @@ import mcp.types as types
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 
+from agregados import agregado_usuario
+from assistant import AsistenteAprendizaje
+from clasificacion import nivel_de
+from tendencias import detectar_caidas
+
 # Crear servidor
 server = Server("learning-assistant")
 
-# Datos simples en memoria
-usuarios_data = {}
-planes_data = {}
-sesiones_data = []
+# Segundos que se espera tras la primera escritura de una ráfaga para guardar
+# junto con ella las que lleguen mientras tanto
+VENTANA_ESCRITURA = 0.05
+# Los datos viven en data/ junto a main.py, se lance desde donde se lance el servidor
+CARPETA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+NIVELES = ["principiante", "intermedio", "avanzado"]
+# Elementos como máximo en cada llamada a una herramienta por lotes
+MAX_LOTE = 5000
+# Puestos como máximo en una respuesta de ver_ranking
+MAX_RANKING = 100
+
+
+class EscrituraDiferida:
+    """Ejecuta las herramientas sobre el AsistenteAprendizaje compartido.
+
+    Todo el trabajo con los datos va a un hilo (asyncio.to_thread) para no
+    bloquear el bucle de eventos, de uno en uno gracias al cerrojo. Las
+    escrituras se encolan y se aplican por grupos: las que llegan dentro de
+    VENTANA_ESCRITURA van en una sola transacción con un único guardado, y
+    cada llamada recibe su respuesta cuando el grupo ya está en disco. Si una
+    falla se descartan sus cambios y las demás del grupo se vuelven a aplicar
+    sobre lo guardado, así que nunca se guarda una llamada a medias.
+    """
+
+    def __init__(self, ventana=VENTANA_ESCRITURA, carpeta_datos=CARPETA_DATOS):
+        self.ventana = ventana
+        self.carpeta_datos = carpeta_datos
+        self.cerrojo = threading.Lock()
+        self.asistente = None
+        self._pendientes = []
+        self._trabajador = None
+
+    def _asistente(self):
+        if self.asistente is None:
+            self.asistente = AsistenteAprendizaje(carpeta_datos=self.carpeta_datos)
+        return self.asistente
+
+    def _leer(self, funcion, argumentos):
+        # Lo que imprima el asistente va a stderr: stdout es el canal del protocolo
+        with self.cerrojo, redirect_stdout(sys.stderr):
+            return funcion(self._asistente(), argumentos)
+
+    def _aplicar_grupo(self, grupo):
+        """Aplica las escrituras (funcion, argumentos) y las guarda juntas.
+
+        Devuelve un (resultado, error) por escritura, en el mismo orden.
+        """
+        with self.cerrojo, redirect_stdout(sys.stderr):
+            asistente = self._asistente()
+            salidas = [None] * len(grupo)
+            aplicadas = []
+            with asistente.transaccion():
+                for indice, (funcion, argumentos) in enumerate(grupo):
+                    try:
+                        salidas[indice] = (funcion(asistente, argumentos), None)
+                        aplicadas.append(indice)
+                    except Exception as e:
+                        salidas[indice] = (None, e)
+                        # Vuelta a lo guardado y se repiten las anteriores que sí funcionaron
+                        asistente.deshacer_cambios()
+                        for anterior in aplicadas:
+                            funcion_anterior, argumentos_anteriores = grupo[anterior]
+                            salidas[anterior] = (funcion_anterior(asistente, argumentos_anteriores), None)
+
+            # guardar_datos avisa de los errores sin lanzarlos: lo que no se guardó no se confirma
+            if asistente.cambios_pendientes:
+                asistente.deshacer_cambios()
+                raise OSError("No se pudieron guardar los datos")
+            return salidas
+
+    async def leer(self, funcion, argumentos):
+        return await asyncio.to_thread(self._leer, funcion, argumentos)
+
+    async def escribir(self, funcion, argumentos):
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append((funcion, argumentos, futuro))
+        if self._trabajador is None or self._trabajador.done():
+            self._trabajador = asyncio.create_task(self._trabajar())
+        return await futuro
+
+    async def _trabajar(self):
+        while self._pendientes:
+            await asyncio.sleep(self.ventana)
+            grupo, self._pendientes = self._pendientes, []
+            try:
+                salidas = await asyncio.to_thread(self._aplicar_grupo, [(f, a) for f, a, _ in grupo])
+            except Exception as e:
+                salidas = [(None, e)] * len(grupo)
+            for (_, _, futuro), (resultado, error) in zip(grupo, salidas):
+                if futuro.done():
+                    continue
+                if error is None:
+                    futuro.set_result(resultado)
+                else:
+                    futuro.set_exception(error)
+
+    def _cerrar(self):
+        with self.cerrojo, redirect_stdout(sys.stderr):
+            if self.asistente is not None:
+                self.asistente.cerrar()
+
+    async def vaciar(self):
+        """Espera a que se guarden las escrituras encoladas y cierra el almacén"""
+        if self._trabajador is not None:
+            await self._trabajador
+        await asyncio.to_thread(self._cerrar)
+
+
+cola = EscrituraDiferida()
+
+
+def _alertas(asistente, user_id):
+    """Caídas detectadas con las medias móviles del usuario, sin recorrer sus sesiones"""
+    return [
+        {"campo": campo, "reciente": round(reciente, 1), "habitual": round(habitual, 1)}
+        for campo, reciente, habitual in detectar_caidas(agregado_usuario(asistente.datos, user_id)["tendencias"])
+    ]
+
+
+def _entero(valor):
+    """El valor como int si es un número entero (30 o 30.0), o None"""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return None
+
+
+def _validar_sesion(asistente, sesion):
+    """Devuelve (sesión limpia, None) o (None, motivo); la usan registrar_sesion y el lote"""
+    plan_id = sesion.get("plan_id")
+    if not isinstance(plan_id, str) or plan_id not in asistente.datos["planes"]:
+        return None, f"Plan {plan_id} no encontrado"
+    minutos = _entero(sesion.get("minutos"))
+    if minutos is None or minutos <= 0:
+        return None, "Los minutos deben ser un número entero mayor a 0"
+    satisfaccion = sesion.get("satisfaccion")
+    if (isinstance(satisfaccion, bool) or not isinstance(satisfaccion, (int, float))
+            or not 1 <= satisfaccion <= 10):
+        return None, "La satisfacción debe estar entre 1 y 10"
+    notas = sesion.get("notas", "")
+    if not isinstance(notas, str):
+        return None, "Las notas deben ser texto"
+    return {"plan_id": plan_id, "minutos": minutos, "satisfaccion": satisfaccion, "notas": notas}, None
+
+
+# ===== HERRAMIENTAS =====
+# Cada una recibe el asistente y los argumentos y devuelve el diccionario de respuesta
+
+def test_conexion(asistente, arguments):
+    return {
+        "exito": True,
+        "mensaje": "¡Servidor MCP funcionando perfectamente!",
+        "version": "1.0.0",
+        "usuarios_registrados": len(asistente.datos["usuarios"]),
+        "planes_creados": len(asistente.datos["planes"])
+    }
+
+
+def crear_usuario(asistente, arguments):
+    if arguments["nivel"] not in NIVELES:
+        return {"exito": False, "error": f"Nivel '{arguments['nivel']}' no válido. Opciones: {', '.join(NIVELES)}"}
+    user_id = asistente.registrar_usuario(arguments["nombre"], arguments["nivel"], arguments["intereses"])
+
+    return {
+        "exito": True,
+        "mensaje": f"Usuario '{arguments['nombre']}' creado exitosamente",
+        "user_id": user_id,
+        "nivel": arguments["nivel"],
+        "intereses": asistente.datos["usuarios"][user_id]["intereses"],
+        "puntos_iniciales": 0
+    }
+
+
+def crear_plan(asistente, arguments):
+    user_id = arguments.get("user_id")
+    if not isinstance(user_id, str) or user_id not in asistente.datos["usuarios"]:
+        return {"exito": False, "error": f"Usuario {user_id} no encontrado"}
+    if not isinstance(arguments.get("tema"), str) or not arguments["tema"].strip():
+        return {"exito": False, "error": "Falta el tema"}
+    dias = _entero(arguments.get("dias", 30))
+    if dias is None or dias <= 0:
+        return {"exito": False, "error": "Los días deben ser un número entero mayor a 0"}
+
+    puntos_anteriores = asistente.datos["puntos"].get(user_id, 0)
+    plan_id = asistente.crear_plan(user_id, arguments["tema"], dias)
+    plan = asistente.datos["planes"][plan_id]
+
+    return {
+        "exito": True,
+        "mensaje": f"Plan de {arguments['tema']} creado para {asistente.datos['usuarios'][user_id]['nombre']}",
+        "plan_id": plan_id,
+        "objetivos": plan["objetivos"],
+        "recursos": plan["recursos"],
+        "fecha_limite": plan["fecha_limite"],
+        "puntos_ganados": asistente.datos["puntos"][user_id] - puntos_anteriores,
+        "puntos_totales": asistente.datos["puntos"][user_id]
+    }
+
+
+def registrar_sesion(asistente, arguments):
+    sesion, error = _validar_sesion(asistente, arguments)
+    if error:
+        return {"exito": False, "error": error}
+    plan_id = sesion["plan_id"]
+
+    user_id = asistente.datos["planes"][plan_id]["usuario_id"]
+    puntos_anteriores = asistente.datos["puntos"].get(user_id, 0)
+    resumen = asistente.aplicar_sesion(plan_id, sesion["minutos"], sesion["satisfaccion"], sesion["notas"])
+
+    return {
+        "exito": True,
+        "mensaje": "¡Sesión registrada exitosamente!",
+        "progreso_anterior": resumen["progreso_anterior"],
+        "progreso_nuevo": resumen["progreso_nuevo"],
+        "incremento": resumen["incremento"],
+        "puntos_ganados": asistente.datos["puntos"][user_id] - puntos_anteriores,
+        "puntos_totales": asistente.datos["puntos"][user_id],
+        "nuevos_logros": resumen["nuevos_logros"],
+        "tema": asistente.datos["planes"][plan_id]["tema"]
+    }
+
+
+def ver_progreso(asistente, arguments):
+    user_id = arguments["user_id"]
+    if user_id not in asistente.datos["usuarios"]:
+        return {"exito": False, "error": f"Usuario {user_id} no encontrado"}
+
+    usuario = asistente.datos["usuarios"][user_id]
+    planes_usuario = asistente.indices.planes_de(user_id)
+    stats = agregado_usuario(asistente.datos, user_id)
+    puntos = asistente.datos["puntos"].get(user_id, 0)
+
+    return {
+        "exito": True,
+        "usuario": usuario["nombre"],
+        "nivel": usuario["nivel"],
+        "intereses": usuario.get("intereses", []),
+        "puntos": puntos,
+        "nivel_puntos": nivel_de(puntos),
+        "racha": asistente.datos["rachas"].get(user_id, {}).get("actual", 0),
+        "logros": asistente.datos["logros"].get(user_id, []),
+        "planes_activos": len(planes_usuario),
+        "sesiones_completadas": stats["sesiones"],
+        "tiempo_total_minutos": stats["tiempo_total"],
+        "tendencias": stats["tendencias"],
+        "alertas": _alertas(asistente, user_id),
+        "planes": [
+            {
+                "id": k,
+                "tema": v["tema"],
+                "progreso": v["progreso"]
+            }
+            for k, v in planes_usuario.items()
+        ]
+    }
+
+
+def listar_usuarios(asistente, arguments):
+    usuarios_lista = [
+        {
+            "id": user_id,
+            "nombre": datos["nombre"],
+            "nivel": datos["nivel"],
+            "puntos": asistente.datos["puntos"].get(user_id, 0),
+            "planes": len(asistente.indices.planes_de(user_id))
+        }
+        for user_id, datos in asistente.datos["usuarios"].items()
+    ]
+
+    return {
+        "exito": True,
+        "total_usuarios": len(usuarios_lista),
+        "usuarios": usuarios_lista
+    }
+
+
+def ver_alertas(asistente, arguments):
+    alertas = []
+    for user_id, datos in asistente.datos["usuarios"].items():
+        caidas = _alertas(asistente, user_id)
+        if caidas:
+            alertas.append({"id": user_id, "nombre": datos["nombre"], "caidas": caidas})
+
+    return {
+        "exito": True,
+        "usuarios_con_alertas": len(alertas),
+        "alertas": alertas
+    }
+
+
+def ver_ranking(asistente, arguments):
+    clasificacion = asistente.clasificacion
+    top = _entero(arguments.get("top", 10))
+    if top is None or top <= 0:
+        return {"exito": False, "error": "top debe ser un número entero mayor a 0"}
+    top = min(top, MAX_RANKING)
+    nivel = arguments.get("nivel")
+    if nivel is not None:
+        nivel = _entero(nivel)
+        if nivel is None or nivel < 1:
+            return {"exito": False, "error": "El nivel debe ser un número entero desde 1"}
+        primeros = clasificacion.usuarios_de_nivel(nivel, top)
+    else:
+        primeros = clasificacion.top(top)
+
+    resultado = {
+        "exito": True,
+        "total_usuarios": len(clasificacion),
+        "ranking": [
+            {
+                "puesto": clasificacion.posicion(user_id),
+                "id": user_id,
+                "nombre": asistente.datos["usuarios"].get(user_id, {}).get("nombre", user_id),
+                "puntos": puntos,
+                "nivel": nivel_de(puntos)
+            }
+            for user_id, puntos in primeros
+        ],
+        "usuarios_por_nivel": clasificacion.resumen_niveles()
+    }
+    if isinstance(arguments.get("user_id"), str):
+        resultado["puesto_usuario"] = clasificacion.posicion(arguments["user_id"])
+    return resultado
+
+
+# ===== HERRAMIENTAS POR LOTES =====
+# Aplican todos los elementos en una transacción y responden en JSON compacto:
+# solo los errores van por elemento, con su posición "i" en el array
+
+def _lista(arguments, clave):
+    elementos = arguments.get(clave)
+    if not isinstance(elementos, list) or not elementos:
+        raise ValueError(f"'{clave}' debe ser una lista no vacía")
+    if len(elementos) > MAX_LOTE:
+        raise ValueError(f"Como mucho {MAX_LOTE} elementos por llamada")
+    return elementos
+
+
+def crear_usuarios_lote(asistente, arguments):
+    creados = []
+    errores = []
+    with asistente.transaccion():
+        for i, usuario in enumerate(_lista(arguments, "usuarios")):
+            if not isinstance(usuario, dict):
+                errores.append({"i": i, "error": "cada usuario debe ser un objeto"})
+                continue
+            nombre = usuario.get("nombre")
+            nivel = usuario.get("nivel", "principiante")
+            intereses = usuario.get("intereses", [])
+            if not isinstance(nombre, str) or not nombre.strip():
+                errores.append({"i": i, "error": "falta el nombre"})
+                continue
+            if nivel not in NIVELES:
+                errores.append({"i": i, "error": f"nivel '{nivel}' no válido"})
+                continue
+            if not isinstance(intereses, list) or not all(isinstance(interes, str) for interes in intereses):
+                errores.append({"i": i, "error": "los intereses deben ser una lista de textos"})
+                continue
+            creados.append({"i": i, "user_id": asistente.registrar_usuario(nombre.strip(), nivel, intereses)})
+
+    return {"exito": True, "creados": creados, "errores": errores}
+
+
+def registrar_sesiones_lote(asistente, arguments):
+    """Sesiones con fecha propia (o de ahora), en cualquier orden, como la importación.
+
+    Cada sesión se valida antes con las mismas reglas que registrar_sesion.
+    """
+    ahora = datetime.now()
+    filas = []
+    posiciones = []
+    errores = []
+    for i, original in enumerate(_lista(arguments, "sesiones")):
+        if not isinstance(original, dict):
+            errores.append({"i": i, "error": "cada sesión debe ser un objeto"})
+            continue
+        sesion, error = _validar_sesion(asistente, original)
+        if error:
+            errores.append({"i": i, "error": error})
+            continue
+        posiciones.append(i)
+        filas.append({
+            "plan_id": sesion["plan_id"],
+            "duracion": sesion["minutos"],
+            "puntuacion": sesion["satisfaccion"],
+            "fecha": original.get("fecha") or ahora.strftime("%Y-%m-%d"),
+            "hora": original.get("hora") or (None if original.get("fecha") else ahora.strftime("%H:%M")),
+            "notas": sesion["notas"]
+        })
+
+    usuarios = {asistente.datos["planes"][fila["plan_id"]]["usuario_id"]
+                for fila in filas if fila["plan_id"] in asistente.datos["planes"]}
+    antes = {user_id: (asistente.datos["puntos"].get(user_id, 0), set(asistente.datos["logros"].get(user_id, [])))
+             for user_id in usuarios}
+
+    resultado = {"importadas": 0, "rechazadas": []}
+    if filas:
+        resultado = asistente.importar_sesiones(filas, tam_lote=len(filas))
+    # Las filas rechazadas por la importación (fecha u hora mal escritas) se numeran desde 1
+    errores.extend({"i": posiciones[numero_fila - 1], "error": motivo}
+                   for numero_fila, motivo in resultado["rechazadas"])
+    errores.sort(key=lambda error: error["i"])
+
+    resumen = {}
+    for user_id, (puntos, logros) in antes.items():
+        resumen[user_id] = {
+            "puntos_ganados": asistente.datos["puntos"].get(user_id, 0) - puntos,
+            "puntos_totales": asistente.datos["puntos"].get(user_id, 0),
+            "racha": asistente.datos["rachas"].get(user_id, {}).get("actual", 0),
+            "nuevos_logros": [logro for logro in asistente.datos["logros"].get(user_id, []) if logro not in logros]
+        }
+
+    return {
+        "exito": True,
+        "registradas": resultado["importadas"],
+        "errores": errores,
+        "usuarios": resumen
+    }
+
+
+def ver_progreso_lote(asistente, arguments):
+    progreso = []
+    errores = []
+    for i, user_id in enumerate(_lista(arguments, "user_ids")):
+        if not isinstance(user_id, str) or user_id not in asistente.datos["usuarios"]:
+            errores.append({"i": i, "error": f"usuario {user_id} no encontrado"})
+            continue
+        stats = agregado_usuario(asistente.datos, user_id)
+        puntos = asistente.datos["puntos"].get(user_id, 0)
+        progreso.append({
+            "id": user_id,
+            "puntos": puntos,
+            "nivel": nivel_de(puntos),
+            "racha": asistente.datos["rachas"].get(user_id, {}).get("actual", 0),
+            "sesiones": stats["sesiones"],
+            "minutos": stats["tiempo_total"],
+            "planes": {plan_id: plan["progreso"] for plan_id, plan in asistente.indices.planes_de(user_id).items()}
+        })
+
+    return {"exito": True, "progreso": progreso, "errores": errores}
+
+
+ESCRITURAS = {
+    "crear_usuario": crear_usuario,
+    "crear_plan": crear_plan,
+    "registrar_sesion": registrar_sesion,
+    "crear_usuarios_lote": crear_usuarios_lote,
+    "registrar_sesiones_lote": registrar_sesiones_lote
+}
+
+LECTURAS = {
+    "test_conexion": test_conexion,
+    "ver_progreso": ver_progreso,
+    "listar_usuarios": listar_usuarios,
+    "ver_alertas": ver_alertas,
+    "ver_ranking": ver_ranking,
+    "ver_progreso_lote": ver_progreso_lote
+}
+
+# Respuestas sin sangría: en los lotes el JSON bonito multiplica el tamaño
+COMPACTAS = {"crear_usuarios_lote", "registrar_sesiones_lote", "ver_progreso_lote"}
+
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
@@ -37,7 +506,7 @@ async def handle_list_tools() -> list[types.Tool]:
                 "type": "object",
                 "properties": {
                     "nombre": {"type": "string", "description": "Nombre del usuario"},
-                    "nivel": {"type": "string", "enum": ["principiante", "intermedio", "avanzado"]},
+                    "nivel": {"type": "string", "enum": NIVELES},
                     "intereses": {"type": "array", "items": {"type": "string"}}
                 },
                 "required": ["nombre", "nivel", "intereses"]
@@ -64,7 +533,8 @@ async def handle_list_tools() -> list[types.Tool]:
                 "properties": {
                     "plan_id": {"type": "string"},
                     "minutos": {"type": "integer"},
-                    "satisfaccion": {"type": "number", "minimum": 1, "maximum": 10}
+                    "satisfaccion": {"type": "number", "minimum": 1, "maximum": 10},
+                    "notas": {"type": "string"}
                 },
                 "required": ["plan_id", "minutos", "satisfaccion"]
             }
@@ -83,6 +553,83 @@ async def handle_list_tools() -> list[types.Tool]:
             description="Listar todos los usuarios",
             inputSchema={"type": "object", "properties": {}}
         ),
+        types.Tool(
+            name="ver_ranking",
+            description="Ver la clasificación de usuarios por puntos",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "top": {"type": "integer", "default": 10, "minimum": 1, "maximum": MAX_RANKING},
+                    "user_id": {"type": "string", "description": "Incluir el puesto de este usuario"},
+                    "nivel": {"type": "integer", "minimum": 1, "description": "Solo usuarios de este nivel"}
+                }
+            }
+        ),
+        types.Tool(
+            name="ver_alertas",
+            description="Usuarios cuya satisfacción o duración reciente ha caído respecto a su media habitual",
+            inputSchema={"type": "object", "properties": {}}
+        ),
+        types.Tool(
+            name="crear_usuarios_lote",
+            description="Crear varios usuarios en una sola llamada y un solo guardado",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "usuarios": {
+                        "type": "array",
+                        "maxItems": MAX_LOTE,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "nombre": {"type": "string"},
+                                "nivel": {"type": "string", "enum": NIVELES},
+                                "intereses": {"type": "array", "items": {"type": "string"}}
+                            },
+                            "required": ["nombre"]
+                        }
+                    }
+                },
+                "required": ["usuarios"]
+            }
+        ),
+        types.Tool(
+            name="registrar_sesiones_lote",
+            description="Registrar muchas sesiones (p. ej. una semana de registros) en una sola llamada",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "sesiones": {
+                        "type": "array",
+                        "maxItems": MAX_LOTE,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "plan_id": {"type": "string"},
+                                "minutos": {"type": "integer"},
+                                "satisfaccion": {"type": "number", "minimum": 1, "maximum": 10},
+                                "fecha": {"type": "string", "description": "YYYY-MM-DD (por defecto hoy)"},
+                                "hora": {"type": "string", "description": "HH:MM"},
+                                "notas": {"type": "string"}
+                            },
+                            "required": ["plan_id", "minutos", "satisfaccion"]
+                        }
+                    }
+                },
+                "required": ["sesiones"]
+            }
+        ),
+        types.Tool(
+            name="ver_progreso_lote",
+            description="Resumen de progreso de varios usuarios en una sola llamada",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "user_ids": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_LOTE}
+                },
+                "required": ["user_ids"]
+            }
+        ),
         types.Tool(
             name="test_conexion",
             description="Probar que el servidor funciona",
@@ -93,211 +640,50 @@ async def handle_list_tools() -> list[types.Tool]:
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent]:
     """Manejar llamadas a herramientas"""
-    
+
     try:
-        resultado = {}
-        
-        if name == "test_conexion":
-            resultado = {
-                "exito": True,
-                "mensaje": "¡Servidor MCP funcionando perfectamente!",
-                "version": "1.0.0",
-                "usuarios_registrados": len(usuarios_data),
-                "planes_creados": len(planes_data)
-            }
-            
-        elif name == "crear_usuario":
-            user_id = f"user_{len(usuarios_data) + 1}"
-            usuarios_data[user_id] = {
-                "nombre": arguments["nombre"],
-                "nivel": arguments["nivel"],
-                "intereses": arguments["intereses"],
-                "puntos": 0,
-                "fecha_registro": "2025-05-30"
-            }
-            
-            resultado = {
-                "exito": True,
-                "mensaje": f"Usuario '{arguments['nombre']}' creado exitosamente",
-                "user_id": user_id,
-                "nivel": arguments["nivel"],
-                "intereses": arguments["intereses"],
-                "puntos_iniciales": 0
-            }
-            
-        elif name == "crear_plan":
-            if arguments["user_id"] not in usuarios_data:
-                resultado = {
-                    "exito": False,
-                    "error": f"Usuario {arguments['user_id']} no encontrado"
-                }
-            else:
-                plan_id = f"plan_{len(planes_data) + 1}"
-                usuario = usuarios_data[arguments["user_id"]]
-                
-                # Objetivos básicos según el tema
-                objetivos = [
-                    f"Aprender fundamentos de {arguments['tema']}",
-                    f"Practicar {arguments['tema']} regularmente",
-                    f"Completar ejercicios de {arguments['tema']}",
-                    f"Crear proyecto con {arguments['tema']}"
-                ]
-                
-                planes_data[plan_id] = {
-                    "usuario_id": arguments["user_id"],
-                    "tema": arguments["tema"],
-                    "objetivos": objetivos,
-                    "progreso": 0,
-                    "dias_restantes": arguments.get("dias", 30)
-                }
-                
-                # Dar puntos por crear plan
-                usuarios_data[arguments["user_id"]]["puntos"] += 5
-                
-                resultado = {
-                    "exito": True,
-                    "mensaje": f"Plan de {arguments['tema']} creado para {usuario['nombre']}",
-                    "plan_id": plan_id,
-                    "objetivos": objetivos,
-                    "puntos_ganados": 5,
-                    "puntos_totales": usuarios_data[arguments["user_id"]]["puntos"]
-                }
-        
-        elif name == "registrar_sesion":
-            if arguments["plan_id"] not in planes_data:
-                resultado = {
-                    "exito": False,
-                    "error": f"Plan {arguments['plan_id']} no encontrado"
-                }
-            else:
-                plan = planes_data[arguments["plan_id"]]
-                user_id = plan["usuario_id"]
-                
-                # Calcular progreso (simplificado)
-                incremento = min(15, max(5, arguments["minutos"] // 10))
-                progreso_anterior = plan["progreso"]
-                nuevo_progreso = min(100, progreso_anterior + incremento)
-                
-                # Actualizar progreso
-                planes_data[arguments["plan_id"]]["progreso"] = nuevo_progreso
-                
-                # Calcular puntos
-                puntos_ganados = max(1, arguments["minutos"] // 10)
-                if arguments["satisfaccion"] >= 8:
-                    puntos_ganados += 3
-                
-                usuarios_data[user_id]["puntos"] += puntos_ganados
-                
-                # Registrar sesión
-                sesion = {
-                    "plan_id": arguments["plan_id"],
-                    "minutos": arguments["minutos"],
-                    "satisfaccion": arguments["satisfaccion"],
-                    "fecha": "2025-05-30"
-                }
-                sesiones_data.append(sesion)
-                
-                resultado = {
-                    "exito": True,
-                    "mensaje": "¡Sesión registrada exitosamente!",
-                    "progreso_anterior": progreso_anterior,
-                    "progreso_nuevo": nuevo_progreso,
-                    "incremento": incremento,
-                    "puntos_ganados": puntos_ganados,
-                    "puntos_totales": usuarios_data[user_id]["puntos"],
-                    "tema": plan["tema"]
-                }
-        
-        elif name == "ver_progreso":
-            if arguments["user_id"] not in usuarios_data:
-                resultado = {
-                    "exito": False,
-                    "error": f"Usuario {arguments['user_id']} no encontrado"
-                }
-            else:
-                usuario = usuarios_data[arguments["user_id"]]
-                
-                # Buscar planes del usuario
-                planes_usuario = {k: v for k, v in planes_data.items() 
-                                if v["usuario_id"] == arguments["user_id"]}
-                
-                # Buscar sesiones del usuario
-                sesiones_usuario = [s for s in sesiones_data 
-                                  if planes_data.get(s["plan_id"], {}).get("usuario_id") == arguments["user_id"]]
-                
-                tiempo_total = sum(s["minutos"] for s in sesiones_usuario)
-                
-                resultado = {
-                    "exito": True,
-                    "usuario": usuario["nombre"],
-                    "nivel": usuario["nivel"],
-                    "intereses": usuario["intereses"],
-                    "puntos": usuario["puntos"],
-                    "planes_activos": len(planes_usuario),
-                    "sesiones_completadas": len(sesiones_usuario),
-                    "tiempo_total_minutos": tiempo_total,
-                    "planes": [
-                        {
-                            "id": k,
-                            "tema": v["tema"],
-                            "progreso": v["progreso"]
-                        }
-                        for k, v in planes_usuario.items()
-                    ]
-                }
-        
-        elif name == "listar_usuarios":
-            usuarios_lista = []
-            for user_id, datos in usuarios_data.items():
-                planes_count = sum(1 for p in planes_data.values() if p["usuario_id"] == user_id)
-                usuarios_lista.append({
-                    "id": user_id,
-                    "nombre": datos["nombre"],
-                    "nivel": datos["nivel"],
-                    "puntos": datos["puntos"],
-                    "planes": planes_count
-                })
-            
-            resultado = {
-                "exito": True,
-                "total_usuarios": len(usuarios_data),
-                "usuarios": usuarios_lista
-            }
-        
+        if name in ESCRITURAS:
+            resultado = await cola.escribir(ESCRITURAS[name], arguments)
+        elif name in LECTURAS:
+            resultado = await cola.leer(LECTURAS[name], arguments)
         else:
             resultado = {
                 "exito": False,
                 "error": f"Herramienta '{name}' no reconocida"
             }
-        
+
         # Retornar como TextContent
-        return [types.TextContent(
-            type="text",
-            text=json.dumps(resultado, indent=2, ensure_ascii=False)
-        )]
-        
+        if name in COMPACTAS:
+            texto = json.dumps(resultado, ensure_ascii=False, separators=(",", ":"))
+        else:
+            texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+        return [types.TextContent(type="text", text=texto)]
+
     except Exception as e:
-        # Manejo de errores
+        # Solo el motivo: repetir los argumentos de un lote devolvería todo el lote
         error_response = {
             "exito": False,
             "error": str(e),
-            "herramienta": name,
-            "argumentos": arguments
+            "herramienta": name
         }
-        
+
         return [types.TextContent(
             type="text",
-            text=json.dumps(error_response, indent=2, ensure_ascii=False)
+            text=json.dumps(error_response, ensure_ascii=False, separators=(",", ":"))
         )]
 
 async def main():
     """Función principal - sin prints que causen problemas"""
     async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+        try:
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+        finally:
+            # Las escrituras ya encoladas se guardan antes de salir
+            await cola.vaciar()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from logros import (LOGROS_DISPONIBLES, PUNTOS_PLAN_COMPLETADO, REGLAS, REGLAS_CON_ESTADO, avanzar_racha,
+                    evaluar_logros, incremento_progreso, observar_sesion, puntos_plan, puntos_sesion, racha_vacia)
+
+# Con menos sesiones que esto no compensa arrancar procesos
+MIN_SESIONES_PARALELO = 50000
+
+
+def orden_cronologico(sesion):
+    return (sesion.get("fecha", ""), sesion.get("hora", ""))
+
+
+def avanzar_usuario(estado, planes, sesiones):
+    """Aplica sesiones ya ordenadas por fecha al estado de un usuario.
+
+    El estado tiene puntos, racha, logros, progreso por plan y el estado de
+    las reglas; se modifica en el sitio con las mismas reglas que aplicar_sesion.
+    """
+    progreso = estado["progreso"]
+    racha = estado["racha"]
+    logros = estado["logros"]
+    estado_reglas = estado["reglas"]
+    puntos = estado["puntos"]
+    # Las reglas ya cumplidas dejan de observarse y evaluarse
+    pendientes = [regla for regla in REGLAS if regla.logro not in logros]
+    pendientes_con_estado = [regla for regla in REGLAS_CON_ESTADO if regla.logro not in logros]
+
+    for sesion in sesiones:
+        plan_id = sesion["plan_id"]
+        tema = planes[plan_id]["tema"]
+
+        progreso[plan_id] = round(min(100, progreso[plan_id] + incremento_progreso(sesion["duracion"])), 1)
+        puntos += puntos_sesion(sesion["duracion"], sesion["puntuacion"])
+        try:
+            avanzar_racha(racha, sesion["fecha"])
+        except (KeyError, TypeError, ValueError):
+            pass  # Una sesión sin fecha válida no cuenta para la racha
+
+        if pendientes:
+            observar_sesion(estado_reglas, sesion, tema, pendientes_con_estado)
+            contexto = {"sesion": sesion, "tema": tema, "racha": racha["actual"]}
+            # pendientes ya excluye los logros conseguidos
+            nuevos = evaluar_logros("sesion", contexto, estado_reglas, (), pendientes)
+            if nuevos:
+                logros.extend(nuevos)
+                puntos += sum(LOGROS_DISPONIBLES[logro]["puntos"] for logro in nuevos)
+                pendientes = [regla for regla in pendientes if regla.logro not in nuevos]
+                pendientes_con_estado = [regla for regla in pendientes_con_estado if regla.logro not in nuevos]
+
+        if progreso[plan_id] >= 100:
+            puntos += PUNTOS_PLAN_COMPLETADO
+
+    estado["puntos"] = puntos
+    return estado
+
+
+def reconstruir_usuario(planes, sesiones):
+    """Repite el historial de un usuario en orden de fecha como si se registrara en vivo.
+
+    Devuelve los puntos, la racha, los logros y el progreso de cada plan que
+    habría acumulado con las mismas reglas que aplicar_sesion.
+    """
+    estado = {
+        "puntos": sum(puntos_plan(plan) for plan in planes.values()),
+        "racha": racha_vacia(),
+        "logros": [],
+        "progreso": dict.fromkeys(planes, 0),
+        "reglas": {}
+    }
+    return avanzar_usuario(estado, planes, sorted(sesiones, key=orden_cronologico))
+
+
+def reconstruir_lote(lote):
+    """Trabajo de un proceso: lista de (usuario_id, planes, sesiones)"""
+    return {usuario_id: reconstruir_usuario(planes, sesiones) for usuario_id, planes, sesiones in lote}
+
+
+def reconstruir_historial(datos, indices, procesos=None):
+    """Reconstruye todos los usuarios repartiéndolos en lotes entre varios procesos"""
+    usuarios = sorted(set(datos["usuarios"]) | set(indices.planes_por_usuario))
+    trabajos = []
+    for usuario_id in usuarios:
+        # Solo viaja a los procesos lo que necesitan las reglas
+        planes = {plan_id: {"tema": plan["tema"], "generado_con_ia": plan.get("generado_con_ia", False)}
+                  for plan_id, plan in indices.planes_de(usuario_id).items()}
+        trabajos.append((usuario_id, planes, indices.sesiones_de(usuario_id)))
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(datos["sesiones"]) < MIN_SESIONES_PARALELO:
+        return reconstruir_lote(trabajos)
+
+    # Varios lotes por proceso para repartir bien usuarios con historiales desiguales
+    num_lotes = procesos * 4
+    lotes = [trabajos[i::num_lotes] for i in range(num_lotes)]
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        for parcial in ejecutor.map(reconstruir_lote, lotes):
+            resultados.update(parcial)
+    return resultados
@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+# Cada entrada de los resúmenes es [minutos, sesiones, suma de puntuación]
+MINUTOS, SESIONES, SUMA_PUNTUACION = range(3)
+
+
+def clave_semana(fecha):
+    """Semana ISO de una fecha como "YYYY-Www" (las semanas empiezan en lunes)"""
+    anio, semana, _ = fecha.isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+def acumular_resumenes(agregado, sesion):
+    """Suma la sesión al día y a la semana ISO del registro del usuario"""
+    if not sesion.get("fecha"):
+        return
+    fecha = date.fromisoformat(sesion["fecha"])
+    for tabla, clave in ((agregado["dias"], sesion["fecha"]), (agregado["semanas"], clave_semana(fecha))):
+        entrada = tabla.get(clave)
+        if entrada is None:
+            entrada = tabla[clave] = [0, 0, 0]
+        entrada[MINUTOS] += sesion["duracion"]
+        entrada[SESIONES] += 1
+        entrada[SUMA_PUNTUACION] += sesion["puntuacion"]
+
+
+def rehacer_resumenes(agregado, sesiones):
+    """Vuelve a calcular desde cero los resúmenes de un usuario; True si han cambiado"""
+    antes = (agregado["dias"], agregado["semanas"])
+    agregado["dias"], agregado["semanas"] = {}, {}
+    for sesion in sesiones:
+        acumular_resumenes(agregado, sesion)
+    return antes != (agregado["dias"], agregado["semanas"])
+
+
+def _sumar(entradas):
+    total = [0, 0, 0]
+    for entrada in entradas:
+        if entrada is not None:
+            for i in range(3):
+                total[i] += entrada[i]
+    return {
+        "minutos": total[MINUTOS],
+        "sesiones": total[SESIONES],
+        "satisfaccion": total[SUMA_PUNTUACION] / total[SESIONES] if total[SESIONES] else 0
+    }
+
+
+def resumen_dias(agregado, desde, hasta):
+    """Totales entre dos fechas (inclusive) con una consulta por día del rango"""
+    dias = agregado["dias"]
+    return _sumar(dias.get((desde + timedelta(n)).strftime("%Y-%m-%d")) for n in range((hasta - desde).days + 1))
+
+
+def resumen_semana(agregado, fecha):
+    return _sumar([agregado["semanas"].get(clave_semana(fecha))])
+
+
+def comparar_semanas(agregado, hoy=None):
+    """(semana actual, semana anterior) como totales de minutos, sesiones y satisfacción"""
+    hoy = hoy or date.today()
+    return resumen_semana(agregado, hoy), resumen_semana(agregado, hoy - timedelta(7))
+
+
+def comparar_meses(agregado, hoy=None):
+    """(mes actual hasta hoy, mismo tramo del mes anterior)
+
+    Se compara del día 1 al día de hoy en ambos meses para que un mes a
+    medias no salga siempre peor que uno completo.
+    """
+    hoy = hoy or date.today()
+    inicio = hoy.replace(day=1)
+    inicio_anterior = (inicio - timedelta(1)).replace(day=1)
+    fin_anterior = min(inicio_anterior + timedelta(hoy.day - 1), inicio - timedelta(1))
+    return resumen_dias(agregado, inicio, hoy), resumen_dias(agregado, inicio_anterior, fin_anterior)
+
+
+def variacion(actual, anterior):
+    """Cambio porcentual; None si no hay base con la que comparar"""
+    if not anterior:
+        return None
+    return (actual - anterior) / anterior * 100
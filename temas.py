@@ -0,0 +1,115 @@
+import copy
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+# Base de conocimiento: un JSON por tema (objetivos y recursos del plan normal
+# y base del plan generado con IA) y un índice con el archivo y los alias de
+# cada tema. Los alias se comparan sin acentos, en minúsculas y sin plurales.
+CARPETA_TEMAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "temas")
+ARCHIVO_INDICE = "indice.json"
+# Temas ya leídos que se conservan en memoria
+TEMAS_EN_CACHE = 128
+
+_PALABRA = re.compile(r"[a-z0-9+#]+")
+_LETRA = re.compile(r"[a-z]")
+# Un alias de una palabra también vale como prefijo ("python3", "pythonista")
+# si su raíz tiene al menos estas letras; si es más corta solo cuando lo que
+# sigue no son letras, para que "mate" no atrape "material"
+PREFIJO_MINIMO = 6
+
+
+def plegar(texto):
+    """Minúsculas y sin acentos: "Matemáticas" -> "matematicas" """
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def raiz(palabra):
+    """Raíz muy simple que iguala singular, plural y género: matematicas/matematica -> matematic"""
+    for sufijo in ("es", "s"):
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 4:
+            palabra = palabra[:-len(sufijo)]
+            break
+    if palabra[-1] in "aeo" and len(palabra) > 4:
+        palabra = palabra[:-1]
+    return palabra
+
+
+def raices(texto):
+    return [raiz(palabra) for palabra in _PALABRA.findall(plegar(texto))]
+
+
+@lru_cache(maxsize=TEMAS_EN_CACHE)
+def _leer_tema(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CatalogoTemas:
+    """Busca el tema del catálogo que menciona un texto libre.
+
+    Al primer uso se lee solo el índice y los alias se indexan por la raíz de
+    su primera palabra, así que buscar cuesta O(len(tema)) por muchos temas
+    que tenga el catálogo: se trocea el texto y se mira cada palabra en un
+    diccionario. Si el texto menciona varios temas gana el que aparece antes.
+    Si ninguna palabra coincide entera se prueba con los prefijos de cada una
+    frente a los alias de una sola palabra.
+    El contenido de cada tema se lee de su archivo la primera vez que se pide.
+    """
+
+    def __init__(self, carpeta=CARPETA_TEMAS):
+        self.carpeta = carpeta
+        self._archivos = None
+        self._indice = None
+
+    def _cargar_indice(self):
+        with open(os.path.join(self.carpeta, ARCHIVO_INDICE), 'r', encoding='utf-8') as f:
+            entradas = json.load(f)
+        self._archivos = {}
+        self._indice = {}
+        self._prefijos = {}
+        for clave, entrada in entradas.items():
+            self._archivos[clave] = entrada["archivo"]
+            for alias in entrada["alias"]:
+                partes = raices(alias)
+                self._indice.setdefault(partes[0], []).append((partes, clave))
+                if len(partes) == 1:
+                    self._prefijos.setdefault(partes[0], clave)
+
+    def buscar(self, texto):
+        """Clave del tema mencionado en el texto, o None"""
+        if self._indice is None:
+            self._cargar_indice()
+        partes = raices(texto)
+        for i, parte in enumerate(partes):
+            for alias, clave in self._indice.get(parte, ()):
+                if partes[i:i + len(alias)] == alias:
+                    return clave
+        for parte in partes:
+            for corte in range(len(parte) - 1, 1, -1):
+                clave = self._prefijos.get(parte[:corte])
+                if clave is not None and (corte >= PREFIJO_MINIMO or not _LETRA.search(parte[corte:])):
+                    return clave
+        return None
+
+    def tema(self, clave):
+        """Contenido de un tema del índice, leído y cacheado bajo demanda"""
+        if self._archivos is None:
+            self._cargar_indice()
+        return _leer_tema(os.path.join(self.carpeta, self._archivos[clave]))
+
+    def seccion(self, texto, nombre):
+        """Copia de una sección ("objetivos", "recursos", "plan_ia") del tema mencionado, o None.
+
+        Es una copia porque los planes guardan estas listas y la caché no debe cambiar.
+        """
+        clave = self.buscar(texto)
+        if clave is None:
+            return None
+        return copy.deepcopy(self.tema(clave).get(nombre))
+
+
+CATALOGO = CatalogoTemas()
@@ -0,0 +1,51 @@
+# Vida media en sesiones de cada media móvil: tras ese número de sesiones una
+# observación pesa la mitad
+VIDAS_MEDIAS = {"corta": 5, "larga": 30}
+ALFAS = {nombre: 1 - 2 ** (-1 / vida) for nombre, vida in VIDAS_MEDIAS.items()}
+CAMPOS = ("puntuacion", "duracion")
+
+# Sesiones mínimas antes de avisar de una caída
+MIN_SESIONES_ALERTA = 5
+# Caída de la media corta respecto a la larga a partir de la que se avisa
+CAIDA_PUNTUACION = 1.0
+CAIDA_DURACION = 0.3
+
+
+def tendencias_vacias():
+    return {"sesiones": 0, "corta": dict.fromkeys(CAMPOS), "larga": dict.fromkeys(CAMPOS)}
+
+
+def actualizar_tendencias(tendencias, sesion):
+    """Avanza las medias móviles exponenciales con una sesión en O(1).
+
+    La primera sesión inicializa las medias con su valor para que no
+    arranquen sesgadas hacia cero.
+    """
+    tendencias["sesiones"] += 1
+    for nombre, alfa in ALFAS.items():
+        medias = tendencias[nombre]
+        for campo in CAMPOS:
+            valor = sesion[campo]
+            medias[campo] = valor if medias[campo] is None else medias[campo] + alfa * (valor - medias[campo])
+
+
+def diferencia(tendencias, campo):
+    """Media corta menos media larga: positiva si el campo va a más"""
+    corta, larga = tendencias["corta"][campo], tendencias["larga"][campo]
+    if corta is None or larga is None:
+        return 0
+    return corta - larga
+
+
+def detectar_caidas(tendencias):
+    """Lista de avisos (campo, media corta, media larga) si algo ha bajado de forma clara"""
+    if tendencias["sesiones"] < MIN_SESIONES_ALERTA:
+        return []
+
+    caidas = []
+    corta, larga = tendencias["corta"], tendencias["larga"]
+    if larga["puntuacion"] - corta["puntuacion"] >= CAIDA_PUNTUACION:
+        caidas.append(("puntuacion", corta["puntuacion"], larga["puntuacion"]))
+    if larga["duracion"] and (larga["duracion"] - corta["duracion"]) / larga["duracion"] >= CAIDA_DURACION:
+        caidas.append(("duracion", corta["duracion"], larga["duracion"]))
+    return caidas
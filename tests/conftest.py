@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from assistant import AsistenteAprendizaje  # noqa: E402
+
+ALMACENES = ["json", "diario", "sqlite", "fragmentado"]
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    """Trabaja en una carpeta temporal: el asistente usa data/ relativo al directorio actual"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("ASISTENTE_ALMACENAMIENTO", raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def nuevo_asistente(carpeta):
+    def crear(almacenamiento="json"):
+        return AsistenteAprendizaje(almacenamiento)
+    return crear
+
+
+def estado(asistente):
+    """Lo que tiene que sobrevivir a guardar y volver a cargar"""
+    datos = asistente.datos
+    return {
+        "usuarios": datos["usuarios"],
+        "planes": datos["planes"],
+        "sesiones": datos["sesiones"],
+        "puntos": datos["puntos"],
+        "logros": {u: sorted(l) for u, l in datos["logros"].items()},
+        "rachas": datos["rachas"]
+    }
+
+
+def poblar(asistente):
+    """Dos usuarios con planes, sesiones en directo y una importación con fechas atrasadas"""
+    ana = asistente.registrar_usuario("Ana", "intermedio", ["python"])
+    bob = asistente.registrar_usuario("Bob")
+    python = asistente.crear_plan(ana, "Python", mostrar=False)
+    ingles = asistente.crear_plan(ana, "Inglés", 10, mostrar=False)
+    mates = asistente.crear_plan(bob, "Matemáticas", mostrar=False)
+
+    asistente.aplicar_sesion(python, 130, 9, "largo", fecha="2026-03-10", hora="07:30")
+    asistente.aplicar_sesion(mates, 30, 6, fecha="2026-03-10", hora="18:00")
+    asistente.importar_sesiones([
+        {"plan_id": ingles, "duracion": 40, "puntuacion": 7, "fecha": "2026-03-01", "hora": "09:00"},
+        {"plan_id": python, "duracion": 25, "puntuacion": 8, "fecha": "2026-03-05"},
+        {"plan_id": mates, "duracion": 60, "puntuacion": 10, "fecha": "2026-03-11", "hora": "20:15"},
+    ])
+
+
+@pytest.fixture
+def mcp_windows():
+    pytest.importorskip("mcp")
+    import mcp_windows
+    return mcp_windows
+
+
+@pytest.fixture
+def cola(carpeta, mcp_windows):
+    return mcp_windows.EscrituraDiferida(ventana=0, carpeta_datos="data")
+
+
+def ejecutar(cola, *escrituras):
+    """Lanza las escrituras a la vez, como llamadas concurrentes del cliente"""
+    async def todas():
+        return await asyncio.gather(*(cola.escribir(funcion, argumentos) for funcion, argumentos in escrituras),
+                                    return_exceptions=True)
+    return asyncio.run(todas())
+
+
+def leer(cola, funcion, argumentos):
+    return asyncio.run(cola.leer(funcion, argumentos))
+
+
+def en_disco():
+    with open("data/usuarios.json", encoding="utf-8") as f:
+        return json.load(f)
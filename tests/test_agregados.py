@@ -0,0 +1,59 @@
+import json
+
+from agregados import agregado_usuario, percentiles, satisfaccion_promedio, sincronizar_agregados
+from conftest import poblar
+
+
+def a_mano(sesiones):
+    duraciones = [s["duracion"] for s in sesiones]
+    puntuaciones = [s["puntuacion"] for s in sesiones]
+    return {"sesiones": len(sesiones), "tiempo_total": sum(duraciones), "suma_puntuacion": sum(puntuaciones),
+            "duracion_min": min(duraciones), "duracion_max": max(duraciones),
+            "puntuacion_min": min(puntuaciones), "puntuacion_max": max(puntuaciones)}
+
+
+def resumen(agregado):
+    return {campo: agregado[campo] for campo in ("sesiones", "tiempo_total", "suma_puntuacion", "duracion_min",
+                                                  "duracion_max", "puntuacion_min", "puntuacion_max")}
+
+
+def test_agregados_coinciden_con_las_sesiones(nuevo_asistente):
+    asistente = nuevo_asistente()
+    poblar(asistente)
+    datos = asistente.datos
+
+    assert resumen(datos["agregados"]["global"]) == a_mano(datos["sesiones"])
+    for usuario_id in datos["usuarios"]:
+        agregado = agregado_usuario(datos, usuario_id)
+        assert resumen(agregado) == a_mano(asistente.indices.sesiones_de(usuario_id))
+        temas = {}
+        for sesion in asistente.indices.sesiones_de(usuario_id):
+            tema = datos["planes"][sesion["plan_id"]]["tema"]
+            temas[tema] = temas.get(tema, 0) + 1
+        assert agregado["temas"] == temas
+
+
+def test_sincronizar_completa_y_rehace(nuevo_asistente):
+    asistente = nuevo_asistente()
+    poblar(asistente)
+    esperado = json.loads(json.dumps(asistente.datos["agregados"]))
+    datos = json.loads(json.dumps(asistente.datos))
+    ana, bob = list(datos["usuarios"])
+
+    # Un global por delante de las sesiones, un usuario sin registro y otro
+    # guardado por una versión sin "semanas"
+    datos["agregados"]["global"]["sesiones"] = 99
+    del datos["agregados"]["usuarios"][ana]
+    del datos["agregados"]["usuarios"][bob]["semanas"]
+    sincronizar_agregados(datos, asistente.indices)
+
+    assert datos["agregados"] == esperado
+
+
+def test_usuario_sin_sesiones(nuevo_asistente):
+    asistente = nuevo_asistente()
+    usuario_id = asistente.registrar_usuario("Ana")
+    agregado = agregado_usuario(asistente.datos, usuario_id)
+
+    assert satisfaccion_promedio(agregado) == 0
+    assert percentiles(agregado, "duracion") == {50: None, 90: None, 99: None}
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import ALMACENES, estado, poblar
+
+
+@pytest.mark.parametrize("almacenamiento", ALMACENES)
+def test_recargar_devuelve_lo_mismo(nuevo_asistente, almacenamiento):
+    asistente = nuevo_asistente(almacenamiento)
+    poblar(asistente)
+    esperado = estado(asistente)
+
+    assert estado(nuevo_asistente(almacenamiento)) == esperado
+
+
+@pytest.mark.parametrize("almacenamiento", ALMACENES)
+def test_recargar_tras_compactar(nuevo_asistente, almacenamiento):
+    asistente = nuevo_asistente(almacenamiento)
+    poblar(asistente)
+    asistente.compactar_datos()
+
+    assert estado(nuevo_asistente(almacenamiento)) == estado(asistente)
+
+
+@pytest.mark.parametrize("almacenamiento", ALMACENES)
+def test_sesiones_en_orden_de_insercion(nuevo_asistente, almacenamiento):
+    asistente = nuevo_asistente(almacenamiento)
+    poblar(asistente)
+    orden = [(s["plan_id"], s["fecha"]) for s in asistente.datos["sesiones"]]
+
+    recargado = nuevo_asistente(almacenamiento)
+    assert [(s["plan_id"], s["fecha"]) for s in recargado.datos["sesiones"]] == orden
+
+
+@pytest.mark.parametrize("almacenamiento", ALMACENES)
+def test_migra_el_json_existente(nuevo_asistente, almacenamiento):
+    original = nuevo_asistente("json")
+    poblar(original)
+
+    assert estado(nuevo_asistente(almacenamiento)) == estado(original)
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from analitica import MotorAnalitica
+from columnas import ColumnasSesiones
+
+
+def datos_aleatorios(sesiones=500, semilla=11):
+    azar = random.Random(semilla)
+    planes = {f"plan_{i}": {"usuario_id": f"user_{i % 7}", "tema": "Python"} for i in range(20)}
+    lista = []
+    for _ in range(sesiones):
+        sesion = {"plan_id": f"plan_{azar.randrange(22)}", "duracion": azar.choice([5, 15, 25, 40, 60, 95, 200]),
+                  "puntuacion": float(azar.randint(1, 10)),
+                  "fecha": "" if azar.random() < 0.05 else f"2026-{azar.randint(1, 4):02d}-{azar.randint(1, 28):02d}"}
+        if azar.random() < 0.9:
+            sesion["hora"] = f"{azar.randint(0, 23):02d}:{azar.randint(0, 59):02d}"
+        lista.append(sesion)
+    return {"planes": planes, "sesiones": lista}
+
+
+def redondear(valor):
+    """Compara floats de NumPy y de Python sin arrastrar el error de redondeo"""
+    if isinstance(valor, float):
+        return round(valor, 9)
+    if isinstance(valor, (list, tuple)):
+        return [redondear(v) for v in valor]
+    if isinstance(valor, dict):
+        return {k: redondear(v) for k, v in valor.items()}
+    return valor
+
+
+def consultas(motor, usuario_id):
+    return [motor.resumen(usuario_id), motor.histograma_horas(usuario_id), motor.histograma_dias(usuario_id),
+            motor.tramos_duracion(usuario_id), motor.tendencia_semanal(usuario_id, semanas=6)]
+
+
+def test_numpy_y_python_dan_lo_mismo():
+    pytest.importorskip("numpy")
+    columnas = ColumnasSesiones(datos_aleatorios())
+    con_numpy, en_python = MotorAnalitica(columnas), MotorAnalitica(columnas, usar_numpy=False)
+    assert con_numpy.usar_numpy and not en_python.usar_numpy
+
+    for usuario_id in (None, "user_0", "user_3", "user_9"):
+        assert redondear(consultas(con_numpy, usuario_id)) == redondear(consultas(en_python, usuario_id))
+    assert redondear(con_numpy.totales_por_usuario(3)) == redondear(en_python.totales_por_usuario(3))
+    assert redondear(con_numpy.totales_por_usuario()) == redondear(en_python.totales_por_usuario())
+
+
+def test_ve_las_sesiones_nuevas():
+    pytest.importorskip("numpy")
+    datos = datos_aleatorios(50)
+    columnas = ColumnasSesiones(datos)
+    motor = MotorAnalitica(columnas)
+    antes = motor.resumen("user_1")["sesiones"]
+
+    columnas.agregar({"plan_id": "plan_1", "duracion": 30, "puntuacion": 8.0, "fecha": "2026-05-04", "hora": "10:00"})
+    assert motor.resumen("user_1")["sesiones"] == antes + 1
+    assert redondear(motor.resumen("user_1")) == redondear(MotorAnalitica(columnas, usar_numpy=False).resumen("user_1"))
+
+
+def test_sin_sesiones():
+    motor = MotorAnalitica(ColumnasSesiones({"planes": {}, "sesiones": []}), usar_numpy=False)
+
+    assert motor.resumen()["sesiones"] == 0
+    assert motor.histograma_horas() == [0] * 24
+    assert motor.tendencia_semanal() == []
+    assert motor.totales_por_usuario() == []
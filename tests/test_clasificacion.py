@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from clasificacion import Clasificacion, nivel_de, puntos_minimos_nivel, puntos_para_siguiente_nivel
+from conftest import leer
+
+
+def ranking_a_mano(puntos):
+    return sorted(puntos.items(), key=lambda par: (-par[1], par[0]))
+
+
+@pytest.mark.parametrize("puntos, nivel", [(0, 1), (49, 1), (50, 2), (149, 2), (150, 3), (499, 4), (500, 5),
+                                           (699, 5), (700, 6), (1100, 8)])
+def test_nivel_de(puntos, nivel):
+    assert nivel_de(puntos) == nivel
+    assert puntos_minimos_nivel(nivel) <= puntos < puntos_minimos_nivel(nivel + 1)
+    assert puntos + puntos_para_siguiente_nivel(puntos) == puntos_minimos_nivel(nivel + 1)
+
+
+def test_top_y_posicion_tras_actualizaciones():
+    azar = random.Random(3)
+    puntos = {f"user_{i}": azar.randint(0, 900) for i in range(200)}
+    clasificacion = Clasificacion(puntos)
+    for _ in range(500):
+        usuario_id = f"user_{azar.randint(0, 249)}"
+        puntos[usuario_id] = azar.randint(0, 900)
+        clasificacion.actualizar(usuario_id, puntos[usuario_id])
+
+    esperado = ranking_a_mano(puntos)
+    assert len(clasificacion) == len(puntos)
+    assert clasificacion.top(10) == esperado[:10]
+    for puesto, (usuario_id, _) in enumerate(esperado, 1):
+        assert clasificacion.posicion(usuario_id) == puesto
+
+
+def test_niveles():
+    puntos = {"a": 10, "b": 60, "c": 120, "d": 520, "e": 40}
+    clasificacion = Clasificacion(puntos)
+
+    assert clasificacion.usuarios_de_nivel(1) == [("e", 40), ("a", 10)]
+    assert clasificacion.usuarios_de_nivel(2, k=1) == [("c", 120)]
+    assert clasificacion.resumen_niveles() == {1: 2, 2: 2, 3: 0, 4: 0, 5: 1}
+
+
+def test_k_negativo_no_devuelve_nada():
+    clasificacion = Clasificacion({"a": 10, "b": 20})
+
+    assert clasificacion.top(-1) == []
+    assert clasificacion.usuarios_de_nivel(1, -1) == []
+    assert clasificacion.posicion("zz") is None
+
+
+def test_la_clasificacion_sigue_a_los_puntos(nuevo_asistente):
+    asistente = nuevo_asistente()
+    ana = asistente.registrar_usuario("Ana")
+    bob = asistente.registrar_usuario("Bob")
+    with asistente.transaccion():
+        asistente.agregar_puntos(bob, 30, "prueba", mostrar=False)
+
+    assert asistente.clasificacion.top(2) == [(bob, 30), (ana, 0)]
+    assert nuevo_asistente().clasificacion.top(2) == [(bob, 30), (ana, 0)]
+
+
+def test_ver_ranking_valida_top_y_nivel(cola, mcp_windows):
+    asistente = leer(cola, lambda asistente, _: asistente, {})
+    for i in range(3):
+        asistente.registrar_usuario(f"U{i}")
+
+    for argumentos in ({"top": -1}, {"top": 0}, {"top": "5"}, {"top": 2.5}, {"nivel": 0}, {"nivel": "2"}):
+        assert not leer(cola, mcp_windows.ver_ranking, argumentos)["exito"]
+
+    assert len(leer(cola, mcp_windows.ver_ranking, {"top": 2})["ranking"]) == 2
+    assert len(leer(cola, mcp_windows.ver_ranking, {"top": 10 ** 9})["ranking"]) == 3
@@ -0,0 +1,55 @@
+import pytest
+
+from columnas import ColumnasSesiones
+
+
+def datos_con(*sesiones):
+    return {"planes": {"plan_1": {"usuario_id": "user_1", "tema": "Python"},
+                       "plan_2": {"usuario_id": "user_2", "tema": "Inglés"}},
+            "sesiones": list(sesiones)}
+
+
+def sesion(plan_id="plan_1", duracion=30, puntuacion=7.5, fecha="2026-01-05", hora="09:15", notas=""):
+    resultado = {"plan_id": plan_id, "duracion": duracion, "puntuacion": puntuacion, "fecha": fecha}
+    if hora is not None:
+        resultado["hora"] = hora
+    resultado["notas"] = notas
+    return resultado
+
+
+def test_reconstruye_cada_sesion():
+    sesiones = [sesion(), sesion("plan_2", 45, 9, "2026-01-06", None, "repaso"), sesion(fecha="")]
+    columnas = ColumnasSesiones(datos_con(*sesiones))
+
+    assert len(columnas) == 3
+    assert [columnas.sesion(fila) for fila in range(3)] == sesiones
+    assert list(columnas.filas_de("user_1")) == [0, 2]
+    assert list(columnas.filas_de("user_9")) == []
+    assert columnas.tema_de_fila(1) == "Inglés"
+
+
+def test_plan_inexistente():
+    columnas = ColumnasSesiones(datos_con(sesion("plan_9")))
+
+    assert columnas.usuario[0] == ColumnasSesiones.SIN_USUARIO
+    assert columnas.tema_de_fila(0) is None
+
+
+@pytest.mark.parametrize("duracion, guardada", [(45.0, 45), ("45", 45), (40000, 32767), (-5, 0)])
+def test_convierte_la_duracion(duracion, guardada):
+    columnas = ColumnasSesiones(datos_con())
+    columnas.agregar(sesion(duracion=duracion, puntuacion="8"))
+
+    assert columnas.duracion[0] == guardada
+    assert columnas.puntuacion[0] == 8.0
+
+
+def test_a_numpy():
+    np = pytest.importorskip("numpy")
+    columnas = ColumnasSesiones(datos_con(sesion(), sesion("plan_2", 90)))
+    arrays = columnas.a_numpy()
+    columnas.agregar(sesion())
+
+    assert arrays["duracion"].tolist() == [30, 90]
+    assert arrays["usuario"].dtype == np.int32
+    assert len(columnas) == 3
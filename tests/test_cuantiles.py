@@ -0,0 +1,67 @@
+import json
+import random
+
+import pytest
+
+from cuantiles import sketch_agregar, sketch_cuantiles, sketch_vacio
+
+CUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def rango(valores, valor):
+    """Fracción de los valores que no superan a valor"""
+    return sum(v <= valor for v in valores) / len(valores)
+
+
+def test_sin_datos():
+    assert sketch_cuantiles(sketch_vacio(), [0.5, 0.9]) == [None, None]
+
+
+def test_exacto_mientras_cabe():
+    azar = random.Random(1)
+    valores = [azar.randint(5, 180) for _ in range(60)]
+    sketch = sketch_vacio()
+    for valor in valores:
+        sketch_agregar(sketch, valor)
+
+    assert sketch["n"] == 60
+    assert sketch_cuantiles(sketch, [0.0, 0.5, 1.0]) == [min(valores), sorted(valores)[29], max(valores)]
+
+
+@pytest.mark.parametrize("n", [1000, 50000])
+def test_error_de_rango_acotado(n):
+    azar = random.Random(n)
+    valores = [azar.expovariate(1 / 40) for _ in range(n)]
+    sketch = sketch_vacio()
+    for valor in valores:
+        sketch_agregar(sketch, valor)
+
+    for cuantil, valor in zip(CUANTILES, sketch_cuantiles(sketch, CUANTILES)):
+        assert abs(rango(valores, valor) - cuantil) < 0.03
+
+
+def test_tamano_acotado():
+    sketch = sketch_vacio()
+    tamanos = []
+    for i in range(100000):
+        sketch_agregar(sketch, i % 997)
+        if i % 10000 == 0:
+            tamanos.append(sum(map(len, sketch["niveles"])))
+
+    assert max(tamanos) <= 3 * sketch["k"] + 10
+
+
+def test_determinista_y_sobrevive_a_json():
+    azar = random.Random(7)
+    valores = [azar.random() for _ in range(5000)]
+    a, b = sketch_vacio(), sketch_vacio()
+    for valor in valores[:3000]:
+        sketch_agregar(a, valor)
+        sketch_agregar(b, valor)
+    b = json.loads(json.dumps(b))
+    for valor in valores[3000:]:
+        sketch_agregar(a, valor)
+        sketch_agregar(b, valor)
+
+    assert a == b
+    assert sketch_cuantiles(a, CUANTILES) == sketch_cuantiles(b, CUANTILES)
@@ -0,0 +1,50 @@
+import os
+
+from conftest import estado, poblar
+
+
+def lineas_diario():
+    with open("data/usuarios.diario.jsonl", encoding="utf-8") as f:
+        return f.readlines()
+
+
+def test_guardar_solo_anade_al_diario(nuevo_asistente):
+    asistente = nuevo_asistente("diario")
+    poblar(asistente)
+
+    assert not os.path.exists("data/usuarios.json")
+    assert len(lineas_diario()) == asistente.datos["version"]
+    assert estado(nuevo_asistente("diario")) == estado(asistente)
+
+
+def test_ignora_una_ultima_linea_a_medias(nuevo_asistente):
+    asistente = nuevo_asistente("diario")
+    poblar(asistente)
+    esperado = estado(asistente)
+    with open("data/usuarios.diario.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"op": "usuario", "usuario_id": "user_9", "usu')
+
+    assert estado(nuevo_asistente("diario")) == esperado
+
+
+def test_compacta_al_llenarse(nuevo_asistente):
+    asistente = nuevo_asistente("diario")
+    asistente.almacen.max_entradas = 5
+    for nombre in ("Ana", "Bob", "Cy", "Di", "Eva", "Fer"):
+        asistente.registrar_usuario(nombre)
+
+    assert os.path.exists("data/usuarios.json")
+    assert len(lineas_diario()) < 5
+    assert estado(nuevo_asistente("diario")) == estado(asistente)
+
+
+def test_no_reaplica_lo_que_ya_tiene_la_instantanea(nuevo_asistente):
+    asistente = nuevo_asistente("diario")
+    poblar(asistente)
+    viejas = lineas_diario()
+    asistente.compactar_datos()
+    # Cierre entre escribir la instantánea y vaciar el diario
+    with open("data/usuarios.diario.jsonl", "w", encoding="utf-8") as f:
+        f.writelines(viejas)
+
+    assert estado(nuevo_asistente("diario")) == estado(asistente)
@@ -0,0 +1,96 @@
+import csv
+import json
+
+import pytest
+
+from exportacion import filas_planes, filas_sesiones
+
+
+class SinRecorrer(list):
+    """Lista de sesiones que falla si alguien la recorre entera"""
+
+    def __iter__(self):
+        raise AssertionError("se han recorrido todas las sesiones")
+
+
+@pytest.fixture
+def asistente(nuevo_asistente):
+    asistente = nuevo_asistente()
+    ana = asistente.registrar_usuario("Ana")
+    bob = asistente.registrar_usuario("Bob")
+    planes = [asistente.crear_plan(ana, "Python avanzado", mostrar=False),
+              asistente.crear_plan(ana, "Inglés", mostrar=False),
+              asistente.crear_plan(bob, "python", mostrar=False),
+              asistente.crear_plan(bob, "Cerámica", mostrar=False)]
+    # Fechas desordenadas, como tras una importación
+    for i, dia in enumerate([9, 3, 12, 1, 7, 3, 15, 5, 10, 2, 8, 4]):
+        asistente.aplicar_sesion(planes[i % 4], 30 + i, 7, fecha=f"2026-03-{dia:02d}", hora="10:00")
+    return asistente
+
+
+def a_mano(asistente, usuario_id=None, desde=None, hasta=None, temas=None):
+    filas = []
+    for sesion in asistente.datos["sesiones"]:
+        plan = asistente.datos["planes"][sesion["plan_id"]]
+        if ((usuario_id and plan["usuario_id"] != usuario_id) or (desde and sesion["fecha"] < desde)
+                or (hasta and sesion["fecha"] > hasta) or (temas and plan["tema"] not in temas)):
+            continue
+        filas.append(sesion["duracion"])
+    return filas
+
+
+def duraciones(asistente, **filtros):
+    return [fila["duracion"] for fila in filas_sesiones(asistente.datos, asistente.indices, **filtros)]
+
+
+@pytest.mark.parametrize("filtros, temas", [
+    ({"tema": "python"}, {"Python avanzado", "python"}),
+    ({"tema": "PYTHON 3"}, {"Python avanzado", "python"}),
+    ({"tema": "ingles"}, {"Inglés"}),
+    ({"tema": " ceramica "}, {"Cerámica"}),
+    ({"tema": "Historia"}, {"nada"}),
+    ({"desde": "2026-03-04", "hasta": "2026-03-09"}, None),
+    ({"desde": "2026-03-10"}, None),
+    ({"hasta": "2026-03-03"}, None),
+    ({"tema": "python", "desde": "2026-03-05"}, {"Python avanzado", "python"}),
+    ({"usuario_id": "user_1", "tema": "python"}, {"Python avanzado"}),
+    ({"usuario_id": "user_2", "hasta": "2026-03-07"}, None),
+])
+def test_filtros_de_sesiones(asistente, filtros, temas):
+    assert duraciones(asistente, **filtros) == a_mano(asistente, temas=temas, **{k: v for k, v in filtros.items()
+                                                                                if k != "tema"})
+
+
+@pytest.mark.parametrize("filtros", [{"tema": "python"}, {"desde": "2026-03-10"}, {"usuario_id": "user_2"}])
+def test_filtros_usan_los_indices(asistente, filtros):
+    esperado = duraciones(asistente, **filtros)
+    asistente.datos["sesiones"] = SinRecorrer(asistente.datos["sesiones"])
+
+    assert duraciones(asistente, **filtros) == esperado
+
+
+def test_los_indices_siguen_a_las_sesiones_nuevas(asistente):
+    plan_id = next(iter(asistente.indices.planes_de("user_1")))
+    asistente.aplicar_sesion(plan_id, 99, 7, fecha="2026-02-01", hora="10:00")
+
+    assert duraciones(asistente, hasta="2026-02-28") == [99]
+    assert duraciones(asistente, tema="python")[-1] == 99
+
+
+def test_filtro_de_planes(asistente):
+    temas = [fila["tema"] for fila in filas_planes(asistente.datos, asistente.indices, tema="Python")]
+
+    assert temas == ["Python avanzado", "python"]
+
+
+def test_exportar_csv_y_jsonl(asistente, tmp_path):
+    assert asistente.exportar("sesiones", str(tmp_path / "s.csv"), tema="python") == 6
+    with open(tmp_path / "s.csv", encoding="utf-8") as f:
+        assert [int(fila["duracion"]) for fila in csv.DictReader(f)] == duraciones(asistente, tema="python")
+
+    assert asistente.exportar("agregados", str(tmp_path / "a.jsonl")) == 2
+    with open(tmp_path / "a.jsonl", encoding="utf-8") as f:
+        assert [json.loads(linea)["sesiones"] for linea in f] == [6, 6]
+
+    with pytest.raises(ValueError):
+        asistente.exportar("sesiones", str(tmp_path / "s.xlsx"))
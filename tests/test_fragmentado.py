@@ -0,0 +1,59 @@
+import json
+import os
+
+import almacenamiento
+from conftest import estado, poblar
+
+
+def fragmentos():
+    return sorted(nombre for nombre in os.listdir("data/fragmentos") if nombre.startswith("frag_"))
+
+
+def test_solo_reescribe_el_fragmento_del_usuario(nuevo_asistente, monkeypatch):
+    asistente = nuevo_asistente("fragmentado")
+    poblar(asistente)
+    usuario_id = next(iter(asistente.datos["usuarios"]))
+    plan_id = next(iter(asistente.indices.planes_de(usuario_id)))
+    escritos = []
+    original = almacenamiento.escribir_json_atomico
+    monkeypatch.setattr(almacenamiento, "escribir_json_atomico",
+                        lambda archivo, datos: (escritos.append(os.path.basename(archivo)), original(archivo, datos)))
+
+    asistente.aplicar_sesion(plan_id, 30, 7, fecha="2026-03-12", hora="10:00")
+
+    numero = asistente.almacen.fragmento_de(usuario_id)
+    assert set(escritos) == {f"frag_{numero:03d}.json", "manifiesto.json"}
+    assert estado(nuevo_asistente("fragmentado")) == estado(asistente)
+
+
+def test_fragmentos_sin_orden_se_ordenan_por_fecha(nuevo_asistente):
+    asistente = nuevo_asistente("fragmentado")
+    poblar(asistente)
+    for nombre in fragmentos():
+        ruta = os.path.join("data/fragmentos", nombre)
+        with open(ruta, encoding="utf-8") as f:
+            contenido = json.load(f)
+        del contenido["orden"]
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(contenido, f)
+
+    recargado = nuevo_asistente("fragmentado")
+    fechas = [(s["fecha"], s.get("hora", "")) for s in recargado.datos["sesiones"]]
+    assert fechas == sorted(fechas)
+    assert sorted(map(str, recargado.datos["sesiones"])) == sorted(map(str, asistente.datos["sesiones"]))
+
+    # Tras cargarlos quedan numerados y el orden se mantiene
+    assert nuevo_asistente("fragmentado").datos["sesiones"] == recargado.datos["sesiones"]
+
+
+def test_agregado_global_desfasado_se_recalcula(nuevo_asistente):
+    asistente = nuevo_asistente("fragmentado")
+    poblar(asistente)
+    esperado = asistente.datos["agregados"]["global"]
+    with open("data/fragmentos/manifiesto.json", encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    manifiesto["agregado_global"]["sesiones"] -= 1
+    with open("data/fragmentos/manifiesto.json", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+
+    assert nuevo_asistente("fragmentado").datos["agregados"]["global"] == esperado
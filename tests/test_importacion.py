@@ -0,0 +1,95 @@
+import argparse
+import json
+import random
+
+import pytest
+
+import main
+from conftest import en_disco
+from importacion import en_lotes, leer_filas, normalizar_sesion
+
+
+def test_importar_da_lo_mismo_que_registrar_en_directo(nuevo_asistente, carpeta):
+    azar = random.Random(7)
+    filas = []
+    for dia in range(1, 29):
+        for _ in range(azar.randint(0, 2)):
+            filas.append({"duracion": azar.choice([15, 30, 60, 125]), "puntuacion": azar.randint(1, 10),
+                          "fecha": f"2026-02-{dia:02d}", "hora": f"{azar.randint(6, 22):02d}:{azar.randint(0, 59):02d}"})
+
+    def preparar():
+        asistente = nuevo_asistente()
+        usuario_id = asistente.registrar_usuario("Ana")
+        return asistente, usuario_id, asistente.crear_plan(usuario_id, "Python", mostrar=False)
+
+    en_directo, usuario_id, plan_id = preparar()
+    for fila in filas:
+        en_directo.aplicar_sesion(plan_id, fila["duracion"], fila["puntuacion"], fecha=fila["fecha"], hora=fila["hora"])
+
+    (carpeta / "data" / "usuarios.json").unlink()
+    importado, _, _ = preparar()
+    desordenadas = [dict(fila, plan_id=plan_id) for fila in filas]
+    azar.shuffle(desordenadas)
+    resultado = importado.importar_sesiones(desordenadas, tam_lote=7)
+
+    assert resultado == {"importadas": len(filas), "rechazadas": []}
+    for clave in ("puntos", "rachas"):
+        assert importado.datos[clave] == en_directo.datos[clave]
+    assert sorted(importado.datos["logros"][usuario_id]) == sorted(en_directo.datos["logros"][usuario_id])
+    assert importado.datos["planes"][plan_id]["progreso"] == en_directo.datos["planes"][plan_id]["progreso"]
+
+
+def test_importar_rechaza_filas_sin_abortar(nuevo_asistente):
+    asistente = nuevo_asistente()
+    plan_id = asistente.crear_plan(asistente.registrar_usuario("Ana"), "Python", mostrar=False)
+
+    resultado = asistente.importar_sesiones([
+        {"plan_id": plan_id, "duracion": 30, "puntuacion": 8, "fecha": "2026-01-02"},
+        {"plan_id": "plan_99", "duracion": 30, "puntuacion": 8, "fecha": "2026-01-02"},
+        {"plan_id": plan_id, "duracion": 0, "puntuacion": 8, "fecha": "2026-01-02"},
+        {"plan_id": plan_id, "duracion": 30, "puntuacion": 8, "fecha": "ayer"},
+    ])
+
+    assert resultado["importadas"] == 1
+    assert [numero for numero, _ in resultado["rechazadas"]] == [2, 3, 4]
+
+
+@pytest.mark.parametrize("puntuacion, esperada", [
+    (0, 1.0), ("0", 1.0), (0.5, 1.0), (None, 5.0), ("", 5.0), (15, 10.0), ("7", 7.0)
+])
+def test_normalizar_puntuacion(puntuacion, esperada):
+    fila = {"plan_id": "plan_1", "duracion": 30, "puntuacion": puntuacion, "fecha": "2026-01-02"}
+    assert normalizar_sesion(fila)["puntuacion"] == esperada
+
+
+def test_normalizar_timestamp_y_hora():
+    con_timestamp = normalizar_sesion({"plan_id": "plan_1", "duracion": "45.0", "puntuacion": "8",
+                                       "timestamp": "2026-01-02T07:05:30"})
+    con_hora = normalizar_sesion({"plan_id": "plan_1", "duracion": 45, "puntuacion": 8, "fecha": "2026-01-02",
+                                  "hora": "07:05"})
+
+    assert con_timestamp == con_hora == {"plan_id": "plan_1", "duracion": 45, "puntuacion": 8.0,
+                                         "fecha": "2026-01-02", "hora": "07:05", "notas": ""}
+
+
+def test_en_lotes():
+    assert list(en_lotes(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_comando_importar_desde_csv_y_jsonl(nuevo_asistente, carpeta):
+    asistente = nuevo_asistente()
+    plan_id = asistente.crear_plan(asistente.registrar_usuario("Ana"), "Python", mostrar=False)
+    (carpeta / "sesiones.csv").write_text(
+        "plan_id,duracion,puntuacion,fecha,hora\n"
+        f"{plan_id},30,8,2026-01-02,10:00\n"
+        f"{plan_id},0,8,2026-01-03,10:00\n", encoding="utf-8")
+    (carpeta / "sesiones.jsonl").write_text(
+        json.dumps({"plan_id": plan_id, "duracion": 60, "puntuacion": 9, "timestamp": "2026-01-04T18:30"}) + "\n\n",
+        encoding="utf-8")
+
+    for archivo in ("sesiones.csv", "sesiones.jsonl"):
+        main.comando_importar(argparse.Namespace(almacenamiento="json", archivo=archivo, lote=1))
+
+    assert [(s["duracion"], s["fecha"]) for s in en_disco()["sesiones"]] == [(30, "2026-01-02"), (60, "2026-01-04")]
+    with pytest.raises(ValueError):
+        leer_filas("sesiones.xlsx")
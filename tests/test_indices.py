@@ -0,0 +1,39 @@
+from conftest import poblar
+from indices import IndiceDatos
+
+
+def a_mano(datos, usuario_id):
+    planes = {plan_id: plan for plan_id, plan in datos["planes"].items() if plan["usuario_id"] == usuario_id}
+    return planes, [sesion for sesion in datos["sesiones"] if sesion["plan_id"] in planes]
+
+
+def test_indices_en_directo_y_al_recargar(nuevo_asistente):
+    asistente = nuevo_asistente()
+    poblar(asistente)
+
+    for indices in (asistente.indices, IndiceDatos(asistente.datos), nuevo_asistente().indices):
+        for usuario_id in asistente.datos["usuarios"]:
+            planes, sesiones = a_mano(asistente.datos, usuario_id)
+            assert indices.planes_de(usuario_id) == planes
+            assert indices.sesiones_de(usuario_id) == sesiones
+
+
+def test_usuario_sin_datos():
+    indices = IndiceDatos({"planes": {}, "sesiones": []})
+
+    assert indices.planes_de("user_9") == {}
+    assert indices.sesiones_de("user_9") == []
+    assert "user_9" not in indices.sesiones_por_usuario
+
+
+def test_sesion_de_plan_inexistente_no_se_asigna():
+    datos = {"planes": {"plan_1": {"usuario_id": "user_1"}}, "sesiones": []}
+    indices = IndiceDatos(datos)
+    for sesion in ({"plan_id": "plan_1", "fecha": "2026-01-02"}, {"plan_id": "plan_9", "fecha": "2026-01-01"}):
+        datos["sesiones"].append(sesion)
+        indices.aplicar_cambio({"op": "sesion", "sesion": sesion})
+    indices.aplicar_cambio({"op": "plan", "plan_id": "plan_1", "plan": datos["planes"]["plan_1"]})
+
+    assert indices.sesiones_de("user_1") == [datos["sesiones"][0]]
+    assert indices.planes_por_usuario["user_1"] == ["plan_1"]
+    assert list(indices.sesiones_entre("2026-01-01", "2026-01-01")) == [datos["sesiones"][1]]
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from columnas import ColumnasSesiones
+from conftest import estado, poblar
+from ia_assistant import RecomendadorIA
+
+
+def columnas_de(asistente):
+    return {campo: valor for campo, valor in asistente.columnas.estado().items() if campo != "derivados"}
+
+
+@pytest.fixture
+def sin_recorrer(monkeypatch):
+    """Hace fallar cualquier intento de rehacer las columnas sesión a sesión"""
+    def falla(columnas, sesion):
+        raise AssertionError("se han rehecho las columnas")
+    return lambda: monkeypatch.setattr(ColumnasSesiones, "agregar", falla)
+
+
+def test_instantanea_binaria_solo_al_cerrar(nuevo_asistente):
+    asistente = nuevo_asistente("json")
+    poblar(asistente)
+    instantanea = asistente.almacen.instantanea
+    assert not instantanea.vigente()
+
+    asistente.cerrar()
+    assert instantanea.vigente()
+    assert estado(nuevo_asistente("json")) == estado(asistente)
+
+
+def test_instantanea_desfasada_se_ignora(nuevo_asistente):
+    asistente = nuevo_asistente("json")
+    poblar(asistente)
+    asistente.cerrar()
+
+    # Un guardado posterior deja la copia binaria atrás: se debe leer el JSON
+    asistente.registrar_usuario("Cy")
+    assert os.path.exists("data/usuarios.bin")
+    assert "Cy" in [u["nombre"] for u in nuevo_asistente("json").datos["usuarios"].values()]
+
+
+def test_restaura_columnas_y_derivados_sin_recorrer_sesiones(nuevo_asistente, sin_recorrer):
+    asistente = nuevo_asistente("json")
+    poblar(asistente)
+    usuario_id = next(iter(asistente.datos["usuarios"]))
+    perfil = RecomendadorIA(asistente.datos, asistente.indices, asistente.columnas).perfil_usuario(usuario_id)
+    asistente.cerrar()
+
+    sin_recorrer()
+    recargado = nuevo_asistente("json")
+    assert columnas_de(recargado) == columnas_de(asistente)
+    assert recargado.columnas.derivados["patrones"]["usuarios"][usuario_id]["sesiones_procesadas"] == 3
+    assert RecomendadorIA(recargado.datos, recargado.indices, recargado.columnas).perfil_usuario(usuario_id) == perfil
+    assert recargado.datos["agregados"] == asistente.datos["agregados"]
+
+
+def test_diario_restaura_columnas_y_agrega_las_nuevas(nuevo_asistente):
+    asistente = nuevo_asistente("diario")
+    poblar(asistente)
+    asistente.cerrar()
+    plan_id = asistente.datos["sesiones"][0]["plan_id"]
+    asistente.aplicar_sesion(plan_id, 50, 9, fecha="2026-03-20", hora="11:00")
+
+    recargado = nuevo_asistente("diario")
+    assert len(recargado.columnas) == len(asistente.datos["sesiones"])
+    assert columnas_de(recargado) == columnas_de(asistente)
+
+
+def test_compactar_guarda_columnas(nuevo_asistente, sin_recorrer):
+    asistente = nuevo_asistente("diario")
+    poblar(asistente)
+    asistente.compactar_datos()
+
+    sin_recorrer()
+    assert estado(nuevo_asistente("diario")) == estado(asistente)
+
+
+def test_copia_danada_se_ignora(nuevo_asistente):
+    asistente = nuevo_asistente("json")
+    poblar(asistente)
+    asistente.cerrar()
+    with open("data/usuarios.bin", "r+b") as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(b"\0" * 8)
+
+    recargado = nuevo_asistente("json")
+    assert estado(recargado) == estado(asistente)
+    assert columnas_de(recargado) == columnas_de(asistente)
@@ -0,0 +1,70 @@
+import pytest
+
+from logros import (REGLAS_CON_ESTADO, ReglaTemasDistintos, avanzar_racha, evaluar_logros, observar_sesion,
+                    puntos_sesion, racha_vacia)
+
+
+def sesion(duracion=30, puntuacion=7, hora="12:00"):
+    return {"plan_id": "plan_1", "duracion": duracion, "puntuacion": puntuacion, "fecha": "2026-01-01", "hora": hora}
+
+
+def evaluar(estado, nueva, racha=1, logros=()):
+    return evaluar_logros("sesion", {"sesion": nueva, "racha": racha}, estado, list(logros))
+
+
+@pytest.mark.parametrize("duracion, puntuacion, puntos", [(5, 1, 1), (30, 6, 5), (45, 8, 9), (600, 9, 25)])
+def test_puntos_sesion(duracion, puntuacion, puntos):
+    assert puntos_sesion(duracion, puntuacion) == puntos
+
+
+def test_racha():
+    racha = racha_vacia()
+    for fecha in ("2026-01-01", "2026-01-02", "2026-01-02", "2026-01-03", "2025-12-30", "2026-01-06"):
+        avanzar_racha(racha, fecha)
+
+    assert racha == {"actual": 1, "maxima": 3, "ultima_fecha": "2026-01-06"}
+
+
+def test_logros_de_una_sesion():
+    estado = {}
+    observar_sesion(estado, sesion(130, 9, "06:30"), "Python")
+
+    assert set(evaluar(estado, sesion(130, 9, "06:30"))) == {"primer_dia", "madrugador", "maraton"}
+    assert evaluar(estado, sesion(), logros=["primer_dia"]) == []
+
+
+def test_contadores_y_racha():
+    estado = {}
+    for _ in range(10):
+        observar_sesion(estado, sesion(puntuacion=9), "Python")
+
+    nuevos = evaluar(estado, sesion(puntuacion=9), racha=7)
+    assert {"consistente", "perfeccionista", "racha_3", "racha_7"} <= set(nuevos)
+    assert "racha_30" not in nuevos
+
+
+def test_explorador_pliega_acentos_y_mayusculas():
+    estado = {}
+    for tema in ("Inglés", "ingles", " INGLES ", "Python"):
+        observar_sesion(estado, sesion(), tema)
+    assert "explorador" not in evaluar(estado, sesion())
+
+    observar_sesion(estado, sesion(), "Matemáticas")
+    assert "explorador" in evaluar(estado, sesion())
+
+
+def test_explorador_con_estado_guardado_sin_plegar():
+    regla = ReglaTemasDistintos("explorador", 3)
+    estado = ["inglés", "python"]
+
+    assert regla.observar(estado, sesion(), "Ingles") == ["inglés", "python"]
+    assert not regla.cumple(estado, {})
+
+
+def test_las_reglas_con_estado_lo_mantienen_acotado():
+    estado = {}
+    for i in range(50):
+        observar_sesion(estado, sesion(), f"tema {i}")
+
+    assert set(estado) == {regla.logro for regla in REGLAS_CON_ESTADO}
+    assert len(estado["explorador"]) == 3
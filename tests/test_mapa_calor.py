@@ -0,0 +1,68 @@
+import json
+
+from agregados import agregado_usuario, sincronizar_agregados
+from ia_assistant import RecomendadorIA
+from mapa_calor import CELDAS, acumular_mapa, filas_mapa, mapa_vacio, mejor_celda, mejor_hora, totales_por_hora
+
+
+def sesion(fecha, hora, duracion=30, puntuacion=7):
+    return {"plan_id": "plan_1", "duracion": duracion, "puntuacion": puntuacion, "fecha": fecha, "hora": hora}
+
+
+def test_solo_guarda_celdas_con_sesiones():
+    mapa = mapa_vacio()
+    # 2026-01-05 es lunes
+    for s in (sesion("2026-01-05", "09:15"), sesion("2026-01-12", "09:40", 60, 9), sesion("2026-01-07", "21:00"),
+              {"plan_id": "plan_1", "duracion": 30, "puntuacion": 7, "fecha": "2026-01-05"}):
+        acumular_mapa(mapa, s)
+
+    assert mapa == {"celdas": {"9": [90, 2, 16], str(2 * 24 + 21): [30, 1, 7]}}
+    assert totales_por_hora(mapa)[9] == 2
+    assert mejor_hora(mapa) == 9
+    assert mejor_celda(mapa) == (0, 9)
+    assert filas_mapa(mapa)[0][9] == "█"
+
+
+def test_mapa_vacio():
+    mapa = mapa_vacio()
+
+    assert mejor_hora(mapa) is None
+    assert mejor_celda(mapa) is None
+    assert filas_mapa(mapa) == [" " * 24] * 7
+
+
+def test_empate_lo_decide_la_satisfaccion():
+    mapa = mapa_vacio()
+    acumular_mapa(mapa, sesion("2026-01-05", "08:00", puntuacion=5))
+    acumular_mapa(mapa, sesion("2026-01-06", "19:00", puntuacion=9))
+
+    assert mejor_hora(mapa) == 19
+    assert mejor_celda(mapa) == (1, 19)
+
+
+def test_migra_mapas_densos(nuevo_asistente):
+    asistente = nuevo_asistente()
+    usuario_id = asistente.registrar_usuario("Ana")
+    plan_id = asistente.crear_plan(usuario_id, "Python", mostrar=False)
+    asistente.aplicar_sesion(plan_id, 45, 8, fecha="2026-01-06", hora="18:30")
+    disperso = agregado_usuario(asistente.datos, usuario_id)["mapa"]
+
+    denso = {"minutos": [0] * CELDAS, "sesiones": [0] * CELDAS, "suma_puntuacion": [0] * CELDAS}
+    denso["minutos"][24 + 18], denso["sesiones"][24 + 18], denso["suma_puntuacion"][24 + 18] = 45, 1, 8
+    datos = json.loads(json.dumps(asistente.datos))
+    datos["agregados"]["usuarios"][usuario_id]["mapa"] = denso
+    sincronizar_agregados(datos, asistente.indices)
+
+    assert datos["agregados"]["usuarios"][usuario_id]["mapa"] == disperso == {"celdas": {str(24 + 18): [45, 1, 8.0]}}
+
+
+def test_recomendaciones_usan_la_hora_del_mapa(nuevo_asistente):
+    asistente = nuevo_asistente()
+    usuario_id = asistente.registrar_usuario("Ana")
+    plan_id = asistente.crear_plan(usuario_id, "Python", mostrar=False)
+    for dia, hora, puntuacion in ((5, "21:00", 4), (6, "21:00", 4), (7, "07:00", 10), (8, "07:00", 10)):
+        asistente.aplicar_sesion(plan_id, 30, puntuacion, fecha=f"2026-01-{dia:02d}", hora=hora)
+    recomendador = RecomendadorIA(asistente.datos, asistente.indices)
+
+    assert any("a las 7:00" in r for r in recomendador._recomendaciones_patrones(usuario_id))
+    assert "las 7:00" in recomendador.recomendar_horario_optimo(usuario_id)
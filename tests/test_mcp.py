@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ejecutar, en_disco, leer
+
+
+class Fallo(Exception):
+    pass
+
+
+def nombres(datos):
+    return [u["nombre"] for u in datos["usuarios"].values()]
+
+
+def crear(mcp_windows, nombre, intereses=("python",)):
+    return mcp_windows.crear_usuario, {"nombre": nombre, "nivel": "principiante", "intereses": list(intereses)}
+
+
+def plan_de_prueba(cola, mcp_windows):
+    usuario, = ejecutar(cola, crear(mcp_windows, "Ana"))
+    plan, = ejecutar(cola, (mcp_windows.crear_plan, {"user_id": usuario["user_id"], "tema": "Python"}))
+    return plan["plan_id"]
+
+
+def test_importar_no_cambia_el_directorio(carpeta):
+    pytest.importorskip("mcp")
+    sys.modules.pop("mcp_windows", None)
+    import mcp_windows
+
+    assert os.getcwd() == str(carpeta)
+    assert mcp_windows.CARPETA_DATOS == os.path.join(os.path.dirname(mcp_windows.__file__), "data")
+
+
+def test_responde_cuando_ya_esta_guardado(cola, mcp_windows):
+    resultado, = ejecutar(cola, crear(mcp_windows, "Ana"))
+
+    assert resultado["exito"]
+    assert resultado["user_id"] in en_disco()["usuarios"]
+
+
+def test_escrituras_concurrentes_en_un_guardado(cola, mcp_windows, monkeypatch):
+    guardados = []
+    original = mcp_windows.AsistenteAprendizaje.guardar_datos
+
+    def contar(asistente):
+        if asistente.nivel_transaccion == 0 and asistente.cambios_pendientes:
+            guardados.append(len(asistente.cambios_pendientes))
+        return original(asistente)
+    monkeypatch.setattr(mcp_windows.AsistenteAprendizaje, "guardar_datos", contar)
+
+    resultados = ejecutar(cola, *(crear(mcp_windows, f"U{i}") for i in range(10)))
+
+    assert all(r["exito"] for r in resultados)
+    assert len(guardados) == 1
+    assert len(en_disco()["usuarios"]) == 10
+
+
+def test_escritura_fallida_se_deshace_sin_tocar_las_demas(cola, mcp_windows):
+    def falla(asistente, argumentos):
+        asistente.registrar_usuario("Malo")
+        raise Fallo()
+
+    resultados = ejecutar(cola, crear(mcp_windows, "Ana"), (falla, {}), crear(mcp_windows, "Bob"))
+
+    assert isinstance(resultados[1], Fallo)
+    assert nombres(en_disco()) == ["Ana", "Bob"]
+    assert nombres(cola.asistente.datos) == ["Ana", "Bob"]
+
+
+def test_crear_usuario_guarda_los_intereses_tal_cual(cola, mcp_windows):
+    resultado, = ejecutar(cola, crear(mcp_windows, "Ana", intereses=[]))
+
+    assert en_disco()["usuarios"][resultado["user_id"]]["intereses"] == []
+
+
+def test_registrar_sesion_acepta_minutos_enteros_en_coma_flotante(cola, mcp_windows):
+    plan_id = plan_de_prueba(cola, mcp_windows)
+    resultado, = ejecutar(cola, (mcp_windows.registrar_sesion,
+                                 {"plan_id": plan_id, "minutos": 30.0, "satisfaccion": 8}))
+
+    assert resultado["exito"]
+    assert en_disco()["sesiones"][-1]["duracion"] == 30
+    assert isinstance(en_disco()["sesiones"][-1]["duracion"], int)
+
+
+def test_registrar_sesion_rechaza_valores_no_validos(cola, mcp_windows):
+    plan_id = plan_de_prueba(cola, mcp_windows)
+    malas = [
+        {"plan_id": plan_id, "minutos": 30.7, "satisfaccion": 8},
+        {"plan_id": plan_id, "minutos": "30", "satisfaccion": 8},
+        {"plan_id": plan_id, "minutos": True, "satisfaccion": 8},
+        {"plan_id": plan_id, "minutos": 0, "satisfaccion": 8},
+        {"plan_id": plan_id, "minutos": 30, "satisfaccion": 0},
+        {"plan_id": plan_id, "minutos": 30},
+        {"plan_id": [plan_id], "minutos": 30, "satisfaccion": 5},
+    ]
+    for sesion in malas:
+        resultado, = ejecutar(cola, (mcp_windows.registrar_sesion, sesion))
+        assert not resultado["exito"]
+    assert en_disco()["sesiones"] == []
+
+
+def test_crear_plan_valida_los_dias(cola, mcp_windows):
+    usuario, = ejecutar(cola, crear(mcp_windows, "Ana"))
+    for dias in ("7", None, 0, -3, 2.5):
+        resultado, = ejecutar(cola, (mcp_windows.crear_plan, {"user_id": usuario["user_id"], "tema": "Python",
+                                                              "dias": dias}))
+        assert not resultado["exito"]
+
+    resultado, = ejecutar(cola, (mcp_windows.crear_plan, {"user_id": usuario["user_id"], "tema": "Python",
+                                                          "dias": 7.0}))
+    assert resultado["exito"]
+
+
+def test_error_no_repite_los_argumentos(cola, mcp_windows, monkeypatch):
+    monkeypatch.setattr(mcp_windows, "cola", cola)
+    enorme = [{"nombre": f"U{i}"} for i in range(mcp_windows.MAX_LOTE + 1)]
+    respuesta, = asyncio.run(mcp_windows.handle_call_tool("crear_usuarios_lote", {"usuarios": enorme}))
+
+    error = json.loads(respuesta.text)
+    assert error == {"exito": False, "error": error["error"], "herramienta": "crear_usuarios_lote"}
+    assert len(respuesta.text) < 200
+
+
+def test_ver_progreso(cola, mcp_windows):
+    usuario, = ejecutar(cola, crear(mcp_windows, "Ana"))
+    progreso = leer(cola, mcp_windows.ver_progreso, {"user_id": usuario["user_id"]})
+
+    assert progreso["usuario"] == "Ana"
+    assert progreso["puntos"] == 0
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from conftest import ejecutar, en_disco, leer
+
+
+def plan_de_prueba(cola, mcp_windows):
+    creados, = ejecutar(cola, (mcp_windows.crear_usuarios_lote, {"usuarios": [{"nombre": "Ana"}]}))
+    user_id = creados["creados"][0]["user_id"]
+    plan, = ejecutar(cola, (mcp_windows.crear_plan, {"user_id": user_id, "tema": "Python"}))
+    return user_id, plan["plan_id"]
+
+
+def test_crear_usuarios_lote_errores_por_elemento(cola, mcp_windows):
+    usuarios = [{"nombre": "Ana"}, {"nombre": "Bob", "intereses": []}, {"nombre": "Cy", "intereses": [5]},
+                {"nombre": 7}, {"nombre": "Di", "nivel": "experto"}, "Eva"]
+    resultado, = ejecutar(cola, (mcp_windows.crear_usuarios_lote, {"usuarios": usuarios}))
+
+    assert [c["i"] for c in resultado["creados"]] == [0, 1]
+    assert [e["i"] for e in resultado["errores"]] == [2, 3, 4, 5]
+    assert [u["nombre"] for u in en_disco()["usuarios"].values()] == ["Ana", "Bob"]
+
+
+def test_registrar_sesiones_lote_valida_como_registrar_sesion(cola, mcp_windows):
+    _, plan_id = plan_de_prueba(cola, mcp_windows)
+    sesiones = [
+        {"plan_id": plan_id, "minutos": 30, "satisfaccion": 8, "fecha": "2026-01-05", "hora": "10:00"},
+        {"plan_id": plan_id, "minutos": 30, "satisfaccion": 0},
+        {"plan_id": plan_id, "minutos": 30},
+        {"plan_id": plan_id, "minutos": 30, "satisfaccion": 15},
+        {"plan_id": [plan_id], "minutos": 30, "satisfaccion": 5},
+        {"plan_id": plan_id, "minutos": 0, "satisfaccion": 5},
+        {"plan_id": plan_id, "minutos": 30.7, "satisfaccion": 5},
+        {"plan_id": plan_id, "minutos": 30, "satisfaccion": 5, "fecha": "ayer"},
+        {"plan_id": plan_id, "minutos": 45.0, "satisfaccion": 9, "fecha": "2026-01-06", "hora": "11:00"},
+    ]
+    resultado, = ejecutar(cola, (mcp_windows.registrar_sesiones_lote, {"sesiones": sesiones}))
+
+    assert resultado["registradas"] == 2
+    assert [e["i"] for e in resultado["errores"]] == [1, 2, 3, 4, 5, 6, 7]
+    assert [s["duracion"] for s in en_disco()["sesiones"]] == [30, 45]
+
+    for sesion in sesiones[1:7]:
+        individual, = ejecutar(cola, (mcp_windows.registrar_sesion, sesion))
+        assert not individual["exito"]
+
+
+def test_registrar_sesiones_lote_resume_por_usuario(cola, mcp_windows):
+    user_id, plan_id = plan_de_prueba(cola, mcp_windows)
+    sesiones = [{"plan_id": plan_id, "minutos": 30, "satisfaccion": 8, "fecha": f"2026-01-{dia:02d}", "hora": "10:00"}
+                for dia in range(1, 8)]
+    resultado, = ejecutar(cola, (mcp_windows.registrar_sesiones_lote, {"sesiones": sesiones}))
+
+    resumen = resultado["usuarios"][user_id]
+    assert resumen["puntos_totales"] == en_disco()["puntos"][user_id]
+    assert {"primer_dia", "racha_3", "racha_7"} <= set(resumen["nuevos_logros"])
+
+
+def test_ver_progreso_lote(cola, mcp_windows):
+    user_id, _ = plan_de_prueba(cola, mcp_windows)
+    resultado = leer(cola, mcp_windows.ver_progreso_lote, {"user_ids": [user_id, "user_9", [1]]})
+
+    assert [p["id"] for p in resultado["progreso"]] == [user_id]
+    assert [e["i"] for e in resultado["errores"]] == [1, 2]
+
+
+def test_lotes_responden_en_json_compacto(cola, mcp_windows, monkeypatch):
+    monkeypatch.setattr(mcp_windows, "cola", cola)
+    respuesta, = asyncio.run(mcp_windows.handle_call_tool("crear_usuarios_lote", {"usuarios": [{"nombre": "Ana"}]}))
+
+    assert "\n" not in respuesta.text
+    assert json.loads(respuesta.text)["creados"][0]["i"] == 0
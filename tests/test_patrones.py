@@ -0,0 +1,73 @@
+from columnas import ColumnasSesiones
+from conftest import poblar
+from ia_assistant import RecomendadorIA
+
+
+def recomendador(asistente, columnas=None):
+    return RecomendadorIA(asistente.datos, asistente.indices, columnas or asistente.columnas)
+
+
+def test_cache_compartida_e_incremental(nuevo_asistente, monkeypatch):
+    asistente = nuevo_asistente()
+    poblar(asistente)
+    primero = recomendador(asistente).patrones_estudio
+
+    procesadas = []
+    original = RecomendadorIA._actualizar_acumulado
+    monkeypatch.setattr(RecomendadorIA, "_actualizar_acumulado", lambda self, acumulado, filas: (
+        procesadas.append(len(filas) - acumulado["sesiones_procesadas"]), original(self, acumulado, filas)))
+
+    assert recomendador(asistente).patrones_estudio == primero
+    assert procesadas == [0]
+
+    plan_id = asistente.datos["sesiones"][0]["plan_id"]
+    asistente.aplicar_sesion(plan_id, 50, 9, fecha="2026-03-20", hora="11:00")
+    incremental = recomendador(asistente).patrones_estudio
+    assert procesadas[-1] == 1
+    assert incremental == recomendador(asistente, ColumnasSesiones(asistente.datos)).patrones_estudio
+    assert incremental["sesiones"] == primero["sesiones"] + 1
+
+
+def test_patrones_globales(nuevo_asistente):
+    asistente = nuevo_asistente()
+    poblar(asistente)
+    patrones = recomendador(asistente).patrones_estudio
+    sesiones = asistente.datos["sesiones"]
+
+    assert patrones["sesiones"] == len(sesiones)
+    assert patrones["duracion_promedio"] == sum(s["duracion"] for s in sesiones) // len(sesiones)
+    assert patrones["temas_favoritos"] == {"Python": 2, "Inglés": 1, "Matemáticas": 2}
+    assert patrones["dias_mas_activos"] == {"Tuesday": 2, "Sunday": 1, "Thursday": 1, "Wednesday": 1}
+    assert patrones["racha_maxima"] == max(r["maxima"] for r in asistente.datos["rachas"].values())
+
+
+def test_perfil_solo_con_las_sesiones_del_usuario(nuevo_asistente):
+    asistente = nuevo_asistente()
+    poblar(asistente)
+    ana, bob = list(asistente.datos["usuarios"])
+    ia = recomendador(asistente)
+
+    perfil = ia.perfil_usuario(bob)
+    assert perfil["sesiones"] == 2
+    assert perfil["duracion_promedio"] == (30 + 60) // 2
+    assert perfil["satisfaccion_promedio"] == (6 + 10) / 2
+    assert perfil["temas_favoritos"] == {"Matemáticas": 2}
+    assert perfil["racha_maxima"] == asistente.datos["rachas"][bob]["maxima"]
+    assert ia.perfil_usuario(ana)["temas_favoritos"] == {"Python": 2, "Inglés": 1}
+
+    vacio = ia.perfil_usuario("user_9")
+    assert (vacio["sesiones"], vacio["temas_favoritos"], vacio["racha_maxima"]) == (0, {}, 0)
+    assert ia._recomendaciones_patrones("user_9") == []
+
+
+def test_recomendaciones_segun_el_perfil(nuevo_asistente):
+    asistente = nuevo_asistente()
+    usuario_id = asistente.registrar_usuario("Ana")
+    plan_id = asistente.crear_plan(usuario_id, "Python", mostrar=False)
+    for dia in range(5, 9):
+        asistente.aplicar_sesion(plan_id, 10, 4, fecha=f"2026-01-{dia:02d}", hora="16:00")
+
+    recomendaciones = recomendador(asistente)._recomendaciones_patrones(usuario_id)
+    assert any("tardes (16:00)" in r for r in recomendaciones)
+    assert any("sesiones son cortas" in r for r in recomendaciones)
+    assert any("Satisfacción baja" in r for r in recomendaciones)
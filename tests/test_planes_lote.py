@@ -0,0 +1,48 @@
+import argparse
+
+import main
+from conftest import en_disco
+
+
+def test_crea_planes_en_un_solo_guardado(nuevo_asistente, monkeypatch):
+    asistente = nuevo_asistente()
+    ana, bob = asistente.registrar_usuario("Ana"), asistente.registrar_usuario("Bob")
+    guardados = []
+    original = asistente.almacen.guardar
+    monkeypatch.setattr(asistente.almacen, "guardar",
+                        lambda datos, cambios: (guardados.append(len(cambios)), original(datos, cambios)))
+
+    resultado = asistente.crear_planes_lote([
+        {"usuario_id": ana, "tema": "Python", "dias": "14"},
+        {"usuario_id": bob, "tema": "Inglés"},
+        {"usuario_id": "user_99", "tema": "Python"},
+        {"usuario_id": ana, "tema": "  "},
+        {"usuario_id": bob, "tema": "Python", "dias": "dos"},
+        {"usuario_id": bob, "tema": "Python", "dias": 0},
+    ])
+
+    assert [numero for numero, _ in resultado["rechazadas"]] == [3, 4, 5, 6]
+    assert len(resultado["creados"]) == 2 and len(guardados) == 1
+    planes = en_disco()["planes"]
+    assert [(planes[p]["usuario_id"], planes[p]["tema"]) for p in resultado["creados"]] == [(ana, "Python"),
+                                                                                             (bob, "Inglés")]
+
+
+def test_con_ia_personaliza_cada_plan(nuevo_asistente):
+    asistente = nuevo_asistente()
+    ana = asistente.registrar_usuario("Ana")
+
+    resultado = asistente.crear_planes_lote([{"usuario_id": ana, "tema": "python"}], con_ia=True)
+
+    assert asistente.datos["planes"][resultado["creados"][0]]["generado_con_ia"]
+
+
+def test_comando_planes_desde_csv(nuevo_asistente, carpeta):
+    asistente = nuevo_asistente()
+    ana = asistente.registrar_usuario("Ana")
+    (carpeta / "clase.csv").write_text(f"usuario_id,tema,dias\n{ana},Matemáticas,\n{ana},Python,7\n",
+                                       encoding="utf-8")
+
+    main.comando_planes(argparse.Namespace(almacenamiento="json", archivo="clase.csv", ia=False))
+
+    assert sorted(plan["tema"] for plan in en_disco()["planes"].values()) == ["Matemáticas", "Python"]
@@ -0,0 +1,70 @@
+import argparse
+import random
+from datetime import date, timedelta
+
+import main
+import reconstruccion
+from reconstruccion import reconstruir_historial
+
+
+def con_historial(asistente, sesiones=60, semilla=5):
+    """Dos usuarios con varios planes y sesiones en directo repartidas en dos meses"""
+    azar = random.Random(semilla)
+    planes = []
+    for nombre in ("Ana", "Bob"):
+        usuario_id = asistente.registrar_usuario(nombre)
+        for tema in ("Python", "Inglés", "Matemáticas"):
+            planes.append(asistente.crear_plan(usuario_id, tema, mostrar=False))
+    for i in range(sesiones):
+        asistente.aplicar_sesion(azar.choice(planes), azar.choice([20, 45, 90, 130]), azar.randint(1, 10),
+                                 fecha=(date(2026, 1, 1) + timedelta(days=i // 2)).isoformat(), hora=f"{azar.randint(5, 23):02d}:00")
+    return asistente
+
+
+def derivados(asistente):
+    return (asistente.datos["puntos"], asistente.datos["rachas"],
+            {u: sorted(l) for u, l in asistente.datos["logros"].items()},
+            {p: plan["progreso"] for p, plan in asistente.datos["planes"].items()})
+
+
+def test_reconstruir_coincide_con_lo_registrado_en_directo(nuevo_asistente):
+    asistente = con_historial(nuevo_asistente())
+    antes = derivados(asistente)
+
+    assert asistente.reconstruir_estado(procesos=1) == {"usuarios": 2, "cambiados": 0}
+    assert derivados(asistente) == antes
+
+
+def test_reconstruir_repara_datos_corruptos(nuevo_asistente):
+    asistente = con_historial(nuevo_asistente())
+    antes = derivados(asistente)
+    usuario_id = next(iter(asistente.datos["usuarios"]))
+    asistente.datos["puntos"][usuario_id] = 0
+    asistente.datos["logros"][usuario_id] = []
+    asistente.datos["rachas"][usuario_id]["maxima"] = 99
+
+    assert asistente.reconstruir_estado(procesos=1)["cambiados"] == 1
+    assert derivados(asistente) == antes
+    assert derivados(nuevo_asistente()) == antes
+
+
+def test_en_paralelo_da_lo_mismo(nuevo_asistente, monkeypatch):
+    asistente = con_historial(nuevo_asistente())
+    en_serie = reconstruir_historial(asistente.datos, asistente.indices, procesos=1)
+
+    monkeypatch.setattr(reconstruccion, "MIN_SESIONES_PARALELO", 0)
+    assert reconstruir_historial(asistente.datos, asistente.indices, procesos=2) == en_serie
+
+
+def test_comando_reconstruir_cierra_el_almacen(nuevo_asistente):
+    asistente = con_historial(nuevo_asistente())
+    usuario_id = next(iter(asistente.datos["usuarios"]))
+    esperado = asistente.datos["puntos"][usuario_id]
+    asistente.datos["puntos"][usuario_id] = 0
+    asistente.compactar_datos()
+
+    main.comando_reconstruir(argparse.Namespace(almacenamiento="json", procesos=1))
+
+    recargado = nuevo_asistente()
+    assert recargado.almacen.instantanea.vigente()
+    assert recargado.datos["puntos"][usuario_id] == esperado
@@ -0,0 +1,54 @@
+from datetime import date
+
+from agregados import agregado_usuario_vacio
+from resumenes import (acumular_resumenes, clave_semana, comparar_meses, comparar_semanas, rehacer_resumenes,
+                       resumen_dias, variacion)
+
+
+def sesion(fecha, duracion=30, puntuacion=8):
+    return {"plan_id": "plan_1", "duracion": duracion, "puntuacion": puntuacion, "fecha": fecha}
+
+
+def con_sesiones(*sesiones):
+    agregado = agregado_usuario_vacio()
+    for s in sesiones:
+        acumular_resumenes(agregado, s)
+    return agregado
+
+
+def test_clave_semana_iso():
+    assert clave_semana(date(2026, 1, 1)) == "2026-W01"
+    assert clave_semana(date(2027, 1, 1)) == "2026-W53"
+
+
+def test_dias_y_semanas():
+    agregado = con_sesiones(sesion("2026-03-09"), sesion("2026-03-09", 60, 6), sesion("2026-03-15"),
+                            sesion("2026-03-16"), {"plan_id": "plan_1", "duracion": 10, "puntuacion": 5})
+
+    assert agregado["dias"]["2026-03-09"] == [90, 2, 14]
+    assert agregado["semanas"] == {"2026-W11": [120, 3, 22], "2026-W12": [30, 1, 8]}
+    assert resumen_dias(agregado, date(2026, 3, 8), date(2026, 3, 15)) == {"minutos": 120, "sesiones": 3,
+                                                                         "satisfaccion": 22 / 3}
+
+
+def test_comparar_semanas_y_meses():
+    agregado = con_sesiones(sesion("2026-02-03", 40), sesion("2026-02-20", 100), sesion("2026-03-02", 30),
+                            sesion("2026-03-10", 50))
+
+    actual, anterior = comparar_semanas(agregado, hoy=date(2026, 3, 11))
+    assert (actual["minutos"], anterior["minutos"]) == (50, 30)
+
+    # Del 1 al 11 en los dos meses: la sesión del 20 de febrero no cuenta
+    actual, anterior = comparar_meses(agregado, hoy=date(2026, 3, 11))
+    assert (actual["minutos"], anterior["minutos"]) == (80, 40)
+    assert comparar_meses(agregado, hoy=date(2026, 3, 31))[1]["minutos"] == 140
+
+
+def test_variacion_y_rehacer():
+    assert variacion(150, 100) == 50
+    assert variacion(10, 0) is None
+
+    agregado = con_sesiones(sesion("2026-03-09"))
+    assert not rehacer_resumenes(agregado, [sesion("2026-03-09")])
+    assert rehacer_resumenes(agregado, [sesion("2026-03-10")])
+    assert list(agregado["dias"]) == ["2026-03-10"]
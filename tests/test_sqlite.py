@@ -0,0 +1,43 @@
+import sqlite3
+
+from conftest import estado, poblar
+
+
+def indices_de(archivo):
+    with sqlite3.connect(archivo) as conexion:
+        return [nombre for nombre, in conexion.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex%'")]
+
+
+def test_recargar_y_tablas_sin_indices_secundarios(nuevo_asistente):
+    asistente = nuevo_asistente("sqlite")
+    poblar(asistente)
+    asistente.cerrar()
+
+    assert estado(nuevo_asistente("sqlite")) == estado(asistente)
+    assert indices_de("data/usuarios.db") == []
+
+
+def test_bases_antiguas_pierden_los_indices(nuevo_asistente):
+    asistente = nuevo_asistente("sqlite")
+    poblar(asistente)
+    asistente.cerrar()
+    with sqlite3.connect("data/usuarios.db") as conexion:
+        conexion.execute("CREATE INDEX idx_sesiones_fecha ON sesiones (fecha)")
+        conexion.execute("CREATE INDEX idx_planes_usuario ON planes (usuario_id)")
+
+    recargado = nuevo_asistente("sqlite")
+    assert estado(recargado) == estado(asistente)
+    recargado.cerrar()
+    assert indices_de("data/usuarios.db") == []
+
+
+def test_migra_el_json_solo_la_primera_vez(nuevo_asistente):
+    original = nuevo_asistente("json")
+    poblar(original)
+
+    migrado = nuevo_asistente("sqlite")
+    assert estado(migrado) == estado(original)
+
+    original.registrar_usuario("Cy")
+    assert "Cy" not in [u["nombre"] for u in nuevo_asistente("sqlite").datos["usuarios"].values()]
@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import temas
+from temas import CATALOGO, CatalogoTemas, plegar, raices
+
+
+def test_plegar_y_raices():
+    assert plegar("Matemáticas") == "matematicas"
+    assert raices("Matemática") == raices("matemáticas") == ["matematic"]
+
+
+@pytest.mark.parametrize("texto, clave", [
+    ("Python", "python"),
+    ("python avanzado", "python"),
+    ("python3", "python"),
+    ("Python 3.12", "python"),
+    ("pythonista", "python"),
+    ("matematicas", "matemáticas"),
+    ("Matemática discreta", "matemáticas"),
+    ("maths", "matemáticas"),
+    ("ingles", "inglés"),
+    ("business English", "inglés"),
+    ("Diseño gráfico", "diseño"),
+    ("UX design", "diseño"),
+    ("repaso de inglés y python", "inglés"),
+])
+def test_buscar(texto, clave):
+    assert CATALOGO.buscar(texto) == clave
+
+
+@pytest.mark.parametrize("texto", ["design patterns", "material escolar", "Historia", ""])
+def test_buscar_sin_tema(texto):
+    assert CATALOGO.buscar(texto) is None
+
+
+def test_seccion_es_una_copia():
+    objetivos = CATALOGO.seccion("Python", "objetivos")
+    objetivos["principiante"].append("otro")
+
+    assert "otro" not in CATALOGO.seccion("python", "objetivos")["principiante"]
+
+
+@pytest.fixture
+def catalogo(tmp_path, monkeypatch):
+    """Catálogo de prueba que cuenta qué archivos se abren"""
+    (tmp_path / "indice.json").write_text(json.dumps({
+        "python": {"archivo": "python.json", "alias": ["python"]},
+        "cocina": {"archivo": "cocina.json", "alias": ["cocina", "recetas"]},
+    }), encoding="utf-8")
+    for nombre in ("python", "cocina"):
+        (tmp_path / f"{nombre}.json").write_text(json.dumps({"objetivos": {"principiante": [nombre]}}),
+                                                 encoding="utf-8")
+
+    abiertos = []
+    original = open
+
+    def abrir(ruta, *args, **kwargs):
+        abiertos.append(os.path.basename(ruta))
+        return original(ruta, *args, **kwargs)
+    monkeypatch.setattr("builtins.open", abrir)
+    temas._leer_tema.cache_clear()
+    return CatalogoTemas(str(tmp_path)), abiertos
+
+
+def test_carga_perezosa(catalogo):
+    catalogo, abiertos = catalogo
+    assert abiertos == []
+
+    assert catalogo.buscar("Recetas de cocina") == "cocina"
+    assert abiertos == ["indice.json"]
+
+    assert catalogo.seccion("cocina", "objetivos") == {"principiante": ["cocina"]}
+    assert catalogo.seccion("recetas", "objetivos") == {"principiante": ["cocina"]}
+    assert catalogo.seccion("historia", "objetivos") is None
+    assert catalogo.seccion("cocina", "plan_ia") is None
+    assert abiertos == ["indice.json", "cocina.json"]
+
+
+def test_los_planes_leen_el_catalogo(nuevo_asistente):
+    asistente = nuevo_asistente()
+    plan_id = asistente.crear_plan(asistente.registrar_usuario("Ana"), "python3", mostrar=False)
+    objetivos = CATALOGO.seccion("python", "objetivos")["principiante"]
+
+    assert asistente.datos["planes"][plan_id]["objetivos"] == objetivos
@@ -0,0 +1,40 @@
+import pytest
+
+from tendencias import (ALFAS, MIN_SESIONES_ALERTA, VIDAS_MEDIAS, actualizar_tendencias, detectar_caidas, diferencia,
+                        tendencias_vacias)
+
+
+def con(*valores):
+    tendencias = tendencias_vacias()
+    for duracion, puntuacion in valores:
+        actualizar_tendencias(tendencias, {"duracion": duracion, "puntuacion": puntuacion})
+    return tendencias
+
+
+def test_primera_sesion_inicializa_las_medias():
+    tendencias = con((40, 7))
+
+    assert tendencias["corta"] == tendencias["larga"] == {"puntuacion": 7, "duracion": 40}
+    assert diferencia(tendencias, "puntuacion") == 0
+    assert diferencia(tendencias_vacias(), "duracion") == 0
+
+
+def test_vida_media():
+    # Tras "vida" sesiones de un valor nuevo queda la mitad del camino por recorrer
+    vida = VIDAS_MEDIAS["corta"]
+    tendencias = con((0, 0), *[(100, 10)] * vida)
+
+    assert tendencias["corta"]["duracion"] == pytest.approx(50)
+    assert tendencias["larga"]["duracion"] < tendencias["corta"]["duracion"]
+    assert 0 < ALFAS["larga"] < ALFAS["corta"] < 1
+
+
+def test_detecta_caidas():
+    estable = con(*[(60, 8)] * 40)
+    assert detectar_caidas(estable) == []
+
+    caida = con(*[(60, 8)] * 40, *[(20, 5)] * 8)
+    assert [campo for campo, _, _ in detectar_caidas(caida)] == ["puntuacion", "duracion"]
+    assert diferencia(caida, "puntuacion") < 0
+
+    assert detectar_caidas(con(*[(60, 8)] * (MIN_SESIONES_ALERTA - 2), (5, 1))) == []
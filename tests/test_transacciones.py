@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from conftest import estado
+
+
+class Fallo(Exception):
+    pass
+
+
+def test_transaccion_guarda_una_sola_vez(nuevo_asistente, monkeypatch):
+    asistente = nuevo_asistente()
+    guardados = []
+    original = asistente.almacen.guardar
+    monkeypatch.setattr(asistente.almacen, "guardar",
+                        lambda datos, cambios: (guardados.append(len(cambios)), original(datos, cambios)))
+
+    with asistente.transaccion():
+        usuario_id = asistente.registrar_usuario("Ana")
+        plan_id = asistente.crear_plan(usuario_id, "Python", mostrar=False)
+        asistente.aplicar_sesion(plan_id, 45, 8, fecha="2026-01-05", hora="10:00")
+
+    assert len(guardados) == 1
+    assert asistente.cambios_pendientes == []
+
+
+def test_transaccion_fallida_no_deja_cambios(nuevo_asistente):
+    asistente = nuevo_asistente()
+    asistente.registrar_usuario("Ana")
+    antes = json.loads(json.dumps(estado(asistente)))
+
+    with pytest.raises(Fallo):
+        with asistente.transaccion():
+            usuario_id = asistente.registrar_usuario("Bob")
+            asistente.crear_plan(usuario_id, "Python", mostrar=False)
+            raise Fallo()
+
+    assert estado(asistente) == antes
+    assert asistente.cambios_pendientes == []
+    with open("data/usuarios.json", encoding="utf-8") as f:
+        assert [u["nombre"] for u in json.load(f)["usuarios"].values()] == ["Ana"]
+
+
+def test_transaccion_anidada_deshace_todo_al_fallar_la_externa(nuevo_asistente):
+    asistente = nuevo_asistente()
+
+    with pytest.raises(Fallo):
+        with asistente.transaccion():
+            asistente.registrar_usuario("Ana")  # abre y cierra su propia transacción
+            raise Fallo()
+
+    assert asistente.datos["usuarios"] == {}
+    assert nuevo_asistente().datos["usuarios"] == {}